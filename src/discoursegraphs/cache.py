@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursegraphs.programming@arne.cl>
+
+"""
+This module provides an opt-in, persistent on-disk cache for the document
+graphs created by the readers (e.g. ``read_rs3``, ``read_tiger``,
+``read_mmax2`` or ``read_conano``), so that input files which haven't
+changed don't have to be parsed again.
+
+Usage
+=====
+
+A cache can be used as a decorator of a reader::
+
+    cache = DocumentCache()
+    read_rs3 = cache(dg.read_rs3)
+    docgraph = read_rs3('maz-1423.rs3')  # parses the file
+    docgraph = read_rs3('maz-1423.rs3')  # loads the cached graph
+
+or as a context manager, which activates it for all reads that go through
+``cached_read()`` (e.g. ``corpora.PCC.get_document``)::
+
+    with DocumentCache():
+        docgraph = pcc.get_document('maz-1423')
+"""
+
+import cPickle
+import hashlib
+import os
+import tempfile
+import warnings
+
+import discoursegraphs as dg
+from discoursegraphs.readwrite.generic import dumps_docgraph, loads_docgraph
+
+# increment this, whenever the format of the cached graphs changes
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'discoursegraphs')
+
+# caches activated via the ``with`` statement (the last one is used)
+_ACTIVE_CACHES = []
+
+
+class DocumentCache(object):
+    """
+    a size-bounded, least-recently-used on-disk cache of document graphs.
+
+    Cached graphs are keyed by the absolute path of the input file, its
+    size and modification time (or its content hash), the reader, its
+    arguments and the version of this library.
+
+    A reader that reads more than the given file (e.g. ``read_mmax2``,
+    which also reads the markables and basedata files of the MMAX project)
+    must provide an ``input_files(path)`` function/staticmethod that returns
+    the paths of all files it reads. All of these files are part of the key.
+    """
+    def __init__(self, cache_dir=None, max_size=512 * 1024**2,
+                 use_hash=False):
+        """
+        Parameters
+        ----------
+        cache_dir : str or None
+            directory the cached graphs are stored in. If None, use
+            ``DEFAULT_CACHE_DIR``.
+        max_size : int
+            maximum size of the cache directory (in bytes). If it is
+            exceeded, the least recently used graphs are removed.
+        use_hash : bool
+            If True, identify an input file by the SHA1 hash of its
+            content instead of its size and modification time.
+        """
+        self.cache_dir = cache_dir if cache_dir else DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        self.use_hash = use_hash
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def key(self, reader, path, kwargs, args=()):
+        """
+        returns the cache key of the document graph that ``reader`` creates
+        from the given file with the given (keyword) arguments.
+        """
+        path = os.path.abspath(path)
+        input_files = getattr(reader, 'input_files', None)
+        if input_files is None:
+            input_paths = [path]
+        else:
+            input_paths = sorted(set(os.path.abspath(input_path)
+                                     for input_path in input_files(path)))
+        file_ids = [(input_path, self._file_id(input_path))
+                    for input_path in input_paths]
+
+        reader_id = '{}.{}'.format(reader.__module__, reader.__name__)
+        key_str = repr((path, file_ids, reader_id, tuple(args),
+                        sorted(kwargs.items()), dg.__version__,
+                        CACHE_FORMAT_VERSION))
+        return hashlib.sha1(key_str).hexdigest()
+
+    def _file_id(self, path):
+        """
+        identifies the content of a file by its size and modification
+        time (or by its SHA1 hash). Missing files are identified by None.
+        """
+        try:
+            if self.use_hash:
+                with open(path, 'rb') as input_file:
+                    return hashlib.sha1(input_file.read()).hexdigest()
+            stat = os.stat(path)
+        except (IOError, OSError):
+            return None
+        return (stat.st_size, stat.st_mtime)
+
+    def _cache_file(self, key):
+        return os.path.join(self.cache_dir, key + '.dg')
+
+    def get(self, key):
+        """
+        returns the cached document graph with the given key (or None, if
+        it isn't cached). Corrupt or incompatible cache entries are removed.
+        """
+        cache_file = self._cache_file(key)
+        try:
+            with open(cache_file, 'rb') as cached:
+                docgraph_str = cached.read()
+        except IOError:
+            return None
+        try:
+            docgraph = loads_docgraph(docgraph_str)
+        except (EOFError, cPickle.UnpicklingError, ValueError, AttributeError,
+                ImportError, IndexError, KeyError, TypeError):
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass  # already removed by another process
+            return None
+        os.utime(cache_file, None)  # mark as recently used
+        return docgraph
+
+    def put(self, key, docgraph):
+        """
+        stores a document graph in the cache and removes the least recently
+        used graphs, if the cache has become too large.
+        """
+        try:
+            docgraph_str = dumps_docgraph(docgraph)
+        except (cPickle.PicklingError, TypeError) as e:
+            warnings.warn("Can't cache document graph '{0}': {1}".format(
+                docgraph.name, e))
+            return
+
+        # write to a temporary file first, so that concurrent readers
+        # never see a partially written graph
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(tmp_fd, 'wb') as tmp_file:
+            tmp_file.write(docgraph_str)
+        os.rename(tmp_path, self._cache_file(key))
+        self.evict()
+
+    def evict(self):
+        """
+        removes the least recently used graphs from the cache, until its
+        size doesn't exceed ``self.max_size``.
+        """
+        cache_files = []
+        for fname in os.listdir(self.cache_dir):
+            if fname.endswith('.dg'):
+                stat = os.stat(os.path.join(self.cache_dir, fname))
+                cache_files.append((stat.st_mtime, stat.st_size, fname))
+
+        cache_size = sum(size for (_, size, _) in cache_files)
+        for _mtime, size, fname in sorted(cache_files):
+            if cache_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, fname))
+            except OSError:
+                pass  # already removed by another process
+            cache_size -= size
+
+    def clear(self):
+        """removes all graphs from the cache"""
+        for fname in os.listdir(self.cache_dir):
+            if fname.endswith('.dg'):
+                os.remove(os.path.join(self.cache_dir, fname))
+
+    def read(self, reader, path, *args, **kwargs):
+        """
+        returns the document graph that ``reader(path, *args, **kwargs)``
+        creates, loading it from the cache if possible.
+        """
+        key = self.key(reader, path, kwargs, args)
+        docgraph = self.get(key)
+        if docgraph is None:
+            docgraph = reader(path, *args, **kwargs)
+            self.put(key, docgraph)
+        return docgraph
+
+    def __call__(self, reader):
+        """use the cache as a decorator of a reader function/class"""
+        def cached_reader(path, *args, **kwargs):
+            return self.read(reader, path, *args, **kwargs)
+        cached_reader.__name__ = reader.__name__
+        cached_reader.__doc__ = reader.__doc__
+        return cached_reader
+
+    def __enter__(self):
+        _ACTIVE_CACHES.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _ACTIVE_CACHES.remove(self)
+
+
+def cached_read(reader, path, *args, **kwargs):
+    """
+    returns the document graph that ``reader(path, *args, **kwargs)``
+    creates, using the currently active DocumentCache (if there is one).
+    """
+    if _ACTIVE_CACHES:
+        return _ACTIVE_CACHES[-1].read(reader, path, *args, **kwargs)
+    return reader(path, *args, **kwargs)
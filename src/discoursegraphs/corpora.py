@@ -25,6 +25,7 @@ import random
 import re
 
 import discoursegraphs as dg
+from discoursegraphs.cache import cached_read
 
 PCC_DIRNAME = 'potsdam-commentary-corpus-2.0.0'
 PCC_DOCID_RE = re.compile('^.*(maz-\d+)\..*')
@@ -90,21 +91,40 @@ class PCC(Sequence):
         """
         given a document ID, returns a merged document graph containng all
         available annotation layers.
+
+        The annotation layers are loaded from the active DocumentCache,
+        if there is one (cf. ``discoursegraphs.cache``).
+        """
+        layer_graphs = self.get_layer_graphs(doc_id)
+        doc_graph = layer_graphs[0]
+        for layer_graph in layer_graphs[1:]:
+            doc_graph.merge_graphs(layer_graph)
+        return doc_graph
+
+    def get_merged_view(self, doc_id):
+        """
+        given a document ID, returns a read-only MergedDocumentGraph of all
+        available annotation layers, which answers node, edge, layer and
+        span queries without merging them into one graph.
+        """
+        return dg.MergedDocumentGraph(self.get_layer_graphs(doc_id))
+
+    def get_layer_graphs(self, doc_id):
+        """
+        given a document ID, returns the document graphs of all available
+        annotation layers (loaded from the active DocumentCache, if there
+        is one).
         """
         layer_graphs = []
         for layer_name in self.layers:
             layer_files, read_function = self.layers[layer_name]
             for layer_file in layer_files:
                 if fnmatch.fnmatch(layer_file, '*{}.*'.format(doc_id)):
-                    layer_graphs.append(read_function(layer_file))
+                    layer_graphs.append(cached_read(read_function, layer_file))
 
         if not layer_graphs:
             raise TypeError("There are no files with that document ID.")
-        else:
-            doc_graph = layer_graphs[0]
-            for layer_graph in layer_graphs[1:]:
-                doc_graph.merge_graphs(layer_graph)
-        return doc_graph
+        return layer_graphs
 
     def __getitem__(self, sliced):
         """access documents by their index or by their document ID"""
@@ -7,16 +7,22 @@ The ``discoursegraph`` module specifies a ``DisourseDocumentGraph``,
 the fundamential data structure used in this package. It is a slightly
 modified ``networkx.MultiDiGraph``, which enforces every node and edge to have
 a ``layers`` attribute (which maps to the set of layers (str) it belongs to).
+Layer sets are interned, immutable frozensets that are shared between all
+nodes/edges belonging to the same layers, so they must be changed via
+``add_layer()`` (or ``add_node()``/``add_edge()``) instead of in-place.
 
 TODO: implement a DiscourseCorpusGraph
 """
 
+from copy import deepcopy
 import itertools
 import sys
 import warnings
+from array import array
 from collections import defaultdict, OrderedDict
 
-from networkx import MultiGraph, MultiDiGraph, is_directed_acyclic_graph
+from networkx import (
+    condensation, DiGraph, MultiGraph, MultiDiGraph, is_directed_acyclic_graph)
 
 from discoursegraphs.relabel import relabel_nodes
 from discoursegraphs.util import natural_sort_key
@@ -33,6 +39,33 @@ class EdgeTypes(object):
     precedence_relation = 'precedes'
 
 
+class _NodeDict(OrderedDict):
+    """
+    The node dict of a ``DiscourseDocumentGraph``. It records whether a node
+    was added or replaced directly (e.g. by ``networkx.relabel_nodes()`` or
+    ``subgraph()``), i.e. without updating the indices of the graph. The
+    indices are then rebuilt before they are used next (cf.
+    ``_sync_index()``).
+    """
+    bypassed = False
+
+    def __init__(self, *args, **kwargs):
+        OrderedDict.__init__(self, *args, **kwargs)
+        # the nodes of a (deep)copy are part of the copied indices
+        self.bypassed = False
+
+    def __setitem__(self, key, value, dict_setitem=dict.__setitem__):
+        self.bypassed = True
+        OrderedDict.__setitem__(self, key, value, dict_setitem=dict_setitem)
+
+    def add_indexed(self, key, value):
+        """
+        adds/replaces a node, whose layers are added to the indices of the
+        graph by the caller.
+        """
+        OrderedDict.__setitem__(self, key, value)
+
+
 class DiscourseDocumentGraph(MultiDiGraph):
     """
     Base class for representing annotated documents as directed graphs
@@ -52,6 +85,8 @@ class DiscourseDocumentGraph(MultiDiGraph):
     tokens : list of int
         a list of node IDs (int) which represent the tokens in the
         order they occur in the text
+    token2position : dict of (str, int)
+        maps from a token node ID to its position in ``tokens``
 
     TODO list:
 
@@ -67,10 +102,15 @@ class DiscourseDocumentGraph(MultiDiGraph):
     # and for each node track the order that neighbors are added and for
     # each neighbor tracks the order that multiedges are added.
     # Cf. nx.MultiDiGraph docstring (OrderedGraph)
-    node_dict_factory = OrderedDict
+    node_dict_factory = _NodeDict
     adjlist_dict_factory = OrderedDict
     edge_key_dict_factory = OrderedDict
 
+    # instance attributes that are only needed while a document graph is
+    # created (e.g. dispatch tables of bound methods). They aren't stored in
+    # snapshots (cf. ``freeze()``) or files.
+    _transient_attributes = ()
+
     def __init__(self, name='', namespace='discoursegraph', root=None):
         """
         Initialized an empty directed graph which allows multiple edges.
@@ -89,28 +129,123 @@ class DiscourseDocumentGraph(MultiDiGraph):
         self.name = name
         self.ns = namespace
         self.root = root if root else self.ns+':root_node'
+        # maps from a layer (str) to the set of node IDs / edges
+        # (source ID, target ID, key) that belong to it, cf. Issue #36.
+        # The index is updated by all methods that add/remove nodes, edges
+        # or layers.
+        self.layer2nodes = defaultdict(set)
+        self.layer2edges = defaultdict(set)
+        # maps from an edge type (str) to the set of edges of that type
+        self.edgetype2edges = defaultdict(set)
+        # maps from a node ID to its insertion rank, which allows us to
+        # return indexed nodes in the same order as ``nodes_iter()``
+        self.node2rank = {}
+        self._next_node_rank = 0
+        # maps from a node ID to the (sorted) tuple of token node IDs it
+        # dominates/spans. The cache is emptied whenever the graph changes.
+        self._span_cache = {}
+        # maps from an offset namespace to a (token list, number of tokens,
+        # onsets array, offsets array) tuple, cf. add_offsets()
+        self._offsets = {}
+        # interning table of layer sets, i.e. all nodes/edges that belong to
+        # the same layers share the same frozenset, cf. _intern_layers()
+        self._layersets = {}
         self.add_node(self.root, layers={self.ns})
         # metadata shall be stored in the root node's dictionary
         self.node[self.root]['metadata'] = defaultdict(lambda: defaultdict(dict))
         self.sentences = []
         self.tokens = []
 
+    @property
+    def tokens(self):
+        """list of token node IDs in the order they occur in the text"""
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, token_ids):
+        self._tokens = token_ids
+        self._token2position = {}
+        self._invalidate_span_cache()
+
+    @property
+    def token2position(self):
+        """
+        maps from a token node ID to its position in ``self.tokens``.
+
+        The mapping is updated lazily: tokens appended to ``self.tokens`` are
+        added on the next access, a new ``self.tokens`` list (or a list that
+        shrunk) causes a rebuild. Replacing elements of ``self.tokens``
+        in-place isn't detected, so assign a new list instead.
+        """
+        token2position = self._token2position
+        num_of_tokens = len(self._tokens)
+        num_of_positions = len(token2position)
+        if num_of_positions != num_of_tokens:
+            if num_of_positions > num_of_tokens:
+                token2position.clear()
+                num_of_positions = 0
+            for position in xrange(num_of_positions, num_of_tokens):
+                token2position[self._tokens[position]] = position
+            # spans are sorted by token position
+            self._invalidate_span_cache()
+        return token2position
+
     def add_offsets(self, offset_ns=None):
         """
-        adds the onset and offset to each token in the document graph, i.e.
-        the character position where each token starts and ends.
+        calculates the onset and offset of each token in the document graph,
+        i.e. the character position where each token starts and ends.
+
+        The offsets are stored in two ``array('l')`` columns that are aligned
+        with ``self.tokens``. They are recalculated automatically by
+        ``get_offsets()``, if ``self.tokens`` changes.
         """
         if offset_ns is None:
             offset_ns = self.ns
 
+        onsets = array('l')
+        offsets = array('l')
         onset = 0
-        offset = 0
-
-        for token_id, token_str in self.get_tokens():
+        for token_str in self.get_tokens(token_strings_only=True):
             offset = onset + len(token_str)
-            self.node[token_id]['{0}:{1}'.format(offset_ns, 'onset')] = onset
-            self.node[token_id]['{0}:{1}'.format(offset_ns, 'offset')] = offset
+            onsets.append(onset)
+            offsets.append(offset)
             onset = offset + 1
+        self._offsets[offset_ns] = (self._tokens, len(self._tokens),
+                                    onsets, offsets)
+
+    def get_offset_arrays(self, offset_ns=None):
+        """
+        returns the character onsets and offsets of all tokens (in the order
+        they occur in the document, i.e. aligned with ``self.tokens``).
+        Offsets will be added, if they weren't calculated before.
+
+        Parameters
+        ----------
+        offset_ns : str or None
+            The namespace from which the offsets will be retrieved. If no
+            namespace is given, the default namespace of this document graph is
+            chosen
+
+        Returns
+        -------
+        onsets : array.array of int
+            the character onsets of all tokens
+        offsets : array.array of int
+            the character offsets of all tokens
+
+        Note: the arrays are returned without copying them (``memoryview``
+        doesn't support ``array.array`` in Python 2), so they must not be
+        modified.
+        """
+        if offset_ns is None:
+            offset_ns = self.ns
+
+        token_list, num_of_tokens, onsets, offsets = \
+            self._offsets.get(offset_ns, (None, None, None, None))
+        if token_list is not self._tokens or num_of_tokens != len(self._tokens):
+            self.add_offsets(offset_ns)
+            _, _, onsets, offsets = self._offsets[offset_ns]
+        return onsets, offsets
 
     def get_offsets(self, token_node_id=None, offset_ns=None):
         """
@@ -138,23 +273,14 @@ class DiscourseDocumentGraph(MultiDiGraph):
             will be returned, representing all the tokens in the order they
             occur in the document.
         """
-        if offset_ns is None:
-            offset_ns = self.ns
-
-        try:
-            if token_node_id is not None:
-                assert istoken(self, token_node_id), \
-                    "'{}' is not a token node.".format(token_node_id)
-                onset = self.node[token_node_id]['{0}:{1}'.format(offset_ns, 'onset')]
-                offset = self.node[token_node_id]['{0}:{1}'.format(offset_ns, 'offset')]
-                return (onset, offset)
-            else:  # return offsets for all tokens in the document
-                return self._get_all_offsets(offset_ns)
-
-        # if the document doesn't have offsets: add them and rerun this method
-        except KeyError as e:
-            self.add_offsets(offset_ns)
-            return self.get_offsets(token_node_id, offset_ns)
+        if token_node_id is not None:
+            assert istoken(self, token_node_id), \
+                "'{}' is not a token node.".format(token_node_id)
+            onsets, offsets = self.get_offset_arrays(offset_ns)
+            position = self.token2position[token_node_id]
+            return (onsets[position], offsets[position])
+        else:  # return offsets for all tokens in the document
+            return self._get_all_offsets(offset_ns)
 
     def _get_all_offsets(self, offset_ns=None):
         """
@@ -175,10 +301,8 @@ class DiscourseDocumentGraph(MultiDiGraph):
             offset int) tuples, which represents all the tokens in the order
             they occur in the document.
         """
-        for token_id, _token_str in self.get_tokens():
-            onset = self.node[token_id]['{0}:{1}'.format(offset_ns, 'onset')]
-            offset = self.node[token_id]['{0}:{1}'.format(offset_ns, 'offset')]
-            yield (token_id, onset, offset)
+        onsets, offsets = self.get_offset_arrays(offset_ns)
+        return itertools.izip(self._tokens, onsets, offsets)
 
     def get_phrases(self, ns=None, layer='syntax', cat_key='cat', cat_val='NP'):
         """yield all node IDs that dominate the given phrase type, e.g. all NPs"""
@@ -241,13 +365,10 @@ class DiscourseDocumentGraph(MultiDiGraph):
         """
         if not layers:
             layers = {self.ns}
-        assert isinstance(layers, set), \
+        assert isinstance(layers, (set, frozenset)), \
             "'layers' parameter must be given as a set of strings."
         assert all((isinstance(layer, str) for layer in layers)), \
             "All elements of the 'layers' set must be strings."
-        # add layers to keyword arguments dict
-        attr.update({'layers': layers})
-
         # set up attribute dict
         if attr_dict is None:
             attr_dict = attr
@@ -255,22 +376,30 @@ class DiscourseDocumentGraph(MultiDiGraph):
             assert isinstance(attr_dict, dict), \
                 "attr_dict must be a dictionary, not a '{}'".format(type(attr_dict))
             attr_dict.update(attr)
+        self._add_node(n, layers, attr_dict)
 
+    def _add_node(self, n, layers, attr_dict):
+        """
+        adds a node (or updates an existing one) without validating the
+        given layers (cf. ``add_node()``). The given attribute dict will be
+        used as the attribute dict of a new node.
+        """
         # if there's no node with this ID in the graph, yet
         if n not in self.succ:
             self.succ[n] = {}
             self.pred[n] = {}
-            self.node[n] = attr_dict
+            attr_dict['layers'] = self._intern_layers(layers)
+            self.node.add_indexed(n, attr_dict)
         else:  # update attr even if node already exists
             # if a node exists, its attributes will be updated, except
             # for the layers attribute. the value of 'layers' will
             # be the union of the existing layers set and the new one.
-            existing_layers = self.node[n]['layers']
-            all_layers = existing_layers.union(layers)
-            attrs_without_layers = {k: v for (k, v) in attr_dict.items()
-                                    if k != 'layers'}
-            self.node[n].update(attrs_without_layers)
-            self.node[n].update({'layers': all_layers})
+            node_attrs = self.node[n]
+            all_layers = self._intern_layers(
+                node_attrs['layers'].union(layers))
+            node_attrs.update(attr_dict)
+            node_attrs['layers'] = all_layers
+        self._index_node(n, layers)
 
     def add_nodes_from(self, nodes, **attr):
         """Add multiple nodes.
@@ -328,7 +457,7 @@ class DiscourseDocumentGraph(MultiDiGraph):
                     ndict['layers'] = {self.ns}
 
                 layers = ndict['layers']
-                assert isinstance(layers, set), \
+                assert isinstance(layers, (set, frozenset)), \
                     "'layers' must be specified as a set of strings."
                 assert all((isinstance(layer, str) for layer in layers)), \
                     "All elements of the 'layers' set must be strings."
@@ -338,28 +467,33 @@ class DiscourseDocumentGraph(MultiDiGraph):
                     self.pred[node_id] = {}
                     newdict = additional_attribs.copy()
                     newdict.update(ndict)  # all given attribs incl. layers
-                    self.node[node_id] = newdict
+                    newdict['layers'] = self._intern_layers(layers)
+                    self.node.add_indexed(node_id, newdict)
                 else:  # node already exists
                     existing_layers = self.node[node_id]['layers']
-                    all_layers = existing_layers.union(layers)
+                    all_layers = self._intern_layers(
+                        existing_layers.union(layers))
 
                     self.node[node_id].update(ndict)
                     self.node[node_id].update(additional_attribs)
                     self.node[node_id].update({'layers': all_layers})
+                self._index_node(node_id, layers)
                 continue  # process next node
 
             # newnode check didn't raise an exception
             if newnode:  # n is a node_id and it's not in the graph, yet
                 self.succ[n] = {}
                 self.pred[n] = {}
-                self.node[n] = attr.copy()
+                self.node.add_indexed(n, attr.copy())
                 # since the node isn't represented as a
                 # (node_id, attribute dict) tuple, we don't know which layers
                 # it is part of. Therefore, we'll add the namespace of the
                 # graph as the node layer
-                self.node[n].update({'layers': set([self.ns])})
+                self.node[n].update({'layers': self._intern_layers([self.ns])})
+                self._index_node(n, self.node[n]['layers'])
             else:  # n is a node_id and it's already in the graph
                 self.node[n].update(attr)
+                self._invalidate_span_cache()
 
     def add_edge(self, u, v, layers=None, key=None, attr_dict=None, **attr):
         """Add an edge between u and v.
@@ -438,13 +572,10 @@ class DiscourseDocumentGraph(MultiDiGraph):
         """
         if not layers:
             layers = {self.ns}
-        assert isinstance(layers, set), \
+        assert isinstance(layers, (set, frozenset)), \
             "'layers' parameter must be given as a set of strings."
         assert all((isinstance(layer, str) for layer in layers)), \
             "All elements of the 'layers' set must be strings."
-        # add layers to keyword arguments dict
-        attr.update({'layers': layers})
-
         # set up attribute dict
         if attr_dict is None:
             attr_dict = attr
@@ -454,9 +585,17 @@ class DiscourseDocumentGraph(MultiDiGraph):
             except AttributeError as e:
                 raise AttributeError("The attr_dict argument must be "
                                      "a dictionary: ".format(e))
+        self._add_edge(u, v, key, layers, attr_dict)
+
+    def _add_edge(self, u, v, key, layers, attr_dict):
+        """
+        adds an edge (or updates an existing one) without validating the
+        given layers (cf. ``add_edge()``). Nodes that aren't in the graph,
+        yet, are added to the namespace layer of the graph.
+        """
         for node in (u, v):  # u = source, v = target
-            if node not in self.nodes_iter():
-                self.add_node(node, layers={self.ns})
+            if node not in self.succ:
+                self._add_node(node, {self.ns}, {})
 
         if v in self.succ[u]:  # if there's already an edge from u to v
             keydict = self.adj[u][v]
@@ -467,22 +606,26 @@ class DiscourseDocumentGraph(MultiDiGraph):
                 while key in keydict:
                     key += 1
             datadict = keydict.get(key, {})  # works for existing & new edge
-            existing_layers = datadict.get('layers', set())
-            all_layers = existing_layers.union(layers)
+            existing_layers = datadict.get('layers', frozenset())
+            all_layers = self._intern_layers(existing_layers.union(layers))
 
+            if 'edge_type' in datadict:  # the edge type might be overwritten
+                _discard_from_index(self.edgetype2edges,
+                                    datadict['edge_type'], (u, v, key))
             datadict.update(attr_dict)
-            datadict.update({'layers': all_layers})
+            datadict['layers'] = all_layers
             keydict[key] = datadict
 
         else:  # there's no edge between u and v, yet
             # selfloops work this way without special treatment
             if key is None:
                 key = 0
-            datadict = {}
-            datadict.update(attr_dict)  # includes layers
+            datadict = dict(attr_dict)
+            datadict['layers'] = self._intern_layers(layers)
             keydict = {key: datadict}
             self.succ[u][v] = keydict
             self.pred[v][u] = keydict
+        self._index_edge(u, v, key, layers)
 
     def add_edges_from(self, ebunch, attr_dict=None, **attr):
         """Add all the edges in ebunch.
@@ -573,14 +716,14 @@ class DiscourseDocumentGraph(MultiDiGraph):
                 dd['layers'] = {self.ns}
 
             layers = dd['layers']
-            assert isinstance(layers, set), \
+            assert isinstance(layers, (set, frozenset)), \
                 "'layers' must be specified as a set of strings."
             assert all((isinstance(layer, str)
                         for layer in layers)), \
                 "All elements of the 'layers' set must be strings."
             additional_layers = attr_dict.get('layers', {})
             if additional_layers:
-                assert isinstance(additional_layers, set), \
+                assert isinstance(additional_layers, (set, frozenset)), \
                     "'layers' must be specified as a set of strings."
                 assert all((isinstance(layer, str)
                             for layer in additional_layers)), \
@@ -625,19 +768,172 @@ class DiscourseDocumentGraph(MultiDiGraph):
         assert isinstance(layer, str), "Layers must be strings!"
         if isinstance(element, tuple): # edge repr. by (source, target)
             assert len(element) == 2
-            assert all(isinstance(node, (str, int)) for node in element)
+            assert all(isinstance(node, (basestring, int)) for node in element)
             source_id, target_id = element
             # this class is based on a multi-digraph, so we'll have to iterate
             # over all edges between the two nodes (even if there's just one)
             edges = self.edge[source_id][target_id]
             for edge in edges:
                 existing_layers = edges[edge]['layers']
-                existing_layers.add(layer)
-                edges[edge]['layers'] = existing_layers
-        if isinstance(element, (str, int)): # node
+                edges[edge]['layers'] = self._intern_layers(
+                    existing_layers.union([layer]))
+                self.layer2edges[layer].add((source_id, target_id, edge))
+        if isinstance(element, (basestring, int)): # node
             existing_layers = self.node[element]['layers']
-            existing_layers.add(layer)
-            self.node[element]['layers'] = existing_layers
+            self.node[element]['layers'] = self._intern_layers(
+                existing_layers.union([layer]))
+            self.layer2nodes[layer].add(element)
+
+    def set_node_layers(self, node_id, layers):
+        """
+        replaces the set of layers of an existing node (instead of adding
+        to it like ``add_node`` and ``add_layer`` do), cf. #141.
+
+        Parameters
+        ----------
+        node_id : str or int
+            the ID of an existing node
+        layers : set of str
+            the new set of layers the node belongs to
+        """
+        assert isinstance(layers, (set, frozenset)), \
+            "'layers' parameter must be given as a set of strings."
+        assert all((isinstance(layer, str) for layer in layers)), \
+            "All elements of the 'layers' set must be strings."
+        for layer in self.node[node_id]['layers']:
+            _discard_from_index(self.layer2nodes, layer, node_id)
+        self.node[node_id]['layers'] = self._intern_layers(layers)
+        self._index_node(node_id, layers)
+
+    def _intern_layers(self, layers):
+        """
+        returns the frozenset of the given layers from the interning table
+        of the graph, i.e. nodes/edges that belong to the same layers share
+        one (immutable) layer set instead of storing their own copies.
+        """
+        layers = frozenset(layers)
+        return self._layersets.setdefault(layers, layers)
+
+    def _invalidate_span_cache(self):
+        """
+        empties the span cache. This needs to be called whenever nodes/edges
+        are added/removed or when token node attributes are changed directly.
+        """
+        if getattr(self, '_span_cache', None):
+            self._span_cache = {}
+
+    def _index_node(self, node_id, layers):
+        """adds a node to the layer index and assigns it a rank, if needed"""
+        self._invalidate_span_cache()
+        if node_id not in self.node2rank:
+            self.node2rank[node_id] = self._next_node_rank
+            self._next_node_rank += 1
+        for layer in layers:
+            self.layer2nodes[layer].add(node_id)
+
+    def _index_edge(self, source_id, target_id, key, layers):
+        """
+        adds an edge (identified by source, target and key) to the layer
+        and edge type index
+        """
+        self._invalidate_span_cache()
+        for layer in layers:
+            self.layer2edges[layer].add((source_id, target_id, key))
+        edge_attrs = self.succ[source_id][target_id][key]
+        if 'edge_type' in edge_attrs:
+            self.edgetype2edges[edge_attrs['edge_type']].add(
+                (source_id, target_id, key))
+
+    def _unindex_node(self, node_id):
+        """
+        removes a node and all its in- and outgoing edges from the layer index
+        """
+        self._invalidate_span_cache()
+        for layer in self.node[node_id]['layers']:
+            _discard_from_index(self.layer2nodes, layer, node_id)
+        for target_id, keydict in self.succ[node_id].iteritems():
+            for key in keydict:
+                self._unindex_edge(node_id, target_id, key)
+        for source_id, keydict in self.pred[node_id].iteritems():
+            if source_id != node_id:  # self-loops were already removed
+                for key in keydict:
+                    self._unindex_edge(source_id, node_id, key)
+        del self.node2rank[node_id]
+
+    def _unindex_edge(self, source_id, target_id, key):
+        """removes an edge from the layer and edge type index"""
+        self._invalidate_span_cache()
+        edge_attrs = self.succ[source_id][target_id][key]
+        for layer in edge_attrs['layers']:
+            _discard_from_index(self.layer2edges, layer,
+                                (source_id, target_id, key))
+        if 'edge_type' in edge_attrs:
+            _discard_from_index(self.edgetype2edges, edge_attrs['edge_type'],
+                                (source_id, target_id, key))
+
+    def remove_node(self, n):
+        """Remove node n and all adjacent edges (and update the layer index).
+
+        Attempting to remove a non-existent node will raise a
+        ``NetworkXError``.
+        """
+        if n in self.node:
+            self._unindex_node(n)
+        super(DiscourseDocumentGraph, self).remove_node(n)
+
+    def remove_nodes_from(self, nbunch):
+        """Remove multiple nodes. Nodes that aren't in the graph are ignored."""
+        for n in nbunch:
+            if n in self.node:
+                self.remove_node(n)
+
+    def remove_edge(self, u, v, key=None):
+        """Remove an edge between u and v (and update the layer index).
+
+        If no key is given, an arbitrary edge between u and v will be removed.
+        """
+        if u in self.succ and v in self.succ[u]:
+            keydict = self.succ[u][v]
+            if key is None and keydict:  # remove an arbitrary edge
+                key = keydict.keys()[-1]
+            if key in keydict:
+                self._unindex_edge(u, v, key)
+        super(DiscourseDocumentGraph, self).remove_edge(u, v, key=key)
+
+    def clear(self):
+        """Remove all nodes and edges from the graph (incl. the index)."""
+        super(DiscourseDocumentGraph, self).clear()
+        self.layer2nodes.clear()
+        self.layer2edges.clear()
+        self.edgetype2edges.clear()
+        self.node2rank.clear()
+        self._invalidate_span_cache()
+
+    def _rebuild_index(self):
+        """
+        recreates the layer and edge type index and the node ranks from
+        scratch, e.g. after the nodes were relabeled.
+        """
+        self.node.bypassed = False
+        self.layer2nodes = defaultdict(set)
+        self.layer2edges = defaultdict(set)
+        self.edgetype2edges = defaultdict(set)
+        self.node2rank = {}
+        for rank, (node_id, node_attrs) in enumerate(self.node.iteritems()):
+            self.node2rank[node_id] = rank
+            for layer in node_attrs['layers']:
+                self.layer2nodes[layer].add(node_id)
+        self._next_node_rank = len(self.node2rank)
+
+        for source_id, targets in self.succ.iteritems():
+            for target_id, keydict in targets.iteritems():
+                for key, edge_attrs in keydict.iteritems():
+                    edge = (source_id, target_id, key)
+                    for layer in edge_attrs['layers']:
+                        self.layer2edges[layer].add(edge)
+                    if 'edge_type' in edge_attrs:
+                        self.edgetype2edges[edge_attrs['edge_type']].add(edge)
+        self._invalidate_span_cache()
 
 
     def get_token(self, token_node_id, token_attrib='token'):
@@ -759,6 +1055,1460 @@ class DiscourseDocumentGraph(MultiDiGraph):
                           layers={self.ns, self.ns+':precedence'},
                           edge_type=EdgeTypes.precedence_relation)
 
+    def freeze(self):
+        """
+        returns an immutable, compact snapshot of this document graph, which
+        is much faster and smaller for read-only analyses (cf.
+        ``FrozenDocumentGraph``). Later changes to this graph are not
+        reflected in the snapshot.
+        """
+        return FrozenDocumentGraph(self)
+
+    def _init_transient_attributes(self):
+        """
+        (re)creates the attributes listed in ``_transient_attributes``,
+        e.g. after the graph was unpickled or thawed.
+        """
+        pass
+
+    def __getstate__(self):
+        """
+        returns the state of the document graph for pickling, i.e. the
+        compact binary representation of its frozen snapshot (cf.
+        ``readwrite.binary``). Unlike the instance attributes, it contains
+        no lambdas (the root node metadata) and bound methods.
+        """
+        from discoursegraphs.readwrite.binary import dumps_binary
+        return dumps_binary(self)
+
+    def __setstate__(self, state):
+        """restores an unpickled document graph (cf. ``__getstate__()``)"""
+        from discoursegraphs.readwrite.binary import loads_binary
+        loads_binary(state, frozen=True)._thaw(copy_values=False,
+                                               docgraph=self)
+
+    def __deepcopy__(self, memo):
+        """copies all instance attributes (instead of the pickled state)"""
+        docgraph = self.__class__.__new__(self.__class__)
+        memo[id(self)] = docgraph
+        docgraph.__dict__.update(deepcopy(self.__dict__, memo))
+        return docgraph
+
+    def copy(self):
+        """
+        returns an independent copy of the document graph, which is much
+        faster to create (and smaller) than a ``deepcopy()``.
+
+        The adjacency and the index are rebuilt. Immutable attribute values
+        (e.g. strings and the interned layer sets) are shared with this
+        graph, only mutable ones (e.g. lists or the document metadata of
+        the root node) are deep-copied.
+        """
+        docgraph = self.__class__.__new__(self.__class__)
+        MultiDiGraph.__init__(docgraph)
+        docgraph.__dict__.update(deepcopy({
+            attrib: value for attrib, value in self.__dict__.iteritems()
+            if attrib not in _DOCGRAPH_ATTRIBUTES
+            and attrib not in self._transient_attributes}))
+        docgraph.graph.update(self.graph)
+        docgraph.name = self.name
+        docgraph.ns = self.ns
+        docgraph.root = self.root
+
+        for node_id, node_attrs in self.node.iteritems():
+            docgraph.node.add_indexed(node_id, _copy_attrs(node_attrs))
+        for source_id, targets in self.succ.iteritems():
+            docgraph.succ[source_id] = targets_copy = targets.__class__()
+            for target_id, keydict in targets.iteritems():
+                targets_copy[target_id] = keydict.__class__(
+                    (key, _copy_attrs(edge_attrs))
+                    for key, edge_attrs in keydict.iteritems())
+        for target_id, sources in self.pred.iteritems():
+            docgraph.pred[target_id] = sources_copy = sources.__class__()
+            for source_id in sources:
+                # share the key dicts with the successors (like networkx)
+                sources_copy[source_id] = docgraph.succ[source_id][target_id]
+
+        docgraph.layer2nodes = defaultdict(set, {
+            layer: set(nodes) for layer, nodes in self.layer2nodes.iteritems()})
+        docgraph.layer2edges = defaultdict(set, {
+            layer: set(edges) for layer, edges in self.layer2edges.iteritems()})
+        docgraph.edgetype2edges = defaultdict(set, {
+            edge_type: set(edges)
+            for edge_type, edges in self.edgetype2edges.iteritems()})
+        docgraph.node2rank = dict(self.node2rank)
+        docgraph._next_node_rank = self._next_node_rank
+        docgraph._layersets = dict(self._layersets)
+        docgraph._offsets = {}
+        docgraph.tokens = list(self.tokens)
+        docgraph._span_cache = dict(self._span_cache)
+        if hasattr(self, 'sentences'):
+            docgraph.sentences = self.sentences[:]
+        docgraph._init_transient_attributes()
+        return docgraph
+
+
+class DocumentGraphBuilder(object):
+    """
+    Collects nodes and edges in flat lists and adds them to a document
+    graph in one go, which is much faster than calling ``add_node()`` and
+    ``add_edge()`` for each of them. The layers of all buffered
+    nodes/edges are validated once per distinct layer set on ``commit()``.
+
+    The builder can also be used as a context manager, which commits all
+    buffered nodes and edges when the ``with`` block is left without an
+    exception::
+
+        with DocumentGraphBuilder(docgraph) as builder:
+            builder.add_node('t1', layers={'foo', 'foo:token'})
+            builder.add_edge(docgraph.root, 't1', layers={'foo'})
+
+    On commit, all buffered nodes are added (in the order they were
+    buffered) before all buffered edges. Adding the same node/edge more
+    than once has the same effect as calling ``add_node()``/``add_edge()``
+    repeatedly, i.e. attributes are updated and layers are merged. Nodes
+    that are neither buffered nor part of the graph are created by the
+    edges that connect them (in the namespace layer of the graph).
+
+    Attributes
+    ----------
+    docgraph : DiscourseDocumentGraph
+        the document graph that the nodes and edges will be added to
+    """
+    def __init__(self, docgraph):
+        self.docgraph = docgraph
+        # (node ID, layers, attribute dict) tuples
+        self._nodes = []
+        # (source ID, target ID, key, layers, attribute dict) tuples
+        self._edges = []
+        self._node_ids = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def __contains__(self, node_id):
+        """
+        returns True, iff the node is part of the graph or has been
+        buffered (explicitly, i.e. not as part of a buffered edge).
+        """
+        return node_id in self._node_ids or node_id in self.docgraph.succ
+
+    def _layers(self, layers):
+        """
+        returns the given layers as a frozenset (or the namespace of the
+        graph, if no layers are given). The elements of the set are only
+        validated on commit.
+        """
+        if not layers:
+            return frozenset([self.docgraph.ns])
+        assert isinstance(layers, (set, frozenset)), \
+            "'layers' parameter must be given as a set of strings."
+        return frozenset(layers)
+
+    def add_node(self, n, layers=None, attr_dict=None, **attr):
+        """
+        buffers a node (cf. ``DiscourseDocumentGraph.add_node()``).
+        """
+        if attr_dict is None:
+            attr_dict = attr
+        else:
+            attr_dict.update(attr)
+        self._nodes.append((n, self._layers(layers), attr_dict))
+        self._node_ids.add(n)
+
+    def add_nodes_from(self, nodes):
+        """
+        buffers (node ID, attribute dict) tuples. If an attribute dict
+        contains a 'layers' key, its value will be used as the layers of
+        the node.
+        """
+        for node_id, attr_dict in nodes:
+            attr_dict = dict(attr_dict)
+            self.add_node(node_id, attr_dict.pop('layers', None), attr_dict)
+
+    def add_edge(self, u, v, layers=None, key=None, attr_dict=None, **attr):
+        """
+        buffers an edge (cf. ``DiscourseDocumentGraph.add_edge()``).
+        """
+        if attr_dict is None:
+            attr_dict = attr
+        else:
+            attr_dict.update(attr)
+        self._edges.append((u, v, key, self._layers(layers), attr_dict))
+
+    def add_edges_from(self, ebunch):
+        """
+        buffers (source ID, target ID, attribute dict) and (source ID,
+        target ID, key, attribute dict) tuples. If an attribute dict
+        contains a 'layers' key, its value will be used as the layers of
+        the edge.
+        """
+        for edge in ebunch:
+            if len(edge) == 4:
+                u, v, key, attr_dict = edge
+            elif len(edge) == 3:
+                u, v, attr_dict = edge
+                key = None
+            else:
+                raise AttributeError(
+                    "Edge tuple {0} must be a 3-tuple (u,v,attribs) "
+                    "or 4-tuple (u,v,key,attribs).".format(edge))
+            attr_dict = dict(attr_dict)
+            self.add_edge(u, v, attr_dict.pop('layers', None), key, attr_dict)
+
+    def validate(self):
+        """
+        checks the layers of all buffered nodes and edges (once per
+        distinct layer set).
+
+        Raises
+        ------
+        AssertionError
+            if one of the layer sets contains a non-string element
+        """
+        layersets = set(layers for (_, layers, _) in self._nodes)
+        layersets.update(edge[3] for edge in self._edges)
+        for layers in layersets:
+            assert all(isinstance(layer, str) for layer in layers), \
+                "All elements of the 'layers' set must be strings."
+
+    def commit(self):
+        """
+        validates all buffered nodes and edges, adds them to the document
+        graph and empties the buffer.
+
+        Returns
+        -------
+        docgraph : DiscourseDocumentGraph
+            the document graph that the nodes and edges were added to
+        """
+        self.validate()
+        docgraph = self.docgraph
+        for node_id, layers, attr_dict in self._nodes:
+            docgraph._add_node(node_id, layers, attr_dict)
+        for source_id, target_id, key, layers, attr_dict in self._edges:
+            docgraph._add_edge(source_id, target_id, key, layers, attr_dict)
+        self._nodes = []
+        self._edges = []
+        self._node_ids = set()
+        return docgraph
+
+
+class FrozenDocumentGraph(object):
+    """
+    An immutable, compact snapshot of a ``DiscourseDocumentGraph`` for
+    read-only analyses (cf. ``DiscourseDocumentGraph.freeze()``).
+
+    Internally, nodes and edges are represented by consecutive integers
+    (in the order of ``docgraph.nodes_iter()`` and the order of the
+    outgoing edges of each node). The adjacency of the graph is stored in
+    compressed sparse row (CSR) arrays, layer sets as codes of interned
+    frozensets and all other attributes in columns of codes of interned
+    values. The ``select_*``, ``get_span``, ``get_text``, ``tokens2text``,
+    ``istoken``, ``is_continuous`` and ``get_pointing_chains`` functions
+    of this module accept a frozen graph instead of a document graph.
+
+    Node and edge attribute dicts returned by a frozen graph are created on
+    demand, i.e. modifying them will not alter the graph.
+
+    Attributes
+    ----------
+    name : str
+        name of the document graph
+    ns : str
+        the namespace of the document graph
+    root : str
+        the root node ID of the document graph
+    graph : dict
+        (a copy of) the graph attributes of the document graph
+    tokens : tuple of str
+        the token node IDs in the order they occur in the text
+    token2position : dict of (str, int)
+        maps from a token node ID to its position in ``tokens``
+    sentences : tuple of str
+        the sentence root node IDs of the document graph
+    """
+    def __init__(self, docgraph):
+        """
+        Parameters
+        ----------
+        docgraph : DiscourseDocumentGraph
+            the document graph to create a snapshot of
+        """
+        self.name = docgraph.name
+        self.ns = docgraph.ns
+        self.root = docgraph.root
+        self.graph = dict(docgraph.graph)
+        self.tokens = tuple(docgraph.tokens)
+        self.token2position = dict(docgraph.token2position)
+        self.sentences = tuple(getattr(docgraph, 'sentences', ()))
+
+        # the class of the document graph and those of its instance
+        # attributes that aren't represented otherwise (e.g. the ``edus``
+        # of an RSTGraph) are needed to thaw the snapshot
+        self._docgraph_class = docgraph.__class__
+        self._extra_state = deepcopy({
+            attrib: value for attrib, value in docgraph.__dict__.iteritems()
+            if attrib not in _DOCGRAPH_ATTRIBUTES
+            and attrib not in docgraph._transient_attributes})
+
+        self._node_ids = tuple(docgraph.nodes_iter())
+        self._node2int = {node_id: i for i, node_id in enumerate(self._node_ids)}
+        num_of_nodes = len(self._node_ids)
+
+        # layer set codes refer to ``self._layersets``, code 0 represents
+        # a node/edge without a ``layers`` attribute
+        self._layersets = [None]
+        layerset2code = {}
+
+        node_attribs = [docgraph.node[node_id] for node_id in self._node_ids]
+        self._node_layers = _code_array(
+            [_layerset_code(attribs, self._layersets, layerset2code)
+             for attribs in node_attribs], len(self._layersets))
+        self._node_columns = _attribute_columns(node_attribs)
+
+        # CSR representation of the outgoing edges: the outgoing edges of
+        # node i are the edges self._out_ptr[i] to self._out_ptr[i+1]-1
+        self._out_ptr = array('l', [0])
+        edge_targets = []
+        edge_keys = []
+        edge_attribs = []
+        for node_id in self._node_ids:
+            for target_id, keydict in docgraph.succ[node_id].iteritems():
+                target = self._node2int[target_id]
+                for key, attribs in keydict.iteritems():
+                    edge_targets.append(target)
+                    edge_keys.append(key)
+                    edge_attribs.append(attribs)
+            self._out_ptr.append(len(edge_targets))
+        self._edge_targets = array('l', edge_targets)
+        self._edge_keys = tuple(edge_keys)
+        self._edge_sources = array('l', itertools.chain.from_iterable(
+            itertools.repeat(i, self._out_ptr[i+1] - self._out_ptr[i])
+            for i in xrange(num_of_nodes)))
+        self._edge_layers = _code_array(
+            [_layerset_code(attribs, self._layersets, layerset2code)
+             for attribs in edge_attribs], len(self._layersets))
+        self._edge_columns = _attribute_columns(edge_attribs)
+        self._layersets = tuple(self._layersets)
+
+        # CSR representation of the ingoing edges: the IDs of the ingoing
+        # edges of node i are self._in_edges[self._in_ptr[i]:self._in_ptr[i+1]]
+        in_degrees = [0] * (num_of_nodes + 1)
+        for target in edge_targets:
+            in_degrees[target+1] += 1
+        self._in_ptr = array('l', _cumsum(in_degrees))
+        fill = list(self._in_ptr)
+        self._in_edges = array('l', [0] * len(edge_targets))
+        for edge, target in enumerate(edge_targets):
+            self._in_edges[fill[target]] = edge
+            fill[target] += 1
+
+        # maps from a layer to the ascending array of nodes/edges in it
+        self._layer2nodes = _layer_index(self._node_layers, self._layersets)
+        self._layer2edges = _layer_index(self._edge_layers, self._layersets)
+
+        # maps from a node to the tuple of token nodes it dominates/spans
+        self._span_cache = {}
+
+    def __repr__(self):
+        return "<FrozenDocumentGraph '{0}' ({1} nodes, {2} edges)>".format(
+            self.name, self.number_of_nodes(), self.number_of_edges())
+
+    def __getstate__(self):
+        from discoursegraphs.readwrite.binary import dumps_binary
+        return dumps_binary(self)
+
+    def __setstate__(self, state):
+        from discoursegraphs.readwrite.binary import loads_binary
+        self.__dict__.update(loads_binary(state, frozen=True).__dict__)
+
+    def thaw(self):
+        """
+        returns a (mutable) document graph with the same nodes, edges,
+        attributes and tokens as this snapshot. It is an instance of the
+        class of the document graph the snapshot was created from.
+        """
+        return self._thaw(copy_values=True)
+
+    def _thaw(self, copy_values, docgraph=None):
+        """
+        creates a document graph from the snapshot (cf. ``thaw()``). If
+        ``copy_values`` is False, unhashable attribute values (e.g. lists)
+        are shared between the snapshot and the document graph.
+
+        If an (uninitialized) instance of the document graph class is given,
+        it is filled instead of a new one (cf. ``__setstate__()``).
+        """
+        if docgraph is None:
+            docgraph_class = self._docgraph_class
+            docgraph = docgraph_class.__new__(docgraph_class)
+        MultiDiGraph.__init__(docgraph)
+        docgraph.graph.update(self.graph)
+        docgraph.name = self.name
+        docgraph.ns = self.ns
+        docgraph.root = self.root
+
+        node_ids = self._node_ids
+        node_attribs = _attrib_dicts(
+            self._node_columns, self._layersets, self._node_layers,
+            copy_values)
+        for node_id, attribs in itertools.izip(node_ids, node_attribs):
+            docgraph.node.add_indexed(node_id, attribs)
+            docgraph.succ[node_id] = {}
+            docgraph.pred[node_id] = {}
+
+        edge_attribs = _attrib_dicts(
+            self._edge_columns, self._layersets, self._edge_layers,
+            copy_values)
+        edge_ids = []
+        for edge, attribs in enumerate(edge_attribs):
+            source_id = node_ids[self._edge_sources[edge]]
+            target_id = node_ids[self._edge_targets[edge]]
+            key = self._edge_keys[edge]
+            keydict = docgraph.succ[source_id].get(target_id)
+            if keydict is None:
+                keydict = docgraph.succ[source_id][target_id] = {}
+                docgraph.pred[target_id][source_id] = keydict
+            keydict[key] = attribs
+            edge_ids.append((source_id, target_id, key))
+
+        docgraph.layer2nodes = defaultdict(set, {
+            layer: set(node_ids[node] for node in nodes)
+            for layer, nodes in self._layer2nodes.iteritems()})
+        docgraph.layer2edges = defaultdict(set, {
+            layer: set(edge_ids[edge] for edge in edges)
+            for layer, edges in self._layer2edges.iteritems()})
+        docgraph.edgetype2edges = defaultdict(set)
+        if 'edge_type' in self._edge_columns:
+            codes, values = self._edge_columns['edge_type']
+            for edge, code in enumerate(codes):
+                if code:
+                    docgraph.edgetype2edges[values[code]].add(edge_ids[edge])
+        docgraph.node2rank = {node_id: rank
+                              for rank, node_id in enumerate(node_ids)}
+        docgraph._next_node_rank = len(node_ids)
+        docgraph._span_cache = {}
+        docgraph._offsets = {}
+        docgraph._layersets = {layers: layers
+                               for layers in self._layersets[1:]}
+        docgraph.tokens = list(self.tokens)
+        docgraph.sentences = list(self.sentences)
+        docgraph.__dict__.update(
+            deepcopy(self._extra_state) if copy_values else self._extra_state)
+        docgraph._init_transient_attributes()
+        return docgraph
+
+    def __len__(self):
+        return len(self._node_ids)
+
+    def __iter__(self):
+        return iter(self._node_ids)
+
+    def __contains__(self, node_id):
+        return node_id in self._node2int
+
+    def number_of_nodes(self):
+        """returns the number of nodes in the graph"""
+        return len(self._node_ids)
+
+    def number_of_edges(self):
+        """returns the number of edges in the graph"""
+        return len(self._edge_targets)
+
+    def node_attribs(self, node_id):
+        """returns (a copy of) the attribute dict of the given node"""
+        return self._node_attribs(self._node2int[node_id])
+
+    def _node_attribs(self, node):
+        return _attribs(self._node_columns, self._layersets,
+                        self._node_layers, node)
+
+    def _edge_attribs(self, edge):
+        return _attribs(self._edge_columns, self._layersets,
+                        self._edge_layers, edge)
+
+    def _edge_tuple(self, edge, data=False):
+        source_id = self._node_ids[self._edge_sources[edge]]
+        target_id = self._node_ids[self._edge_targets[edge]]
+        if data:
+            return (source_id, target_id, self._edge_attribs(edge))
+        return (source_id, target_id)
+
+    def _node_tuple(self, node, data=False):
+        if data:
+            return (self._node_ids[node], self._node_attribs(node))
+        return self._node_ids[node]
+
+    def nodes_iter(self, data=False):
+        """yields all node IDs (or (node ID, attrib dict) tuples)"""
+        for node in xrange(len(self._node_ids)):
+            yield self._node_tuple(node, data)
+
+    def nodes(self, data=False):
+        """returns a list of all node IDs (or (node ID, attrib dict) tuples)"""
+        return list(self.nodes_iter(data=data))
+
+    def edges_iter(self, data=False):
+        """
+        yields all edges as (source ID, target ID) tuples (or
+        (source ID, target ID, attrib dict) tuples)
+        """
+        for edge in xrange(len(self._edge_targets)):
+            yield self._edge_tuple(edge, data)
+
+    def edges(self, data=False):
+        """
+        returns a list of all edges as (source ID, target ID) tuples (or
+        (source ID, target ID, attrib dict) tuples)
+        """
+        return list(self.edges_iter(data=data))
+
+    def _out_edges(self, node):
+        return xrange(self._out_ptr[node], self._out_ptr[node+1])
+
+    def _in_edges_of(self, node):
+        return self._in_edges[self._in_ptr[node]:self._in_ptr[node+1]]
+
+    def out_edges_iter(self, node_id, data=False):
+        """yields all outgoing edges of the given node"""
+        for edge in self._out_edges(self._node2int[node_id]):
+            yield self._edge_tuple(edge, data)
+
+    def in_edges_iter(self, node_id, data=False):
+        """yields all ingoing edges of the given node"""
+        for edge in self._in_edges_of(self._node2int[node_id]):
+            yield self._edge_tuple(edge, data)
+
+    def _successors(self, node):
+        """returns the (unique) successors of the given node"""
+        targets = self._edge_targets[self._out_ptr[node]:self._out_ptr[node+1]]
+        return OrderedDict.fromkeys(targets).keys()
+
+    def successors_iter(self, node_id):
+        """yields the IDs of all successors of the given node"""
+        for target in self._successors(self._node2int[node_id]):
+            yield self._node_ids[target]
+
+    neighbors_iter = successors_iter
+
+    def predecessors_iter(self, node_id):
+        """yields the IDs of all predecessors of the given node"""
+        sources = OrderedDict.fromkeys(
+            self._edge_sources[edge]
+            for edge in self._in_edges_of(self._node2int[node_id]))
+        for source in sources:
+            yield self._node_ids[source]
+
+    def get_token(self, token_node_id, token_attrib='token'):
+        """given a token node ID, returns the token unicode string."""
+        codes, values = self._node_columns[self.ns+':'+token_attrib]
+        code = codes[self._node2int[token_node_id]]
+        if not code:
+            raise KeyError(self.ns+':'+token_attrib)
+        return values[code]
+
+    def get_tokens(self, token_attrib='token', token_strings_only=False):
+        """
+        yields (token node ID, token) tuples (or token strings only)
+        of the document (in the order they occur).
+        """
+        for token_id in self.tokens:
+            token = self.get_token(token_id, token_attrib)
+            yield token if token_strings_only else (token_id, token)
+
+    def istoken(self, node_id, namespace=None):
+        """returns true, iff the given node ID belongs to a token node."""
+        if namespace is None:
+            namespace = self.ns
+        column = self._node_columns.get(namespace+':token')
+        return bool(column and column[0][self._node2int[node_id]])
+
+    def _layer_members(self, layer, layer_index):
+        """
+        returns the ascending list of nodes/edges that belong to (any of)
+        the given layer(s)
+        """
+        if isinstance(layer, basestring):
+            return layer_index.get(layer, ())
+        members = set()
+        for l in layer:
+            members.update(layer_index.get(l, ()))
+        return sorted(members)
+
+    def _has_layer(self, layerset_code, layer):
+        layers = self._layersets[layerset_code] or ()
+        if isinstance(layer, basestring):
+            return layer in layers
+        return any(l in layers for l in layer)
+
+    def _matches(self, columns, attribute, value):
+        """
+        returns a function that checks for a given node/edge, if it has the
+        given attribute (with one of the given values).
+        """
+        if attribute is None:
+            return lambda element: True
+        if attribute == 'layers':  # layer sets aren't stored in a column
+            layerset_codes = (self._node_layers
+                              if columns is self._node_columns
+                              else self._edge_layers)
+            wanted = set(code for code, layers in enumerate(self._layersets)
+                         if layers is not None and (
+                             value is None or layers in _as_values(value)))
+            return lambda element: layerset_codes[element] in wanted
+        if attribute not in columns:
+            return lambda element: False
+
+        codes, values = columns[attribute]
+        if value is None:
+            return lambda element: codes[element] != 0
+        wanted = set(code for code, val in enumerate(values)
+                     if code and val in _as_values(value))
+        return lambda element: codes[element] in wanted
+
+    def select_nodes_by_layer(self, layer=None, data=False):
+        """yields all nodes belonging to (any of) the given layer(s)."""
+        if layer is None:
+            nodes = xrange(len(self._node_ids))
+        else:
+            nodes = self._layer_members(layer, self._layer2nodes)
+        for node in nodes:
+            yield self._node_tuple(node, data)
+
+    def select_nodes_by_attribute(self, attribute=None, value=None,
+                                  data=False):
+        """yields all nodes with the given attribute (and attribute value)."""
+        matches = self._matches(self._node_columns, attribute, value)
+        for node in xrange(len(self._node_ids)):
+            if matches(node):
+                yield self._node_tuple(node, data)
+
+    def select_neighbors_by_layer(self, node_id, layer, data=False):
+        """
+        yields all neighbors (i.e. successors) of the given node
+        that belong to (any of) the given layer(s).
+        """
+        for target in self._successors(self._node2int[node_id]):
+            if self._has_layer(self._node_layers[target], layer):
+                yield self._node_tuple(target, data)
+
+    def select_neighbors_by_edge_attribute(self, source_id, attribute=None,
+                                           value=None, data=False):
+        """yields all neighbors with the given edge attribute value(s)."""
+        matches = self._matches(self._edge_columns, attribute, value)
+        # a neighbor is selected, if any of the edges to it matches
+        neighbors = OrderedDict()
+        for edge in self._out_edges(self._node2int[source_id]):
+            target = self._edge_targets[edge]
+            neighbors[target] = neighbors.get(target, False) or matches(edge)
+        for target, has_value in neighbors.iteritems():
+            if has_value:
+                yield self._node_tuple(target, data)
+
+    def select_edges_by_attribute(self, attribute=None, value=None,
+                                  data=False):
+        """yields all edges with the given attribute (and attribute value)."""
+        matches = self._matches(self._edge_columns, attribute, value)
+        for edge in xrange(len(self._edge_targets)):
+            if matches(edge):
+                yield self._edge_tuple(edge, data)
+
+    def select_edges_by(self, layer=None, edge_type=None, data=False):
+        """yields all edges with the given edge type and layer."""
+        if layer is None:
+            edges = xrange(len(self._edge_targets))
+        else:
+            edges = self._layer_members(layer, self._layer2edges)
+        if edge_type is None:
+            matches = lambda edge: True
+        else:
+            matches = self._matches(self._edge_columns, 'edge_type',
+                                    edge_type)
+        for edge in edges:
+            if matches(edge):
+                yield self._edge_tuple(edge, data)
+
+    def get_span(self, node_id):
+        """
+        returns the sorted list of token node IDs that are dominated
+        or spanned by the given node.
+        """
+        if node_id not in self._span_cache:
+            self._compute_spans([node_id])
+        return list(self._span_cache[node_id])
+
+    def compute_all_spans(self):
+        """
+        returns a dict that maps from each node ID to the sorted tuple of
+        the token node IDs it dominates or spans.
+        """
+        self._compute_spans(self._node_ids)
+        return dict(self._span_cache)
+
+    def _span_children(self, node_id):
+        """
+        yields the targets of all outgoing edges of the given node except
+        for self-loops and pointing relations.
+        """
+        node = self._node2int[node_id]
+        edge_types = self._edge_columns.get('edge_type')
+        for edge in self._out_edges(node):
+            target = self._edge_targets[edge]
+            if target == node:
+                continue
+            if edge_types:
+                codes, values = edge_types
+                if values[codes[edge]] == EdgeTypes.pointing_relation:
+                    continue
+            yield self._node_ids[target]
+
+    def _compute_spans(self, node_ids):
+        """
+        computes the spans of the given nodes with the module-level
+        ``_compute_spans()`` function
+        """
+        _compute_spans(self, node_ids,
+                       span_children=FrozenDocumentGraph._span_children,
+                       is_token=self.istoken)
+
+    def get_text(self, node_id=None):
+        """
+        returns the text (joined token strings) that the given node
+        dominates or spans (or the complete text of the document).
+        """
+        token_ids = self.get_span(node_id) if node_id else self.tokens
+        return self.tokens2text(token_ids)
+
+    def tokens2text(self, token_ids):
+        """returns the concatenated token strings of the given tokens."""
+        return ' '.join(self.get_token(token_id) for token_id in token_ids)
+
+
+class MergedDocumentGraph(object):
+    """
+    A read-only overlay of several document graphs that annotate the same
+    text with the same tokenization (e.g. the annotation layers of a PCC
+    document). It answers node, edge, layer and span queries as if the
+    graphs had been merged with ``DiscourseDocumentGraph.merge_graphs()``,
+    but neither copies nor changes them: the token node IDs of all graphs
+    are mapped onto those of the first graph that has tokens and the root
+    nodes of the other graphs onto the root node of the first graph. Like
+    in ``merge_rootnodes()``, the outgoing edges of the other root nodes
+    only belong to the namespace layer of the merged graph.
+    The ``select_*``, ``get_span``, ``get_text``, ``tokens2text``,
+    ``istoken``, ``is_continuous`` and ``get_pointing_chains`` functions
+    of this module accept a merged graph instead of a document graph.
+    Use ``materialize()`` to create a real, merged document graph.
+
+    The attribute dicts of nodes that occur in more than one graph (e.g.
+    tokens) are combined on demand. All other attribute dicts are those of
+    the underlying graphs, so they must not be modified.
+
+    Attributes
+    ----------
+    docgraphs : list of DiscourseDocumentGraph
+        the merged document graphs (in the order they are merged)
+    name : str
+        name of the merged graph (i.e. of the first graph that has one)
+    ns : str
+        the namespace of the first document graph
+    root : str
+        the root node ID of the first document graph
+    graph : dict
+        the graph attributes of the first document graph
+    tokens : tuple of str
+        the token node IDs in the order they occur in the text
+    sentences : list of str
+        the sentence root node IDs of the first graph that has them
+    renamed_nodes : dict of (str, str)
+        maps from the token node IDs of the other graphs to the token node
+        IDs of the merged graph
+    merged_rootnodes : list of str
+        the root node IDs of the other graphs
+    """
+    def __init__(self, docgraphs, verbose=False):
+        """
+        Parameters
+        ----------
+        docgraphs : list of DiscourseDocumentGraph
+            the document graphs to be merged
+        verbose : bool
+            If True, token mismatches are reported with their context
+            (cf. ``create_token_mapping()``).
+        """
+        self.docgraphs = list(docgraphs)
+        assert self.docgraphs, "There are no document graphs to merge."
+        for docgraph in self.docgraphs:
+            _sync_index(docgraph)
+        base = self.docgraphs[0]
+        self.ns = base.ns
+        self.root = base.root
+        self.graph = base.graph
+        self.name = next((docgraph.name for docgraph in self.docgraphs
+                          if docgraph.name), base.name)
+        self.sentences = next(
+            (docgraph.sentences for docgraph in self.docgraphs
+             if getattr(docgraph, 'sentences', None)), [])
+        self.merged_rootnodes = list(getattr(base, 'merged_rootnodes', []))
+        self.merged_rootnodes.extend(docgraph.root
+                                     for docgraph in self.docgraphs[1:])
+
+        # the token IDs of the first graph that has tokens are used for all
+        # the graphs merged after it
+        token_graph = next((docgraph for docgraph in self.docgraphs
+                            if docgraph.tokens), base)
+        self.tokens = tuple(token_graph.tokens)
+        self.renamed_nodes = dict(getattr(base, 'renamed_nodes', {}))
+        # maps from the node IDs of each graph to the merged node IDs
+        self._node_maps = [{}]
+        for docgraph in self.docgraphs[1:]:
+            assert not docgraph.in_edges(docgraph.root), \
+                "root node in graph '{}' must not have any ingoing " \
+                "edges".format(docgraph.name)
+            if docgraph.tokens and self.tokens and docgraph is not token_graph:
+                node_map = create_token_mapping(docgraph, token_graph,
+                                                verbose=verbose)
+            else:
+                node_map = {}
+            self.renamed_nodes.update(node_map)
+            node_map[docgraph.root] = self.root
+            self._node_maps.append(node_map)
+
+        # maps from a merged node ID to the (graph index, node ID) tuples
+        # it is made of (in the order the nodes would be added to a merged
+        # graph). The other root nodes are not part of the merged root
+        # node, only their outgoing edges and their metadata are.
+        self._sources = OrderedDict()
+        for i, docgraph in enumerate(self.docgraphs):
+            node_map = self._node_maps[i]
+            for node_id in docgraph.nodes_iter():
+                if i and node_id == docgraph.root:
+                    continue
+                self._sources.setdefault(
+                    node_map.get(node_id, node_id), []).append((i, node_id))
+        self._node2rank = {node_id: rank
+                           for rank, node_id in enumerate(self._sources)}
+        self._root_edge_layers = frozenset([self.ns])
+        self._token2position = None
+        self._span_cache = {}
+
+    def __repr__(self):
+        return "<MergedDocumentGraph '{0}' ({1} graphs, {2} nodes)>".format(
+            self.name, len(self.docgraphs), self.number_of_nodes())
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __contains__(self, node_id):
+        return node_id in self._sources
+
+    @property
+    def token2position(self):
+        """maps from a token node ID to its position in ``tokens``"""
+        if self._token2position is None:
+            self._token2position = {
+                token_id: i for i, token_id in enumerate(self.tokens)}
+        return self._token2position
+
+    def number_of_nodes(self):
+        """returns the number of nodes in the graph"""
+        return len(self._sources)
+
+    def number_of_edges(self):
+        """returns the number of edges in the graph"""
+        return sum(docgraph.number_of_edges() for docgraph in self.docgraphs)
+
+    def _merged_id(self, graph_index, node_id):
+        """returns the merged node ID of a node of the given graph"""
+        return self._node_maps[graph_index].get(node_id, node_id)
+
+    def _edge_attribs(self, graph_index, source_id, attribs):
+        """
+        returns the attributes of an edge of the given graph in the merged
+        graph. An edge moved from another root node to the merged root node
+        only keeps its layers in the namespace of the merged graph (cf.
+        ``merge_rootnodes()``).
+        """
+        if graph_index and source_id == self.docgraphs[graph_index].root:
+            moved_attribs = dict(attribs)
+            moved_attribs['layers'] = self._root_edge_layers
+            return moved_attribs
+        return attribs
+
+    def _out_sources(self, node_id):
+        """
+        returns the (graph index, node ID) tuples whose outgoing edges
+        belong to the given node
+        """
+        if node_id == self.root:
+            return self._sources[node_id] + [
+                (i, docgraph.root)
+                for i, docgraph in enumerate(self.docgraphs) if i]
+        return self._sources[node_id]
+
+    def node_attribs(self, node_id):
+        """
+        returns the attribute dict of the given node. The attributes of
+        nodes that occur in several graphs are merged like in
+        ``merge_graphs()``, i.e. later graphs override the attributes of
+        earlier ones, layers are united and token strings are copied into
+        the namespace of the merged graph.
+        """
+        sources = self._sources[node_id]
+        if len(sources) == 1 and node_id != self.root:
+            i, source_id = sources[0]
+            docgraph = self.docgraphs[i]
+            attribs = docgraph.node[source_id]
+            if docgraph.ns == self.ns or \
+                    docgraph.ns+':token' not in attribs:
+                return attribs
+
+        token_attrib = self.ns+':token'
+        merged_attribs = {}
+        layers = set()
+        for i, source_id in sources:
+            docgraph = self.docgraphs[i]
+            attribs = docgraph.node[source_id]
+            merged_attribs.update(attribs)
+            layers.update(attribs.get('layers', ()))
+            if token_attrib not in merged_attribs and \
+                    docgraph.ns+':token' in attribs:
+                merged_attribs[token_attrib] = attribs[docgraph.ns+':token']
+        merged_attribs['layers'] = frozenset(layers)
+
+        if node_id == self.root and 'metadata' in merged_attribs:
+            metadata = dict2metadata({})
+            metadata.update(merged_attribs['metadata'])
+            for docgraph in self.docgraphs[1:]:
+                root_attribs = docgraph.node[docgraph.root]
+                if 'metadata' in root_attribs:
+                    metadata.update(root_attribs['metadata'])
+            merged_attribs['metadata'] = metadata
+        return merged_attribs
+
+    def _node_attrib(self, node_id, attribute):
+        """
+        returns the value of the given attribute of a node without
+        merging all of its attributes (cf. ``node_attribs()``).
+        """
+        if node_id == self.root or attribute == 'layers':
+            return self.node_attribs(node_id)[attribute]
+        token_attrib = self.ns+':token'
+        value = _MISSING
+        for i, source_id in self._sources[node_id]:
+            docgraph = self.docgraphs[i]
+            attribs = docgraph.node[source_id]
+            if attribute in attribs:
+                value = attribs[attribute]
+            elif value is _MISSING and attribute == token_attrib \
+                    and docgraph.ns+':token' in attribs:
+                value = attribs[docgraph.ns+':token']
+        if value is _MISSING:
+            raise KeyError(attribute)
+        return value
+
+    def _node_tuple(self, node_id, data=False):
+        if data:
+            return (node_id, self.node_attribs(node_id))
+        return node_id
+
+    def nodes_iter(self, data=False):
+        """yields all node IDs (or (node ID, attrib dict) tuples)"""
+        for node_id in self._sources:
+            yield self._node_tuple(node_id, data)
+
+    def nodes(self, data=False):
+        """returns a list of all node IDs (or (node ID, attrib dict) tuples)"""
+        return list(self.nodes_iter(data=data))
+
+    def _merged_edges(self, i, edges, data=False):
+        """
+        maps the given edges of the i-th graph onto the merged graph. The
+        edges of the root nodes of the other graphs are skipped (cf.
+        ``_root_edges()``).
+        """
+        node_map = self._node_maps[i]
+        root = self.docgraphs[i].root if i else _MISSING
+        for edge in edges:
+            if edge[0] == root:
+                continue
+            merged_edge = (node_map.get(edge[0], edge[0]),
+                           node_map.get(edge[1], edge[1]))
+            yield merged_edge + (edge[2], ) if data else merged_edge
+
+    def _root_edges(self, data=False):
+        """
+        yields the outgoing edges of the root nodes of the other graphs,
+        which are moved to the root node of the merged graph
+        """
+        for i, docgraph in enumerate(self.docgraphs[1:], 1):
+            for _, target_id, attribs in docgraph.out_edges_iter(
+                    docgraph.root, data=True):
+                edge = (self.root, self._merged_id(i, target_id))
+                yield edge + (self._edge_attribs(i, docgraph.root, attribs),) \
+                    if data else edge
+
+    def edges_iter(self, data=False):
+        """
+        yields all edges as (source ID, target ID) tuples (or
+        (source ID, target ID, attrib dict) tuples)
+        """
+        for i, docgraph in enumerate(self.docgraphs):
+            for edge in self._merged_edges(
+                    i, docgraph.edges_iter(data=data), data):
+                yield edge
+        for edge in self._root_edges(data=data):
+            yield edge
+
+    def edges(self, data=False):
+        """
+        returns a list of all edges as (source ID, target ID) tuples (or
+        (source ID, target ID, attrib dict) tuples)
+        """
+        return list(self.edges_iter(data=data))
+
+    def out_edges_iter(self, node_id, data=False):
+        """yields all outgoing edges of the given node"""
+        for i, source_id in self._out_sources(node_id):
+            targets = self.docgraphs[i].succ[source_id]
+            for target_id, keydict in targets.iteritems():
+                target_id = self._merged_id(i, target_id)
+                for attribs in keydict.itervalues():
+                    if data:
+                        yield (node_id, target_id,
+                               self._edge_attribs(i, source_id, attribs))
+                    else:
+                        yield (node_id, target_id)
+
+    def in_edges_iter(self, node_id, data=False):
+        """yields all ingoing edges of the given node"""
+        for i, target_id in self._sources[node_id]:
+            sources = self.docgraphs[i].pred[target_id]
+            for source_id, keydict in sources.iteritems():
+                merged_source_id = self._merged_id(i, source_id)
+                for attribs in keydict.itervalues():
+                    if data:
+                        yield (merged_source_id, node_id,
+                               self._edge_attribs(i, source_id, attribs))
+                    else:
+                        yield (merged_source_id, node_id)
+
+    def successors_iter(self, node_id):
+        """yields the IDs of all successors of the given node"""
+        return iter(OrderedDict.fromkeys(
+            target_id for _, target_id in self.out_edges_iter(node_id)))
+
+    neighbors_iter = successors_iter
+
+    def predecessors_iter(self, node_id):
+        """yields the IDs of all predecessors of the given node"""
+        return iter(OrderedDict.fromkeys(
+            source_id for source_id, _ in self.in_edges_iter(node_id)))
+
+    def get_token(self, token_node_id, token_attrib='token'):
+        """given a token node ID, returns the token unicode string."""
+        return self._node_attrib(token_node_id, self.ns+':'+token_attrib)
+
+    def get_tokens(self, token_attrib='token', token_strings_only=False):
+        """
+        yields (token node ID, token) tuples (or token strings only)
+        of the document (in the order they occur).
+        """
+        for token_id in self.tokens:
+            token = self.get_token(token_id, token_attrib)
+            yield token if token_strings_only else (token_id, token)
+
+    def istoken(self, node_id, namespace=None):
+        """returns true, iff the given node ID belongs to a token node."""
+        if namespace is None:
+            namespace = self.ns
+        token_attrib = namespace+':token'
+        for i, source_id in self._sources[node_id]:
+            docgraph = self.docgraphs[i]
+            attribs = docgraph.node[source_id]
+            if token_attrib in attribs or (
+                    namespace == self.ns and docgraph.ns+':token' in attribs):
+                return True
+        return False
+
+    def _has_layer(self, node_id, layer):
+        layers = self.node_attribs(node_id)['layers']
+        if isinstance(layer, basestring):
+            return layer in layers
+        return any(l in layers for l in layer)
+
+    def select_nodes_by_layer(self, layer=None, data=False):
+        """yields all nodes belonging to (any of) the given layer(s)."""
+        if layer is None:
+            for node in self.nodes_iter(data=data):
+                yield node
+            return
+
+        layers = [layer] if isinstance(layer, basestring) else layer
+        node_ids = set()
+        for i, docgraph in enumerate(self.docgraphs):
+            for l in layers:
+                for node_id in docgraph.layer2nodes.get(l, ()):
+                    if not (i and node_id == docgraph.root):
+                        node_ids.add(self._merged_id(i, node_id))
+        for node_id in sorted(node_ids, key=self._node2rank.__getitem__):
+            yield self._node_tuple(node_id, data)
+
+    def select_nodes_by_attribute(self, attribute=None, value=None,
+                                  data=False):
+        """yields all nodes with the given attribute (and attribute value)."""
+        for node_id, attribs in self.nodes_iter(data=True):
+            if attribute is None:
+                matches = True
+            elif value is None:
+                matches = attribute in attribs
+            else:
+                matches = attribute in attribs and \
+                    attribs[attribute] in _as_values(value)
+            if matches:
+                yield (node_id, attribs) if data else node_id
+
+    def select_neighbors_by_layer(self, node_id, layer, data=False):
+        """
+        yields all neighbors (i.e. successors) of the given node
+        that belong to (any of) the given layer(s).
+        """
+        for target_id in self.successors_iter(node_id):
+            if self._has_layer(target_id, layer):
+                yield self._node_tuple(target_id, data)
+
+    def select_neighbors_by_edge_attribute(self, source_id, attribute=None,
+                                           value=None, data=False):
+        """yields all neighbors with the given edge attribute value(s)."""
+        # a neighbor is selected, if any of the edges to it matches
+        neighbors = OrderedDict()
+        for _, target_id, attribs in self.out_edges_iter(source_id,
+                                                         data=True):
+            matches = self._has_value(attribs, attribute, value)
+            neighbors[target_id] = neighbors.get(target_id, False) or matches
+        for target_id, matches in neighbors.iteritems():
+            if matches:
+                yield self._node_tuple(target_id, data)
+
+    @staticmethod
+    def _has_value(attribs, attribute=None, value=None):
+        """
+        returns True, iff the given node/edge attributes contain the given
+        attribute (with one of the given values)
+        """
+        if attribute is None:
+            return True
+        if value is None:
+            return attribute in attribs
+        return attribs.get(attribute, _MISSING) in _as_values(value)
+
+    def select_edges_by_attribute(self, attribute=None, value=None,
+                                  data=False):
+        """yields all edges with the given attribute (and attribute value)."""
+        for i, docgraph in enumerate(self.docgraphs):
+            edges = select_edges_by_attribute(docgraph, attribute, value,
+                                              data=data)
+            for edge in self._merged_edges(i, edges, data):
+                yield edge
+        for edge in self._root_edges(data=True):
+            if self._has_value(edge[2], attribute, value):
+                yield edge if data else edge[:2]
+
+    def select_edges_by(self, layer=None, edge_type=None, data=False):
+        """yields all edges with the given edge type and layer."""
+        for i, docgraph in enumerate(self.docgraphs):
+            edges = select_edges_by(docgraph, layer, edge_type, data=data)
+            for edge in self._merged_edges(i, edges, data):
+                yield edge
+        for edge in self._root_edges(data=True):
+            layers = edge[2]['layers']
+            if isinstance(layer, basestring):
+                in_layer = layer in layers
+            else:
+                in_layer = layer is None or any(l in layers for l in layer)
+            if in_layer and (edge_type is None
+                             or edge[2].get('edge_type') == edge_type):
+                yield edge if data else edge[:2]
+
+    def get_span(self, node_id):
+        """
+        returns the sorted list of token node IDs that are dominated
+        or spanned by the given node.
+        """
+        if node_id not in self._span_cache:
+            self._compute_spans([node_id])
+        return list(self._span_cache[node_id])
+
+    def compute_all_spans(self):
+        """
+        returns a dict that maps from each node ID to the sorted tuple of
+        the token node IDs it dominates or spans.
+        """
+        self._compute_spans(self._sources)
+        return self._span_cache
+
+    def _span_children(self, node_id):
+        """
+        yields the targets of all outgoing edges of the given node except
+        for self-loops and pointing relations.
+        """
+        for _, target_id, attribs in self.out_edges_iter(node_id, data=True):
+            if target_id != node_id and \
+                    attribs.get('edge_type') != EdgeTypes.pointing_relation:
+                yield target_id
+
+    def _compute_spans(self, node_ids):
+        """
+        computes the spans of the given nodes with the module-level
+        ``_compute_spans()`` function
+        """
+        _compute_spans(self, node_ids,
+                       span_children=MergedDocumentGraph._span_children,
+                       is_token=self.istoken)
+
+    def get_text(self, node_id=None):
+        """
+        returns the text (joined token strings) that the given node
+        dominates or spans (or the complete text of the document).
+        """
+        token_ids = self.get_span(node_id) if node_id else self.tokens
+        return self.tokens2text(token_ids)
+
+    def tokens2text(self, token_ids):
+        """returns the concatenated token strings of the given tokens."""
+        return ' '.join(self.get_token(token_id) for token_id in token_ids)
+
+    def materialize(self):
+        """
+        returns a new document graph (of the class of the first graph) that
+        contains all the nodes and edges of the merged graphs, i.e. the
+        graph that ``merge_graphs()`` would create. The merged graphs
+        are not changed.
+        """
+        base = self.docgraphs[0]
+        merged = base.copy()
+        token_attrib = merged.ns+':token'
+        for i, docgraph in enumerate(self.docgraphs[1:], 1):
+            node_map = self._node_maps[i]
+            merged.add_nodes_from(
+                (node_map.get(node_id, node_id), attribs)
+                for node_id, attribs in docgraph.nodes_iter(data=True)
+                if node_id != docgraph.root)
+
+            # copy token node attributes to the merged namespace
+            for node_id, attribs in docgraph.nodes_iter(data=True):
+                merged_attribs = merged.node[node_map.get(node_id, node_id)]
+                if docgraph.ns+':token' in attribs and \
+                        token_attrib not in merged_attribs:
+                    merged_attribs[token_attrib] = \
+                        attribs[docgraph.ns+':token']
+
+            merged.add_edges_from(
+                (node_map.get(source_id, source_id),
+                 node_map.get(target_id, target_id), attribs)
+                for source_id, target_id, attribs
+                in docgraph.edges_iter(data=True)
+                if source_id != docgraph.root)
+            # move the edges of the other root node (cf. merge_rootnodes)
+            for _, target_id, attribs in docgraph.out_edges_iter(
+                    docgraph.root, data=True):
+                merged.add_edge(merged.root,
+                                node_map.get(target_id, target_id),
+                                attr_dict=attribs)
+
+            root_attribs = docgraph.node[docgraph.root]
+            if 'metadata' in root_attribs:
+                merged.node[merged.root]['metadata'].update(
+                    root_attribs['metadata'])
+
+        merged.name = self.name
+        if not merged.tokens:
+            merged.tokens = list(self.tokens)
+        if self.sentences and not getattr(merged, 'sentences', None):
+            merged.sentences = self.sentences
+        if len(self.docgraphs) > 1:
+            merged.merged_rootnodes = list(self.merged_rootnodes)
+            merged.renamed_nodes = dict(self.renamed_nodes)
+        return merged
+
+
+def _as_values(value):
+    """returns the given attribute value(s) as a container of values"""
+    if isinstance(value, basestring):
+        return [value]
+    return value
+
+
+def _intern_key(value):
+    """
+    returns a key for interning the given attribute value (or None, if the
+    value can't be interned). Values of different types are never merged.
+    """
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, frozenset(value))
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return (value.__class__, value)
+
+
+def _code_array(codes, num_of_values):
+    """stores the given codes in an array of the smallest sufficient type"""
+    for typecode in ('b', 'h', 'i', 'l'):
+        if num_of_values <= 2 ** (8 * array(typecode).itemsize - 1):
+            return array(typecode, codes)
+
+
+def _cumsum(numbers):
+    """yields the cumulative sums of the given numbers"""
+    total = 0
+    for number in numbers:
+        total += number
+        yield total
+
+
+def _layerset_code(attribs, layersets, layerset2code):
+    """
+    returns the code of the (interned) layer set of the given node/edge
+    attributes. New layer sets are added to ``layersets``.
+    """
+    if 'layers' not in attribs:
+        return 0
+    layers = frozenset(attribs['layers'])
+    code = layerset2code.get(layers)
+    if code is None:
+        code = layerset2code[layers] = len(layersets)
+        layersets.append(layers)
+    return code
+
+
+def _attribute_columns(attrib_dicts):
+    """
+    converts the given list of node/edge attribute dicts (except for their
+    ``layers``) into columns.
+
+    Returns
+    -------
+    columns : dict of (str, (array, tuple))
+        maps from an attribute name to a (codes, values) tuple. The value of
+        the attribute of the i-th node/edge is ``values[codes[i]]``, code 0
+        means that the node/edge doesn't have that attribute.
+    """
+    num_of_elements = len(attrib_dicts)
+    columns = {}
+    for i, attribs in enumerate(attrib_dicts):
+        for attribute, value in attribs.iteritems():
+            if attribute == 'layers':
+                continue
+            if attribute not in columns:
+                columns[attribute] = ([0] * num_of_elements, [_MISSING], {})
+            codes, values, value2code = columns[attribute]
+            key = _intern_key(value)
+            code = value2code.get(key) if key is not None else None
+            if code is None:
+                code = len(values)
+                values.append(value)
+                if key is not None:
+                    value2code[key] = code
+            codes[i] = code
+    return {attribute: (_code_array(codes, len(values)), tuple(values))
+            for attribute, (codes, values, _) in columns.iteritems()}
+
+
+def _attribs(columns, layersets, layerset_codes, element):
+    """reconstructs the attribute dict of the given node/edge"""
+    attribs = {}
+    for attribute, (codes, values) in columns.iteritems():
+        code = codes[element]
+        if code:
+            attribs[attribute] = values[code]
+    layers = layersets[layerset_codes[element]]
+    if layers is not None:
+        attribs['layers'] = layers
+    return attribs
+
+
+def _attrib_dicts(columns, layersets, layerset_codes, copy_values=True):
+    """
+    reconstructs the attribute dicts of all nodes/edges from their columns.
+    If ``copy_values`` is True, unhashable values (which aren't shared
+    between nodes/edges) are copied.
+    """
+    attrib_dicts = [{} for _ in xrange(len(layerset_codes))]
+    for attribute, (codes, values) in columns.iteritems():
+        for element, code in enumerate(codes):
+            if code:
+                value = values[code]
+                if copy_values and _intern_key(value) is None:
+                    value = deepcopy(value)
+                attrib_dicts[element][attribute] = value
+    for attribs, code in itertools.izip(attrib_dicts, layerset_codes):
+        layers = layersets[code]
+        if layers is not None:
+            attribs['layers'] = layers
+    return attrib_dicts
+
+
+def metadata2dict(metadata):
+    """
+    converts the metadata of a document graph (stored in its root node as
+    a ``defaultdict(lambda: defaultdict(dict))``, which can't be pickled)
+    into plain dicts.
+    """
+    return {key: dict(value) if isinstance(value, dict) else value
+            for key, value in metadata.iteritems()}
+
+
+def dict2metadata(metadata_dict):
+    """
+    converts the output of ``metadata2dict()`` back into the
+    ``defaultdict(lambda: defaultdict(dict))`` used for document metadata.
+    """
+    metadata = defaultdict(lambda: defaultdict(dict))
+    for key, value in metadata_dict.iteritems():
+        if isinstance(value, dict):
+            metadata[key].update(value)
+        else:
+            metadata[key] = value
+    return metadata
+
+
+def _copy_attrs(attrs):
+    """
+    returns a copy of a node/edge attribute dict, which shares its
+    immutable values with the given one and deep-copies the others.
+    """
+    attrs_copy = attrs.copy()
+    for key, value in attrs.iteritems():
+        if not isinstance(value, _IMMUTABLE_TYPES):
+            attrs_copy[key] = deepcopy(value)
+    return attrs_copy
+
+
+def _layer_index(layerset_codes, layersets):
+    """
+    returns a dict that maps from a layer to the ascending array of the
+    nodes/edges that belong to it.
+    """
+    code2elements = defaultdict(list)
+    for element, code in enumerate(layerset_codes):
+        code2elements[code].append(element)
+    layer2elements = defaultdict(list)
+    for code, elements in code2elements.iteritems():
+        for layer in layersets[code] or ():
+            layer2elements[layer].extend(elements)
+    return {layer: array('l', sorted(elements))
+            for layer, elements in layer2elements.iteritems()}
+
 
 def rename_tokens(docgraph_with_old_names, docgraph_with_new_names, verbose=False):
     """
@@ -873,11 +2623,20 @@ def get_kwic(tokens, index, context_window=5):
     return before, tokens[index], after
 
 
-def get_annotation_layers(docgraph):
+def _discard_from_index(index, key, element):
     """
-    WARNING: this is higly inefficient!
-    Fix this via Issue #36.
+    removes an element from the set that the given index (a dict of sets)
+    maps the key to. Removes the key altogether, if its set becomes empty.
+    """
+    elements = index.get(key)
+    if elements is not None:
+        elements.discard(element)
+        if not elements:
+            del index[key]
+
 
+def get_annotation_layers(docgraph):
+    """
     Returns
     -------
     all_layers : set or dict
@@ -889,9 +2648,6 @@ def get_annotation_layers(docgraph):
 
 def get_top_level_layers(docgraph):
     """
-    WARNING: this is higly inefficient!
-    Fix this via Issue #36.
-
     Returns
     -------
     top_level_layers : set
@@ -904,38 +2660,26 @@ def get_top_level_layers(docgraph):
 
 def get_node_annotation_layers(docgraph):
     """
-    WARNING: this is higly inefficient!
-    Fix this via Issue #36.
-
     Returns
     -------
     all_layers : set or dict
         the set of all annotation layers used for annotating nodes in the given
         graph
     """
-    all_layers = set()
-    for node_id, node_attribs in docgraph.nodes_iter(data=True):
-        for layer in node_attribs['layers']:
-            all_layers.add(layer)
-    return all_layers
+    _sync_index(docgraph)
+    return set(docgraph.layer2nodes)
 
 
 def get_edge_annotation_layers(docgraph):
     """
-    WARNING: this is higly inefficient!
-    Fix this via Issue #36.
-
     Returns
     -------
     all_layers : set or dict
         the set of all annotation layers used for annotating edges in the given
         graph
     """
-    all_layers = set()
-    for source_id, target_id, edge_attribs in docgraph.edges_iter(data=True):
-        for layer in edge_attribs['layers']:
-            all_layers.add(layer)
-    return all_layers
+    _sync_index(docgraph)
+    return set(docgraph.layer2edges)
 
 
 def get_span_offsets(docgraph, node_id):
@@ -950,13 +2694,16 @@ def get_span_offsets(docgraph, node_id):
     """
     try:
         span = get_span(docgraph, node_id)
-        # workaround for issue #138
-        # TODO: when #138 is fixed, just take the first onset / last offset
-        onsets, offsets = zip(*[docgraph.get_offsets(tok_node)
-                                for tok_node in span])
-        return (min(onsets), max(offsets))
+        token2position = docgraph.token2position
+        # workaround for issue #138: we can't rely on the first/last token
+        # of the span, so we'll look for the lowest/highest token position
+        positions = [token2position[tok_node] for tok_node in span]
     except KeyError as _:
         raise KeyError("Node '{}' doesn't span any tokens.".format(node_id))
+    if not positions:
+        raise KeyError("Node '{}' doesn't span any tokens.".format(node_id))
+    onsets, offsets = docgraph.get_offset_arrays()
+    return (onsets[min(positions)], offsets[max(positions)])
 
 
 def get_span(docgraph, node_id, debug=False):
@@ -965,28 +2712,137 @@ def get_span(docgraph, node_id, debug=False):
     the given node. If debug is set to True, you'll get a warning if the
     graph is cyclic.
 
+    Spans are computed bottom-up and cached in the document graph, i.e.
+    retrieving the spans of many (overlapping) nodes of the same graph
+    doesn't recompute shared subtrees. The cache is reset whenever nodes
+    or edges are added to/removed from the graph.
+
     Returns
     -------
     span : list of str
         sorted list of token nodes (token node IDs)
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.get_span(node_id)
     if debug is True and is_directed_acyclic_graph(docgraph) is False:
         warnings.warn(
             ("Can't reliably extract span '{0}' from cyclical graph'{1}'."
-            "Maximum recursion depth may be exceeded.").format(node_id,
-                                                                   docgraph))
-    span = []
-    if docgraph.ns+':token' in docgraph.node[node_id]:
-        span.append(node_id)
-
-    for src_id, target_id, edge_attribs in docgraph.out_edges_iter(node_id,
-                                                                data=True):
-        if src_id == target_id:
+            "A RuntimeError will be raised, if the node is part of a "
+            "cycle.").format(node_id, docgraph))
+    docgraph.token2position  # resets the span cache, if the tokens changed
+    span_cache = docgraph._span_cache
+    if node_id not in span_cache:
+        _compute_spans(docgraph, [node_id])
+    return list(span_cache[node_id])
+
+
+def compute_all_spans(docgraph):
+    """
+    computes the spans of all nodes of the given document graph in a single
+    post-order traversal and caches them (cf. ``get_span``).
+
+    Returns
+    -------
+    spans : dict of (str, tuple of str)
+        maps from a node ID to the sorted tuple of the token node IDs it
+        dominates or spans. This is the span cache of the graph, so it must
+        not be modified.
+    """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.compute_all_spans()
+    docgraph.token2position  # resets the span cache, if the tokens changed
+    _compute_spans(docgraph, docgraph.nodes_iter())
+    return docgraph._span_cache
+
+
+def _span_children(docgraph, node_id):
+    """
+    yields the targets of all outgoing edges of the given node that are
+    relevant for calculating its span (i.e. no self-loops and no
+    pointing relations).
+    """
+    for target_id, keydict in docgraph.succ[node_id].iteritems():
+        if target_id == node_id:
             continue  # ignore self-loops
-        # ignore pointing relations
-        if edge_attribs['edge_type'] != EdgeTypes.pointing_relation:
-            span.extend(get_span(docgraph, target_id))
-    return sorted(span, key=natural_sort_key)
+        for edge_attribs in keydict.itervalues():
+            # ignore pointing relations
+            if edge_attribs.get('edge_type') != EdgeTypes.pointing_relation:
+                yield target_id
+
+
+def _compute_spans(docgraph, node_ids, span_children=_span_children,
+                   is_token=None):
+    """
+    computes the spans of the given nodes (and of all nodes below them)
+    iteratively in post-order and stores them in the span cache of the graph.
+    ``span_children(docgraph, node_id)`` yields the children of a node and
+    ``is_token(node_id)`` checks, if a node is a token (by default, if it
+    has a token attribute in the namespace of the graph).
+
+    Raises
+    ------
+    RuntimeError
+        if one of the nodes is part of a cycle of dominance/spanning relations
+    """
+    sort_key = token_sort_key(docgraph)
+    span_cache = docgraph._span_cache
+    if is_token is None:
+        token_attrib = docgraph.ns+':token'
+        is_token = lambda node_id: token_attrib in docgraph.node[node_id]
+
+    for start_id in node_ids:
+        if start_id in span_cache:
+            continue
+        on_stack = {start_id}
+        stack = [(start_id, span_children(docgraph, start_id))]
+        while stack:
+            node_id, children = stack[-1]
+            for child_id in children:
+                if child_id not in span_cache:
+                    if child_id in on_stack:
+                        raise RuntimeError(
+                            "Can't extract span of node '{0}' from graph "
+                            "'{1}', as it is part of a cycle.".format(
+                                child_id, docgraph.name))
+                    on_stack.add(child_id)
+                    stack.append(
+                        (child_id, span_children(docgraph, child_id)))
+                    break
+            else:  # the spans of all children are known
+                stack.pop()
+                on_stack.discard(node_id)
+                span = []
+                if is_token(node_id):
+                    span.append(node_id)
+                for child_id in span_children(docgraph, node_id):
+                    span.extend(span_cache[child_id])
+                span.sort(key=sort_key)
+                span_cache[node_id] = tuple(span)
+
+
+def token_sort_key(docgraph):
+    """
+    returns a key function that orders token node IDs by their position in
+    ``docgraph.tokens``. Token node IDs that aren't in that list are
+    sorted (naturally) after all the others.
+    """
+    token2position = docgraph.token2position
+    num_of_tokens = len(token2position)
+
+    def sort_key(token_id):
+        position = token2position.get(token_id)
+        if position is None:
+            return (num_of_tokens, natural_sort_key(token_id))
+        return (position, )
+    return sort_key
+
+
+def sort_tokens(docgraph, token_ids, reverse=False):
+    """
+    returns the given token node IDs as a list that is sorted by their
+    position in the document (i.e. in ``docgraph.tokens``).
+    """
+    return sorted(token_ids, key=token_sort_key(docgraph), reverse=reverse)
 
 
 def get_text(docgraph, node_id=None):
@@ -995,6 +2851,8 @@ def get_text(docgraph, node_id=None):
     or spans. If no node ID is given, returns the complete text of the
     document
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.get_text(node_id)
     if node_id:
         tokens = (docgraph.node[node_id][docgraph.ns+':token']
                   for node_id in get_span(docgraph, node_id))
@@ -1009,6 +2867,8 @@ def tokens2text(docgraph, token_ids):
     given a list of token node IDs, returns a their string representation
     (concatenated token strings).
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.tokens2text(token_ids)
     return ' '.join(docgraph.node[token_id][docgraph.ns+':token']
                     for token_id in token_ids)
 
@@ -1025,24 +2885,74 @@ def istoken(docgraph, node_id, namespace=None):
         Otherwise, look for tokens in the default namespace of the given
         document graph.
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.istoken(node_id, namespace)
     if namespace is None:
         namespace = docgraph.ns
     return namespace+':token' in docgraph.node[node_id]
 
 
 def is_continuous(docgraph, dominating_node):
-    """return True, if the tokens dominated by the given node are all adjacent"""
-    first_onset, last_offset = get_span_offsets(docgraph, dominating_node)
-    span_range = xrange(first_onset, last_offset+1)
+    """
+    return True, if the tokens dominated by the given node are all adjacent,
+    i.e. if their positions in ``docgraph.tokens`` form a single, gapless run.
+    """
+    span = get_span(docgraph, dominating_node)
+    try:
+        token2position = docgraph.token2position
+        positions = set(token2position[tok_node] for tok_node in span)
+    except KeyError as _:
+        raise KeyError(
+            "Node '{}' doesn't span any tokens.".format(dominating_node))
+    if not positions:
+        raise KeyError(
+            "Node '{}' doesn't span any tokens.".format(dominating_node))
+    return _is_gapless(positions)
+
 
-    token_offsets = (docgraph.get_offsets(tok)
-                     for tok in get_span(docgraph, dominating_node))
-    char_positions = set(itertools.chain.from_iterable(xrange(on, off+1)
-                         for on, off in token_offsets))
-    for item in span_range:
-        if item not in char_positions:
-            return False
-    return True
+def _is_gapless(positions):
+    """
+    returns True, iff the given (non-empty) set of token positions doesn't
+    contain any gaps.
+    """
+    return max(positions) - min(positions) + 1 == len(positions)
+
+
+def continuity_report(docgraph, layer):
+    """
+    classifies all nodes of the given layer as continuous, discontinuous
+    or empty (i.e. not spanning any tokens). All spans are computed in a
+    single pass, so this is much faster than calling ``is_continuous`` for
+    each markable.
+
+    Parameters
+    ----------
+    docgraph : DiscourseDocumentGraph
+        document graph from which the nodes will be extracted
+    layer : str or collection of str
+        name(s) of the layer(s)
+
+    Returns
+    -------
+    report : dict of (str, list of str)
+        maps from 'continuous', 'discontinuous' and 'empty' to the list of
+        IDs of the nodes belonging to that class (in the order in which
+        they were added to the graph)
+    """
+    spans = compute_all_spans(docgraph)
+    token2position = docgraph.token2position
+    report = {'continuous': [], 'discontinuous': [], 'empty': []}
+    for node_id in select_nodes_by_layer(docgraph, layer):
+        positions = set(token2position[tok_node]
+                        for tok_node in spans[node_id]
+                        if tok_node in token2position)
+        if not positions:
+            report['empty'].append(node_id)
+        elif _is_gapless(positions):
+            report['continuous'].append(node_id)
+        else:
+            report['discontinuous'].append(node_id)
+    return report
 
 
 def select_neighbors_by_layer(docgraph, node, layer, data=False):
@@ -1067,6 +2977,11 @@ def select_neighbors_by_layer(docgraph, node, layer, data=False):
         that are present in the given layer. If data is True,
         a generator of (node ID, node attrib dict) tuples.
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        for neighbor in docgraph.select_neighbors_by_layer(node, layer, data):
+            yield neighbor
+        return
+
     for node_id in docgraph.neighbors_iter(node):
         node_layers = docgraph.node[node_id]['layers']
         if isinstance(layer, (str, unicode)):
@@ -1081,6 +2996,12 @@ def select_neighbors_by_layer(docgraph, node, layer, data=False):
 def select_neighbors_by_edge_attribute(docgraph, source,
                                        attribute=None, value=None, data=False):
     """Get all neighbors with the given edge attribute value(s)."""
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        for neighbor in docgraph.select_neighbors_by_edge_attribute(
+                source, attribute, value, data):
+            yield neighbor
+        return
+
     assert isinstance(docgraph, MultiGraph)
     for neighbor_id in docgraph.neighbors_iter(source):
         edges = docgraph[source][neighbor_id].values()
@@ -1129,18 +3050,38 @@ def select_nodes_by_layer(docgraph, layer=None, data=False):
         the given layer. If data is True, a generator of (node ID, node attrib
         dict) tuples.
     """
-    for node_id, node_attribs in docgraph.nodes_iter(data=True):
-        if layer is None:
-            condition = True # don't filter nodes
-        elif isinstance(layer, (str, unicode)):
-            condition = layer in node_attribs['layers']
-        else:  # ``layer`` is a list/set/dict of layers
-            condition = any(l in node_attribs['layers'] for l in layer)
-        if condition:
-            if data:
-                yield (node_id, node_attribs)
-            else:
-                yield node_id
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        for node in docgraph.select_nodes_by_layer(layer, data):
+            yield node
+        return
+
+    if layer is None:  # don't filter nodes
+        for node in docgraph.nodes_iter(data=data):
+            yield node
+        return
+
+    if getattr(docgraph, 'layer2nodes', None) is None:
+        # a networkx graph without a layer index
+        layers = [layer] if isinstance(layer, basestring) else layer
+        for node_id, node_attribs in docgraph.nodes_iter(data=True):
+            if any(l in node_attribs['layers'] for l in layers):
+                yield (node_id, node_attribs) if data else node_id
+        return
+
+    _sync_index(docgraph)
+    if isinstance(layer, (str, unicode)):
+        node_ids = docgraph.layer2nodes.get(layer, ())
+    else:  # ``layer`` is a list/set/dict of layers
+        node_ids = set()
+        for l in layer:
+            node_ids.update(docgraph.layer2nodes.get(l, ()))
+
+    # yield nodes in the same order as docgraph.nodes_iter()
+    for node_id in sorted(node_ids, key=docgraph.node2rank.__getitem__):
+        if data:
+            yield (node_id, docgraph.node[node_id])
+        else:
+            yield node_id
 
 
 def select_nodes_by_attribute(docgraph, attribute=None, value=None, data=False):
@@ -1167,6 +3108,11 @@ def select_nodes_by_attribute(docgraph, attribute=None, value=None, data=False):
         the given attribute. If data is True, a generator of (node ID,
         node attrib dict) tuples.
     """
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        for node in docgraph.select_nodes_by_attribute(attribute, value, data):
+            yield node
+        return
+
     for node_id, node_attribs in docgraph.nodes_iter(data=True):
         if attribute is None:
             has_attrib = True # don't filter nodes
@@ -1188,19 +3134,185 @@ def select_nodes_by_attribute(docgraph, attribute=None, value=None, data=False):
                     yield node_id
 
 
+class EdgeCondition(object):
+    """
+    A condition that an edge must meet to be selected by ``select_edges``.
+
+    Conditions are called with an edge attribute dict and return True, iff
+    the edge meets the condition. Conditions that can be answered by one of
+    the indices of a ``DiscourseDocumentGraph`` also return the set of
+    (source ID, target ID, key) edges that meet them via ``candidates()``.
+    """
+    def __call__(self, edge_attribs):
+        raise NotImplementedError
+
+    def candidates(self, docgraph):
+        """
+        returns the set of all edges meeting this condition or None, if
+        the condition can't be answered by an index (e.g. because the graph
+        is a plain networkx graph without indices).
+        """
+        return None
+
+
+class HasEdgeAttribute(EdgeCondition):
+    """the edge has the given attribute (regardless of its value)"""
+    def __init__(self, attribute):
+        self.attribute = attribute
+
+    def __call__(self, edge_attribs):
+        return self.attribute in edge_attribs
+
+    def candidates(self, docgraph):
+        edgetype2edges = getattr(docgraph, 'edgetype2edges', None)
+        if self.attribute == 'edge_type' and edgetype2edges is not None:
+            return set().union(*edgetype2edges.values())
+        return None
+
+
+class EdgeAttributeIn(EdgeCondition):
+    """the value of the given edge attribute is one of the given values"""
+    def __init__(self, attribute, values):
+        self.attribute = attribute
+        self.values = frozenset(values)
+
+    def __call__(self, edge_attribs):
+        return edge_attribs.get(self.attribute, _MISSING) in self.values
+
+    def candidates(self, docgraph):
+        edgetype2edges = getattr(docgraph, 'edgetype2edges', None)
+        if self.attribute == 'edge_type' and edgetype2edges is not None:
+            return set().union(*(edgetype2edges.get(edge_type, ())
+                                 for edge_type in self.values))
+        return None
+
+
+class InEdgeLayer(EdgeCondition):
+    """the edge belongs to the given layer"""
+    def __init__(self, layer):
+        self.layer = layer
+
+    def __call__(self, edge_attribs):
+        return self.layer in edge_attribs['layers']
+
+    def candidates(self, docgraph):
+        layer2edges = getattr(docgraph, 'layer2edges', None)
+        if layer2edges is None:
+            return None
+        return layer2edges.get(self.layer, set())
+
+
+class _EvalCondition(EdgeCondition):
+    """
+    a condition given as a Python expression string that refers to the
+    edge attribute dict as ``edge_attribs``. The expression is compiled
+    only once.
+    """
+    def __init__(self, expression):
+        self.code = compile(expression, '<edge condition>', 'eval')
+
+    def __call__(self, edge_attribs):
+        return eval(self.code, {'edge_attribs': edge_attribs})
+
+
+# marks a missing attribute value (which can't be equal to any given value)
+_MISSING = object()
+
+# read-only graphs that implement the query functions of this module
+_GRAPH_VIEWS = (FrozenDocumentGraph, MergedDocumentGraph)
+
+# attribute values that DiscourseDocumentGraph.copy() doesn't need to copy
+_IMMUTABLE_TYPES = (basestring, int, long, float, frozenset, type(None))
+
+# instance attributes of a DiscourseDocumentGraph which are represented by
+# the nodes, edges, indices and tokens of a FrozenDocumentGraph
+_DOCGRAPH_ATTRIBUTES = frozenset([
+    'graph', 'node', 'adj', 'succ', 'pred', 'edge', 'node_dict_factory',
+    'adjlist_dict_factory', 'edge_key_dict_factory', 'edge_attr_dict_factory',
+    'name', 'ns', 'root', 'layer2nodes', 'layer2edges', 'edgetype2edges',
+    'node2rank', '_next_node_rank', '_span_cache', '_offsets', '_layersets',
+    '_tokens', '_token2position', 'sentences'])
+
+
 def select_edges(docgraph, conditions, data):
-    """yields all edges that meet the conditions given as eval strings"""
-    for (src_id, target_id, edge_attribs) in docgraph.edges(data=True):
-        # if all conditions are fulfilled
-        # we need to add edge_attribs to the namespace eval is working in
-        if all((eval(cond, {'edge_attribs': edge_attribs})
-                for cond in conditions)):
+    """
+    yields all edges that meet all of the given conditions.
+
+    Parameters
+    ----------
+    docgraph : DiscourseDocumentGraph
+        document graph from which the edges will be extracted
+    conditions : list of EdgeCondition or str
+        the conditions that an edge must meet. Conditions given as strings
+        are treated as Python expressions that can access the attribute
+        dict of an edge via the variable ``edge_attribs``.
+    data : bool
+        If True, results will include edge attributes.
+
+    Yields
+    ------
+    edges : generator of (str, str) or (str, str, dict) tuples
+        edges in the order they are returned by ``docgraph.edges_iter()``
+    """
+    conditions = [_EvalCondition(cond) if isinstance(cond, basestring)
+                  else cond for cond in conditions]
+    _sync_index(docgraph)
+
+    # use the indices of the graph to find candidate edges, then check
+    # the remaining conditions for each candidate
+    candidates = None
+    unindexed_conditions = []
+    for cond in conditions:
+        cond_edges = cond.candidates(docgraph)
+        if cond_edges is None:
+            unindexed_conditions.append(cond)
+        elif candidates is None:
+            candidates = cond_edges
+        else:
+            candidates = candidates.intersection(cond_edges)
+
+    # we materialize the list of edges first, so that the caller can
+    # modify the graph while iterating over the results
+    if candidates is None:
+        edges = docgraph.edges(data=True)
+    else:
+        edges = list(_iter_indexed_edges(docgraph, candidates))
+
+    for (src_id, target_id, edge_attribs) in edges:
+        if all(cond(edge_attribs) for cond in unindexed_conditions):
             if data:
                 yield (src_id, target_id, edge_attribs)
             else:
                 yield (src_id, target_id)
 
 
+def _sync_index(docgraph):
+    """
+    rebuilds the indices of a document graph, if nodes were added to or
+    replaced in its node dict directly (e.g. by networkx functions).
+    """
+    if getattr(docgraph.node, 'bypassed', False):
+        docgraph._rebuild_index()
+
+
+def _iter_indexed_edges(docgraph, edges):
+    """
+    given a set of (source ID, target ID, key) edges, yields
+    (source ID, target ID, edge attrib dict) tuples in the same order as
+    ``docgraph.edges_iter(data=True)``.
+    """
+    source2targets = defaultdict(set)
+    for src_id, target_id, key in edges:
+        source2targets[src_id].add((target_id, key))
+
+    for src_id in sorted(source2targets, key=docgraph.node2rank.__getitem__):
+        targets = source2targets[src_id]
+        for target_id, keydict in docgraph.succ[src_id].iteritems():
+            for key, edge_attribs in keydict.iteritems():
+                if (target_id, key) in targets:
+                    yield (src_id, target_id, edge_attribs)
+
+
 def select_edges_by_attribute(docgraph, attribute=None, value=None, data=False):
     """
     get all edges with the given edge type and layer.
@@ -1225,30 +3337,20 @@ def select_edges_by_attribute(docgraph, attribute=None, value=None, data=False):
         node ID) tuples). If data is True, edges are represented as
         (source node ID, target node ID, edge attribute dict) tuples.
     """
-    if attribute:
-        attrib_key_eval = "'{}' in edge_attribs".format(attribute)
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.select_edges_by_attribute(attribute, value, data)
 
+    if attribute:
         if value is not None:
             if isinstance(value, basestring):
-                attrib_val_eval = \
-                    "edge_attribs['{0}'] == '{1}'".format(attribute, value)
-                return select_edges(
-                    docgraph, data=data,
-                    conditions=[attrib_key_eval, attrib_val_eval])
-
-            else:  # ``value`` is a list/set/dict of values
-                attrib_val_evals = \
-                    ["edge_attribs['{0}'] == '{1}'".format(attribute, v)
-                     for v in value]
-                results = \
-                    [select_edges(docgraph, data=data,
-                                  conditions=[attrib_key_eval, val_eval])
-                     for val_eval in attrib_val_evals]
-                # results is a list of generators
-                return itertools.chain(*results)
+                value = [value]
+            # ``value`` is a list/set/dict of values
+            return select_edges(docgraph, data=data,
+                                conditions=[EdgeAttributeIn(attribute, value)])
 
         else:  # yield all edges with the given attribute, regardless of value
-            return select_edges(docgraph, data=data, conditions=[attrib_key_eval])
+            return select_edges(docgraph, data=data,
+                                conditions=[HasEdgeAttribute(attribute)])
 
     else:  # don't filter edges at all
         return docgraph.edges_iter(data=data)
@@ -1277,92 +3379,144 @@ def select_edges_by(docgraph, layer=None, edge_type=None, data=False):
         node ID) tuples). If data is True, edges are represented as
         (source node ID, target node ID, edge attribute dict) tuples.
     """
-    edge_type_eval = "edge_attribs['edge_type'] == '{}'".format(edge_type)
-    layer_eval = "'{}' in edge_attribs['layers']".format(layer)
+    if isinstance(docgraph, _GRAPH_VIEWS):
+        return docgraph.select_edges_by(layer, edge_type, data)
 
+    conditions = []
     if layer is not None:
-        if edge_type is not None:
-            return select_edges(docgraph, data=data,
-                                conditions=[edge_type_eval, layer_eval])
-        else:  # filter by layer, but not by edge type
-            return select_edges(docgraph, conditions=[layer_eval], data=data)
+        conditions.append(InEdgeLayer(layer))
+    if edge_type is not None:
+        conditions.append(EdgeAttributeIn('edge_type', [edge_type]))
 
-    else:  # don't filter layers
-        if edge_type is not None:  # filter by edge type, but not by layer
-            return select_edges(docgraph, data=data,
-                                conditions=[edge_type_eval])
-        else:  # neither layer, nor edge type is filtered
-            return docgraph.edges_iter(data=data)
+    if conditions:
+        return select_edges(docgraph, conditions=conditions, data=data)
+    else:  # neither layer, nor edge type is filtered
+        return docgraph.edges_iter(data=data)
 
 
-def __walk_chain(rel_dict, src_id):
+def get_pointing_chains(docgraph, layer=None):
     """
-    given a dict of pointing relations and a start node, this function
-    will return a list of paths (each path is represented as a list of
-    node IDs -- from the first node of the path to the last).
+    returns a list of chained pointing relations (e.g. coreference chains)
+    found in the given document graph (cf. ``iter_pointing_chains()``).
 
     Parameters
     ----------
-    rel_dict : dict
-        a dictionary mapping from an edge source node (node ID str)
-        to a set of edge target nodes (node ID str)
-    src_id : str
-
-    Returns
-    -------
-    paths_starting_with_id : list of list of str
-        each list constains a list of strings (i.e. a list of node IDs,
-        which represent a chain of pointing relations)
-    """
-    paths_starting_with_id = []
-    for target_id in rel_dict[src_id]:
-        if target_id in rel_dict:
-            for tail in __walk_chain(rel_dict, target_id):
-                paths_starting_with_id.append([src_id] + tail)
-        else:
-            paths_starting_with_id.append([src_id, target_id])
-    return paths_starting_with_id
+    docgraph : DiscourseDocumentGraph
+        a text with annotations, represented by a document graph
+    layer : str or None
+        If layer is specifid, this function will only return pointing relations
+        belonging to that layer.
+    """
+    return list(iter_pointing_chains(docgraph, layer=layer))
 
 
-def get_pointing_chains(docgraph, layer=None):
+def iter_pointing_chains(docgraph, layer=None):
     """
-    returns a list of chained pointing relations (e.g. coreference chains)
-    found in the given document graph.
+    yields the chained pointing relations (e.g. coreference chains) found
+    in the given document graph, i.e. all maximal paths of pointing
+    relations. Partial chains are not returned, i.e. instead of [a,b],
+    [b,c] and [a,b,c,d], only [a,b,c,d] is yielded.
+
+    A markable can point to more than one antecedent (cf. Issue #40), in
+    which case there's one chain per path. Chains start at the markables no
+    other markable points to. Pointing relations that can't be reached from
+    such a markable (i.e. cycles and everything they point to) are walked
+    from the first markable of each cycle that isn't pointed to from
+    outside. A chain ends before a markable would be repeated.
 
     Parameters
     ----------
     docgraph : DiscourseDocumentGraph
         a text with annotations, represented by a document graph
     layer : str or None
-        If layer is specifid, this function will only return pointing relations
-        belonging to that layer.
+        If layer is specifid, this function will only yield pointing
+        relations belonging to that layer.
+
+    Yields
+    ------
+    chain : list of str
+        a list of node IDs (from the first node of the chain to the last)
     """
     pointing_relations = select_edges_by(docgraph, layer=layer,
                                          edge_type=EdgeTypes.pointing_relation)
 
-    # a markable can point to more than one antecedent, cf. Issue #40
     rel_dict = defaultdict(set)
+    src_ids = []  # in the order of the pointing relations
+    # number of relations pointing to a markable from other markables
+    in_degrees = defaultdict(int)
     for src_id, target_id in pointing_relations:
-        rel_dict[src_id].add(target_id)
-
-    all_chains = [__walk_chain(rel_dict, src_id)
-                  for src_id in rel_dict.iterkeys()]
-
-    # don't return partial chains, i.e. instead of returning [a,b], [b,c] and
-    # [a,b,c,d], just return [a,b,c,d]
-    unique_chains = []
-    for i, src_id_chains in enumerate(all_chains):
-        # there will be at least one chain in this list and
-        # its first element is the from ID
-        src_id = src_id_chains[0][0]
-
-        # chain lists not starting with src_id
-        other_chainlists = all_chains[:i] + all_chains[i+1:]
-        if not any((src_id in chain
-                    for chain_list in other_chainlists
-                    for chain in chain_list)):
-                        unique_chains.extend(src_id_chains)
-    return unique_chains
+        if src_id not in rel_dict:
+            src_ids.append(src_id)
+        if target_id not in rel_dict[src_id]:
+            rel_dict[src_id].add(target_id)
+            if src_id != target_id:
+                in_degrees[target_id] += 1
+
+    # all pointing relations of a visited markable are part of a chain
+    # (or would close a cycle)
+    visited = set()
+    for src_id in rel_dict:
+        if not in_degrees[src_id]:
+            for chain in _walk_chains(rel_dict, src_id, visited):
+                yield chain
+
+    # the remaining relations are walked from the source strongly connected
+    # components (i.e. cycles) of the graph they form
+    uncovered = DiGraph()
+    uncovered.add_nodes_from(src_id for src_id in src_ids
+                             if src_id not in visited)
+    uncovered.add_edges_from(
+        (src_id, target_id) for src_id in uncovered
+        for target_id in rel_dict[src_id] if target_id in uncovered)
+    if not uncovered:
+        return
+    components = condensation(uncovered)
+    walked_components = set()
+    for src_id in src_ids:
+        if src_id in uncovered:
+            component = components.graph['mapping'][src_id]
+            if component not in walked_components \
+                    and not components.in_degree(component):
+                walked_components.add(component)
+                for chain in _walk_chains(rel_dict, src_id, visited):
+                    yield chain
+
+
+def _walk_chains(rel_dict, src_id, visited):
+    """
+    yields all maximal paths of pointing relations starting with the given
+    node (each path is represented as a list of node IDs).
+
+    Parameters
+    ----------
+    rel_dict : dict
+        a dictionary mapping from an edge source node (node ID str)
+        to a set of edge target nodes (node ID str)
+    src_id : str
+    visited : set of str
+        the IDs of all nodes on the walked paths are added to this set
+    """
+    path = [src_id]
+    on_path = {src_id}
+    visited.add(src_id)
+    stack = [iter(rel_dict[src_id])]
+    while stack:
+        node_id = next((target_id for target_id in stack[-1]
+                        if target_id not in on_path), None)
+        if node_id is None:  # all paths via the last node were walked
+            stack.pop()
+            on_path.discard(path.pop())
+            continue
+
+        path.append(node_id)
+        on_path.add(node_id)
+        visited.add(node_id)
+        if any(target_id not in on_path
+               for target_id in rel_dict.get(node_id, ())):
+            stack.append(iter(rel_dict[node_id]))
+        else:  # the end of a chain
+            yield list(path)
+            on_path.discard(path.pop())
 
 
 def layer2namespace(layer):
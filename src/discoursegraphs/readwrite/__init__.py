@@ -8,6 +8,7 @@ processing.
 """
 
 from discoursegraphs.readwrite.anaphoricity import AnaphoraDocumentGraph, read_anaphoricity
+from discoursegraphs.readwrite.binary import read_binary, write_binary
 from discoursegraphs.readwrite.brackets import write_brackets
 from discoursegraphs.readwrite.brat import write_brat
 from discoursegraphs.readwrite.conano import ConanoDocumentGraph, read_conano
@@ -38,5 +39,6 @@ from discoursegraphs.readwrite.rst.dplp import DPLPRSTTree, read_dplp
 from discoursegraphs.readwrite.rst.dis.codra import read_codra
 from discoursegraphs.readwrite.rst.urml import URMLDocumentGraph, read_urml
 from discoursegraphs.readwrite.salt.saltxmi import SaltDocument, SaltXMIGraph
-from discoursegraphs.readwrite.tiger import TigerDocumentGraph, read_tiger
+from discoursegraphs.readwrite.tiger import (
+    TigerCorpus, TigerDocumentGraph, iter_tiger_sentences, read_tiger)
 from discoursegraphs.readwrite.tree import t, tree2bracket, write_svgtree
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursegraphs.programming@arne.cl>
+
+"""
+This module provides a versioned binary file format for document graphs,
+which can be loaded much faster than the original input files (or a
+pickled graph).
+
+A file stores the tables of a ``FrozenDocumentGraph`` (cf.
+``DiscourseDocumentGraph.freeze()``) and consists of
+
+- a fixed-size prefix (magic number, format version, header codec and
+  header length),
+- a header containing the token list, the string tables (node IDs, edge
+  keys, layer sets and the interned attribute values) and references to
+  the arrays in the data section, and
+- a data section with the raw (8 byte aligned) integer arrays, i.e. the
+  compressed sparse row adjacency, the layer set codes and the codes of
+  the attribute columns.
+
+Usage
+=====
+
+    dg.save(docgraph, 'maz-1423.dg')
+    docgraph = dg.load('maz-1423.dg')
+    frozen = dg.load('maz-1423.dg', frozen=True, mmap=True)
+"""
+
+from array import array
+import cPickle
+import importlib
+import marshal
+import mmap as mmap_module
+import struct
+import sys
+
+from discoursegraphs.discoursegraph import (
+    FrozenDocumentGraph, dict2metadata, metadata2dict, _MISSING)
+
+MAGIC = 'DGB\x00'
+
+# increment this, whenever the layout of the files changes
+FORMAT_VERSION = 1
+
+# magic number, format version, header codec, header length
+PREFIX = struct.Struct('<4sHBxQ')
+
+# codecs the header can be serialized with
+MARSHAL_HEADER, PICKLE_HEADER = 0, 1
+
+# maps from the size of an integer to its ``struct`` format character
+SIZE2FORMAT = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+# names of the array attributes of a FrozenDocumentGraph
+ARRAY_ATTRIBUTES = ('_node_layers', '_edge_layers', '_out_ptr',
+                    '_edge_targets', '_edge_sources', '_in_ptr', '_in_edges')
+
+
+class MappedArray(object):
+    """
+    a read-only integer array, whose items are read on demand from a
+    memory-mapped file (cf. ``read_binary(mmap=True)``).
+    """
+    def __init__(self, buf, fmt_char, itemsize, offset, length, byteorder):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+        self.itemsize = itemsize
+        self.byteorder = '<' if byteorder == 'little' else '>'
+        self.fmt_char = fmt_char
+        self.item_struct = struct.Struct(self.byteorder + fmt_char)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return tuple(self)[index]
+            if stop <= start:
+                return ()
+            return struct.unpack_from(
+                '{0}{1}{2}'.format(self.byteorder, stop - start,
+                                   self.fmt_char),
+                self.buf, self.offset + start * self.itemsize)
+
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('array index out of range')
+        return self.item_struct.unpack_from(
+            self.buf, self.offset + index * self.itemsize)[0]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __repr__(self):
+        return '<MappedArray ({0} items)>'.format(self.length)
+
+
+def write_binary(docgraph, output_file):
+    """
+    stores a document graph (or a FrozenDocumentGraph) in the binary
+    format.
+
+    Parameters
+    ----------
+    docgraph : DiscourseDocumentGraph or FrozenDocumentGraph
+        the document graph to be stored
+    output_file : str
+        path to the output file
+    """
+    with open(output_file, 'wb') as binary_file:
+        binary_file.write(dumps_binary(docgraph))
+
+
+def read_binary(input_file, frozen=False, mmap=False):
+    """
+    loads a document graph from a file in the binary format.
+
+    Parameters
+    ----------
+    input_file : str
+        path to a file created by ``write_binary()``
+    frozen : bool
+        If True, return a FrozenDocumentGraph instead of a (mutable)
+        document graph.
+    mmap : bool
+        If True (and ``frozen`` is True), the arrays of the frozen graph
+        aren't loaded, but read on demand from the memory-mapped file.
+
+    Returns
+    -------
+    docgraph : DiscourseDocumentGraph or FrozenDocumentGraph
+        the document graph stored in the file (an instance of the class
+        of the document graph that was stored)
+    """
+    assert not mmap or frozen, \
+        "Only frozen document graphs can be memory-mapped."
+    with open(input_file, 'rb') as binary_file:
+        if mmap:
+            buf = mmap_module.mmap(binary_file.fileno(), 0,
+                                   access=mmap_module.ACCESS_READ)
+        else:
+            buf = binary_file.read()
+    try:
+        return loads_binary(buf, frozen=frozen, mmap=mmap)
+    except ValueError as e:
+        raise ValueError("Can't read '{0}': {1}".format(input_file, e))
+
+
+def dumps_binary(docgraph):
+    """
+    converts a document graph (or a FrozenDocumentGraph) into a string in
+    the binary format (cf. ``write_binary()``).
+    """
+    frozen = docgraph if isinstance(docgraph, FrozenDocumentGraph) \
+        else docgraph.freeze()
+
+    arrays = []
+    data_size = [0]
+
+    def array_ref(int_array):
+        """adds an array to the data section and returns its reference"""
+        if isinstance(int_array, MappedArray):
+            int_array = array('l', int_array)
+        arrays.append(int_array)
+        offset = data_size[0]
+        data_size[0] += _aligned(len(int_array) * int_array.itemsize)
+        return (int_array.typecode, int_array.itemsize, offset,
+                len(int_array))
+
+    header = {
+        'class': (frozen._docgraph_class.__module__,
+                  frozen._docgraph_class.__name__),
+        'name': frozen.name, 'ns': frozen.ns, 'root': frozen.root,
+        'graph': frozen.graph, 'tokens': frozen.tokens,
+        'sentences': frozen.sentences, 'node_ids': frozen._node_ids,
+        'edge_keys': frozen._edge_keys, 'layersets': frozen._layersets[1:],
+        'node_columns': _columns2header(frozen._node_columns, array_ref),
+        'edge_columns': _columns2header(frozen._edge_columns, array_ref),
+        'layer2nodes': {layer: array_ref(nodes) for layer, nodes
+                        in frozen._layer2nodes.iteritems()},
+        'layer2edges': {layer: array_ref(edges) for layer, edges
+                        in frozen._layer2edges.iteritems()},
+        'extra_state': frozen._extra_state,
+        'byteorder': sys.byteorder}
+    for attrib in ARRAY_ATTRIBUTES:
+        header[attrib] = array_ref(getattr(frozen, attrib))
+
+    try:
+        header_str = marshal.dumps(header, 2)
+        header_codec = MARSHAL_HEADER
+    except ValueError:  # the header contains unmarshallable objects
+        header_str = cPickle.dumps(header, cPickle.HIGHEST_PROTOCOL)
+        header_codec = PICKLE_HEADER
+
+    prefix_size = PREFIX.size + len(header_str)
+    chunks = [PREFIX.pack(MAGIC, FORMAT_VERSION, header_codec,
+                          len(header_str)),
+              header_str, '\x00' * (_aligned(prefix_size) - prefix_size)]
+    for int_array in arrays:
+        array_str = int_array.tostring()
+        chunks.append(array_str)
+        chunks.append('\x00' * (_aligned(len(array_str)) - len(array_str)))
+    return ''.join(chunks)
+
+
+def loads_binary(binary_str, frozen=False, mmap=False):
+    """
+    creates a document graph from a string (or memory-mapped file) in the
+    binary format (cf. ``read_binary()``).
+    """
+    if len(binary_str) < PREFIX.size:
+        raise ValueError("This is not a binary document graph.")
+    magic, version, header_codec, header_len = PREFIX.unpack(
+        binary_str[:PREFIX.size])
+    if magic != MAGIC:
+        raise ValueError("This is not a binary document graph.")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            "Can't read format version {0} (expected version {1}).".format(
+                version, FORMAT_VERSION))
+
+    if len(binary_str) < PREFIX.size + header_len:
+        raise ValueError("The header is truncated.")
+    header_str = binary_str[PREFIX.size:PREFIX.size + header_len]
+    try:
+        if header_codec == MARSHAL_HEADER:
+            header = marshal.loads(header_str)
+        else:
+            header = cPickle.loads(header_str)
+    except (EOFError, TypeError, ValueError, cPickle.UnpicklingError) as e:
+        raise ValueError("The header is corrupt: {0}".format(e))
+    data_start = _aligned(PREFIX.size + header_len)
+    byteorder = header['byteorder']
+
+    # all arrays must be within the data section
+    array_refs = [header[attrib] for attrib in ARRAY_ATTRIBUTES]
+    for layer2refs in (header['layer2nodes'], header['layer2edges']):
+        array_refs.extend(layer2refs.itervalues())
+    for columns in (header['node_columns'], header['edge_columns']):
+        array_refs.extend(codes_ref for codes_ref, _ in columns.itervalues())
+    data_end = max(offset + length * itemsize
+                   for _, itemsize, offset, length in array_refs)
+    if len(binary_str) < data_start + data_end:
+        raise ValueError(
+            "The data section is truncated ({0} of {1} bytes).".format(
+                len(binary_str) - data_start, data_end))
+
+    def load_array(ref):
+        typecode, itemsize, offset, length = ref
+        if mmap:
+            return MappedArray(binary_str, SIZE2FORMAT[itemsize], itemsize,
+                               data_start + offset, length, byteorder)
+        return _load_array(binary_str, typecode, itemsize,
+                           data_start + offset, length, byteorder)
+
+    graph = FrozenDocumentGraph.__new__(FrozenDocumentGraph)
+    module_name, class_name = header['class']
+    graph._docgraph_class = getattr(importlib.import_module(module_name),
+                                    class_name)
+    graph._extra_state = header['extra_state']
+    graph.name = header['name']
+    graph.ns = header['ns']
+    graph.root = header['root']
+    graph.graph = header['graph']
+    graph.tokens = header['tokens']
+    graph.token2position = {token: i for i, token in enumerate(graph.tokens)}
+    graph.sentences = header['sentences']
+    graph._node_ids = header['node_ids']
+    graph._node2int = {node_id: i
+                       for i, node_id in enumerate(graph._node_ids)}
+    graph._edge_keys = header['edge_keys']
+    graph._layersets = (None,) + tuple(header['layersets'])
+    graph._node_columns = _header2columns(header['node_columns'], load_array)
+    graph._edge_columns = _header2columns(header['edge_columns'], load_array)
+    graph._layer2nodes = {layer: load_array(ref)
+                          for layer, ref in header['layer2nodes'].iteritems()}
+    graph._layer2edges = {layer: load_array(ref)
+                          for layer, ref in header['layer2edges'].iteritems()}
+    for attrib in ARRAY_ATTRIBUTES:
+        setattr(graph, attrib, load_array(header[attrib]))
+    graph._span_cache = {}
+
+    if frozen:
+        return graph
+    return graph._thaw(copy_values=False)
+
+
+def _aligned(position, alignment=8):
+    """returns the smallest multiple of ``alignment`` >= ``position``"""
+    return -(-position // alignment) * alignment
+
+
+def _load_array(buf, typecode, itemsize, offset, length, byteorder):
+    """creates an integer array from the given section of a buffer"""
+    data = buf[offset:offset + length * itemsize]
+    if array(typecode).itemsize == itemsize:
+        int_array = array(typecode)
+        int_array.fromstring(data)
+        if byteorder != sys.byteorder:
+            int_array.byteswap()
+        return int_array
+
+    # the file was written on a platform with a different size of this type
+    fmt = '{0}{1}{2}'.format('<' if byteorder == 'little' else '>',
+                             length, SIZE2FORMAT[itemsize])
+    return array('l', struct.unpack(fmt, data))
+
+
+def _columns2header(columns, array_ref):
+    """
+    converts the attribute columns of a FrozenDocumentGraph into
+    (array reference, values) tuples. Document metadata is converted into
+    plain dicts.
+    """
+    header_columns = {}
+    for attribute, (codes, values) in columns.iteritems():
+        values = values[1:]  # values[0] represents a missing attribute
+        if attribute == 'metadata':
+            values = tuple(metadata2dict(value) if isinstance(value, dict)
+                           else value for value in values)
+        header_columns[attribute] = (array_ref(codes), values)
+    return header_columns
+
+
+def _header2columns(header_columns, load_array):
+    """converts the output of ``_columns2header()`` back into columns"""
+    columns = {}
+    for attribute, (codes_ref, values) in header_columns.iteritems():
+        if attribute == 'metadata':
+            values = tuple(dict2metadata(value) if isinstance(value, dict)
+                           else value for value in values)
+        columns[attribute] = (load_array(codes_ref), (_MISSING,) + values)
+    return columns
+
+
+save = write_binary
+load = read_binary
@@ -78,15 +78,12 @@ def brat_output(docgraph, layer=None, show_relations=True):
             markable_dict[markable] = (markable_index, span_text, len(span_text))
             markable_index += 1
 
-    onset = 0
-    for token_id in docgraph.tokens:
-        tok_len = len(docgraph.get_token(token_id))
+    for token_id, onset, _offset in docgraph.get_offsets():
         if token_id in first_token2markables:
             for markable in first_token2markables[token_id]:
                 mark_index, mark_text, mark_len = markable_dict[markable]
                 ret_str += u"T{0}\tMarkable {1} {2}\t{3}\n".format(
                     mark_index, onset, onset+mark_len, mark_text)
-        onset += tok_len+1
 
     if show_relations:
         relation = 1
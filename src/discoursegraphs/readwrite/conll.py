@@ -46,7 +46,8 @@ import sys
 import codecs
 from collections import defaultdict, namedtuple
 
-from discoursegraphs import (DiscourseDocumentGraph, get_pointing_chains,
+from discoursegraphs import (DiscourseDocumentGraph, DocumentGraphBuilder,
+                             get_pointing_chains,
                              get_span, istoken, select_nodes_by_layer,
                              EdgeTypes)
 from discoursegraphs.util import ensure_utf8, create_dir
@@ -166,11 +167,14 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
         def parse_conll_file(conll_file, encoding=None):
             conll_str = conll_file.read().decode(encoding) if encoding else conll_file.read()
             sentences = conll_str.strip().split("\n\n")
-            for i, sentence in enumerate(sentences, 1):
-                sent_id = self.__add_sentence_root_node(i)
-                for word in self.__parse_conll_sentence(sentence, word_class):
-                    self.__add_token(word, sent_id)
-                    self.__add_dependency(word, sent_id)
+            with DocumentGraphBuilder(self) as builder:
+                for i, sentence in enumerate(sentences, 1):
+                    sent_id, sent_tokens = self.__add_sentence_root_node(
+                        builder, i)
+                    for word in self.__parse_conll_sentence(sentence,
+                                                            word_class):
+                        self.__add_token(builder, word, sent_id, sent_tokens)
+                        self.__add_dependency(builder, word, sent_id)
 
         if isinstance(conll_filepath, str):
             with codecs.open(conll_filepath, 'r', 'utf-8') as conll_file:
@@ -198,7 +202,7 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
                              "{2}".format(self.conll_format, line.split('\t'), e))
                 raise TypeError(error_msg.format(e))
 
-    def __add_sentence_root_node(self, sent_number):
+    def __add_sentence_root_node(self, builder, sent_number):
         """
         adds the root node of a sentence to the graph and the list of sentences
         (``self.sentences``). the node has a ``tokens` attribute, which
@@ -206,6 +210,8 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
 
         Parameters
         ----------
+        builder : DocumentGraphBuilder
+            the builder that collects the nodes/edges of the document
         sent_number : int
             the index of the sentence within the document
 
@@ -213,28 +219,36 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
         -------
         sent_id : str
             the ID of the sentence
+        sent_tokens : list
+            the (empty) list of token node IDs of the sentence
         """
         sent_id = 's{}'.format(sent_number)
-        self.add_node(sent_id, layers={self.ns, self.ns+':sentence'},
-                      tokens=[])
-        self.add_edge(self.root, sent_id,
-                      layers={self.ns, self.ns+':sentence'},
-                      edge_type=EdgeTypes.dominance_relation)
+        sent_tokens = []
+        builder.add_node(sent_id, layers={self.ns, self.ns+':sentence'},
+                         tokens=sent_tokens)
+        builder.add_edge(self.root, sent_id,
+                         layers={self.ns, self.ns+':sentence'},
+                         edge_type=EdgeTypes.dominance_relation)
         self.sentences.append(sent_id)
-        return sent_id
+        return sent_id, sent_tokens
 
-    def __add_token(self, word, sent_id, feat_format='unknown'):
+    def __add_token(self, builder, word, sent_id, sent_tokens,
+                    feat_format='unknown'):
         """
         adds a token to the document graph (with all the features given
         in the columns of the CoNLL file).
 
         Parameters
         ----------
+        builder : DocumentGraphBuilder
+            the builder that collects the nodes/edges of the document
         word : Conll2009Word or Conll2010Word
             a namedtuple representing all the information stored in a CoNLL
             file line (token, lemma, pos, dependencies etc.)
         sent_id : str
             the ID of the sentence this word/token belongs to
+        sent_tokens : list
+            the list of token node IDs of that sentence
 
         Returns
         -------
@@ -247,13 +261,13 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
         feats.update({self.ns+':token': word.token, 'label': word.token,
                       'word_pos': int(word.word_id)})
         self.__add_morph_features(feats, feats[self.feat_attr], feat_format)
-        self.add_node(token_id, layers={self.ns, self.ns+':token'},
-                      attr_dict=feats, sent_pos=int(sent_id[1:]))
+        builder.add_node(token_id, layers={self.ns, self.ns+':token'},
+                         attr_dict=feats, sent_pos=int(sent_id[1:]))
         self.tokens.append(token_id)
-        self.node[sent_id]['tokens'].append(token_id)
+        sent_tokens.append(token_id)
         return token_id
 
-    def __add_dependency(self, word_instance, sent_id):
+    def __add_dependency(self, builder, word_instance, sent_id):
         """
         adds an ingoing dependency relation from the projected head of a token
         to the token itself.
@@ -267,19 +281,16 @@ class ConllDocumentGraph(DiscourseDocumentGraph):
         else:
             source_id = '{0}_t{1}'.format(sent_id, head)
             # TODO: fix issue #39, so we don't have to add nodes explicitly
-            if source_id not in self.node:
-                self.add_node(source_id, layers={self.ns})
+            if source_id not in builder:
+                builder.add_node(source_id, layers={self.ns})
 
         target_id = '{0}_t{1}'.format(sent_id, word_instance.word_id)
         # 'pdeprel': projected dependency relation
-        try:
-            self.add_edge(source_id, target_id,
-                          layers={self.ns, self.ns+':dependency'},
-                          relation_type=deprel,
-                          label=deprel,
-                          edge_type=EdgeTypes.dominance_relation)
-        except AssertionError:
-            print "source: {0}, target: {1}".format(source_id, target_id)
+        builder.add_edge(source_id, target_id,
+                         layers={self.ns, self.ns+':dependency'},
+                         relation_type=deprel,
+                         label=deprel,
+                         edge_type=EdgeTypes.dominance_relation)
 
     def __add_morph_features(self, token_dict, feature_string,
                              feature_format='unknown'):
@@ -11,7 +11,8 @@ COURts corpus') into a networkx-based directed graph
 import os
 from lxml import etree
 
-from discoursegraphs import DiscourseDocumentGraph, EdgeTypes
+from discoursegraphs import (DiscourseDocumentGraph, DocumentGraphBuilder,
+                             EdgeTypes)
 from discoursegraphs.readwrite.generic import generic_converter_cli
 #~ from discoursegraphs.util import ensure_unicode
 
@@ -66,40 +67,43 @@ class DecourDocumentGraph(DiscourseDocumentGraph):
         self.utterances = []
 
         tree = etree.parse(decour_filepath)
-        self._parse_decour(tree)
+        with DocumentGraphBuilder(self) as builder:
+            self._parse_decour(builder, tree)
         if precedence:
             self.add_precedence_relations()
 
-    def _parse_decour(self, tree):
+    def _parse_decour(self, builder, tree):
         """
         <!ELEMENT hearing (header, intro, turn+, conclu?)>
         # <!ELEMENT turn (act?|utterance+)*>
         # <!ELEMENT utterance (#PCDATA|token|lemma|pos)*>
+
+        All nodes/edges are collected by the given ``DocumentGraphBuilder``.
         """
-        self._add_dominance_relation(self.root, 'intro')
-        self._add_token_span_to_document(tree.find('/intro'))
+        self._add_dominance_relation(builder, self.root, 'intro')
+        self._add_token_span_to_document(builder, tree.find('/intro'))
 
         for turn in tree.iterfind('/turn'):
             turn_id = 'turn_{}'.format(turn.attrib['nrgen'])
-            self._add_dominance_relation(self.root, turn_id)
+            self._add_dominance_relation(builder, self.root, turn_id)
             self.turns.append(turn_id)
             act = turn.find('./act')
             if act is not None:
-                self._add_dominance_relation(turn_id,
+                self._add_dominance_relation(builder, turn_id,
                                              'act_{}'.format(self.act_count))
-                self._add_token_span_to_document(act)
+                self._add_token_span_to_document(builder, act)
 
             for utter in turn.iterfind('./utterance'):
                     utter_id = 'utterance_{}'.format(utter.attrib['nrgen'])
-                    self._add_dominance_relation(turn_id, utter_id)
-                    self._add_utterance_to_document(utter)
+                    self._add_dominance_relation(builder, turn_id, utter_id)
+                    self._add_utterance_to_document(builder, utter)
 
         conclu = tree.find('/conclu')
         if conclu is not None:
-            self._add_dominance_relation(self.root, 'conclu')
-            self._add_token_span_to_document(conclu)
+            self._add_dominance_relation(builder, self.root, 'conclu')
+            self._add_token_span_to_document(builder, conclu)
 
-    def _add_token_to_document(self, token_string, token_attrs=None):
+    def _add_token_to_document(self, builder, token_string, token_attrs=None):
         """add a token node to this document graph"""
         token_feat = {self.ns+':token': token_string}
         if token_attrs:
@@ -107,51 +111,52 @@ class DecourDocumentGraph(DiscourseDocumentGraph):
         else:
             token_attrs = token_feat
         token_id = 'token_{}'.format(self.token_count)
-        self.add_node(token_id, layers={self.ns, self.ns+':token'},
-                      attr_dict=token_attrs)
+        builder.add_node(token_id, layers={self.ns, self.ns+':token'},
+                         attr_dict=token_attrs)
         self.token_count += 1
         self.tokens.append(token_id)
         return token_id
 
-    def _add_utterance_to_document(self, utterance):
+    def _add_utterance_to_document(self, builder, utterance):
         """add an utterance to this docgraph (as a spanning relation)"""
         utter_id = 'utterance_{}'.format(utterance.attrib['nrgen'])
         norm, lemma, pos = [elem.text.split()
                             for elem in utterance.iterchildren()]
         for i, word in enumerate(utterance.text.split()):
             token_id = self._add_token_to_document(
-                word, token_attrs={self.ns+':norm': norm[i],
-                                   self.ns+':lemma': lemma[i],
-                                   self.ns+':pos': pos[i]})
-            self._add_spanning_relation(utter_id, token_id)
+                builder, word, token_attrs={self.ns+':norm': norm[i],
+                                            self.ns+':lemma': lemma[i],
+                                            self.ns+':pos': pos[i]})
+            self._add_spanning_relation(builder, utter_id, token_id)
         self.utterances.append(utter_id)
 
-    def _add_token_span_to_document(self, span_element):
+    def _add_token_span_to_document(self, builder, span_element):
         """
         adds an <intro>, <act> or <conclu> token span to the document.
         """
         for token in span_element.text.split():
-            token_id = self._add_token_to_document(token)
+            token_id = self._add_token_to_document(builder, token)
             if span_element.tag == 'act':  # doc can have 0+ acts
-                self._add_spanning_relation('act_{}'.format(self.act_count),
-                                            token_id)
+                self._add_spanning_relation(
+                    builder, 'act_{}'.format(self.act_count), token_id)
             else:  # <intro> or <conclu>
-                self._add_spanning_relation(span_element.tag, token_id)
+                self._add_spanning_relation(builder, span_element.tag,
+                                            token_id)
         if span_element.tag == 'act':
             self.act_count += 1
 
-    def _add_dominance_relation(self, source, target):
+    def _add_dominance_relation(self, builder, source, target):
         """add a dominance relation to this docgraph"""
         # TODO: fix #39, so we don't need to add nodes by hand
-        self.add_node(target, layers={self.ns, self.ns+':unit'})
-        self.add_edge(source, target,
-                      layers={self.ns, self.ns+':discourse'},
-                      edge_type=EdgeTypes.dominance_relation)
+        builder.add_node(target, layers={self.ns, self.ns+':unit'})
+        builder.add_edge(source, target,
+                         layers={self.ns, self.ns+':discourse'},
+                         edge_type=EdgeTypes.dominance_relation)
 
-    def _add_spanning_relation(self, source, target):
+    def _add_spanning_relation(self, builder, source, target):
         """add a spanning relation to this docgraph"""
-        self.add_edge(source, target, layers={self.ns, self.ns+':unit'},
-                      edge_type=EdgeTypes.spanning_relation)
+        builder.add_edge(source, target, layers={self.ns, self.ns+':unit'},
+                         edge_type=EdgeTypes.spanning_relation)
 
 
 # pseudo-function to create a document graph from a DeCour XML file
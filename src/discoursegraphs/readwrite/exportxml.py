@@ -55,13 +55,35 @@ from lxml import etree
 import discoursegraphs as dg
 from discoursegraphs import DiscourseDocumentGraph
 from discoursegraphs.readwrite.generic import (
-    convert_spanstring, XMLElementCountTarget)
+    convert_spanstring, count_elements, dumps_docgraph, loads_docgraph,
+    parallel_imap, read_xml_element, XMLElementIndex)
 from discoursegraphs.util import add_prefix
 
 
 # example node ID: 's_1_n_506' -> sentence 1, node 506
 NODE_ID_REGEX = re.compile('s_(\d+)_n_(\d+)')
 
+# maps the annotation layers that can be selected via ``include_layers``
+# to the ExportXML elements they are created from. <sentence> and <word>
+# elements are always parsed.
+LAYER_ELEMENTS = {
+    'syntax': ('node', 'secEdge'),
+    'ne': ('ne',),
+    'topic': ('topic',),
+    'edu': ('edu', 'edu-range'),
+    'connective': ('connective',),
+    'discourse': ('discRel',),
+    'coreference': ('relation', 'splitRelation'),
+}
+
+# layers that can't be built without other layers, e.g. coreference
+# relations link <node> elements from the syntax layer
+LAYER_DEPENDENCIES = {
+    'ne': {'syntax'},
+    'discourse': {'edu'},
+    'coreference': {'syntax'},
+}
+
 
 class ExportXMLCorpus(object):
     """
@@ -73,8 +95,17 @@ class ExportXMLCorpus(object):
     little memory as possible. To retrieve the document graphs of the
     documents contained in the corpus, simply iterate over the class
     instance (or use the ``.next()`` method).
+
+    Single documents can be retrieved by their position (``corpus[42]``,
+    ``corpus[-1]``, ``corpus[10:20]``) or by their xml:id
+    (``corpus.get('text_42')``). This uses an index of the byte offsets of
+    all <text> elements, which is built in a single pass over the file
+    and stored in a sidecar file next to it. The index is rebuilt
+    automatically, if the size or modification time of the corpus file
+    changes.
     """
-    def __init__(self, exportxml_file, name=None, debug=False):
+    def __init__(self, exportxml_file, name=None, debug=False,
+                 index_file=None, include_layers=None):
         """
         Parameters
         ----------
@@ -89,12 +120,26 @@ class ExportXMLCorpus(object):
             If False, create an iterator that parses the documents
             contained in the file into ExportXMLDocumentGraph instances.
             (default: False)
+        index_file : str or None or False
+            path to the file that stores the byte offsets of all <text>
+            elements in the corpus. If None, ``exportxml_file`` + '.idx'
+            is used. If False, the index is only kept in memory.
+        include_layers : set of str or None
+            the annotation layers to be added to the document graphs
+            (cf. ``ExportXMLDocumentGraph``). If None, add all layers.
         """
         self.name = name if name else os.path.basename(exportxml_file)
         self._num_of_documents = None
         self.exportxml_file = exportxml_file
         self.path = os.path.abspath(exportxml_file)
         self.debug = debug
+        self.include_layers = include_layers
+
+        if index_file is None:
+            index_file = self.path + '.idx'
+        self.index_file = index_file
+        self.index = XMLElementIndex(
+            self.path, 'text', index_filepath=index_file or None)
 
         self.__context = None
         self._reset_corpus_iterator()
@@ -113,25 +158,105 @@ class ExportXMLCorpus(object):
                                          tag='text', recover=True)
 
     def __len__(self):
-        if self._num_of_documents is not None:
-            return self._num_of_documents
-        elif self.name == 'tuebadz-8.0-mit-NE+Anaphern+Diskurs.exml.xml':
-            return 3258  # I'll burn in hell for this!
-        else:
-            return self._get_num_of_documents()
+        return len(self.index)
+
+    @property
+    def offsets(self):
+        """
+        returns a list of (start offset, end offset, xml:id) tuples, one
+        for each <text> element in the corpus file. The index is (re)loaded,
+        if the size or modification time of the file has changed.
+        """
+        return self.index.offsets
+
+    def __getitem__(self, index):
+        """
+        returns the document at the given position in the corpus (or a
+        list of documents, if ``index`` is a slice).
+        """
+        documents = [self._parse_text(position)
+                     for position in self.index.positions(index)]
+        return documents if isinstance(index, slice) else documents[0]
+
+    def get(self, text_id, default=None):
+        """
+        returns the document with the given xml:id (or ``default``, if
+        the corpus doesn't contain a <text> element with that ID).
+        """
+        try:
+            return self._parse_text(self.index.position(text_id))
+        except KeyError:
+            return default
+
+    def _parse_text(self, position):
+        """
+        parses the <text> element at the given position in the corpus file
+        into an ExportXMLDocumentGraph (or returns the element itself, if
+        ``self.debug`` is set to ``True``).
+        """
+        text_elem = self.index.read_element(position)
+        if self.debug:
+            return text_elem
+        return ExportXMLDocumentGraph(
+            text_elem, name=text_elem.attrib[add_ns('id')],
+            include_layers=self.include_layers)
+
+    def parallel_iter(self, workers=None, ordered=True, function=None,
+                      chunksize=1):
+        """
+        parses the documents of the corpus in a pool of worker processes
+        and yields the resulting ExportXMLDocumentGraph instances.
+
+        Each worker parses the byte ranges of the <text> elements it is
+        given (cf. ``self.offsets``) and sends back the pickled state of
+        the resulting document graph, which is restored in this process.
+        If you only need the results of a conversion (e.g. a string
+        representation of the documents), pass a ``function`` that will be
+        called on each document graph in the worker process. Then, the
+        document graphs don't need to be sent back at all.
+
+        Parameters
+        ----------
+        workers : int or None
+            number of worker processes. If None, one process per CPU
+            is used. If 1, the documents are parsed in this process.
+        ordered : bool
+            If True, yield the documents in corpus order. If False,
+            yield them as soon as they are parsed.
+        function : function or None
+            a module-level (i.e. picklable) function which takes an
+            ExportXMLDocumentGraph and returns a picklable result
+        chunksize : int
+            number of documents sent to a worker process at once
+
+        Yields
+        ------
+        result : ExportXMLDocumentGraph or object
+            the document graph of a <text> element (or the result of
+            calling ``function`` on it)
+        """
+        assert not self.debug, \
+            "parallel_iter() can't yield <text> elements in debug mode."
+        tasks = [(self.path, start, end, self.index.encoding,
+                  self.include_layers, function)
+                 for start, end, _text_id in self.offsets]
+
+        if workers == 1:
+            for task in tasks:
+                yield _parse_text_range(task, wire_format=False)
+            return
+
+        for result in parallel_imap(_parse_text_range, tasks, workers=workers,
+                                    ordered=ordered, chunksize=chunksize):
+            yield result if function else loads_docgraph(result)
 
     def _get_num_of_documents(self):
         '''
-        counts the number of documents in an ExportXML file.
-        adapted from Listing 2 on
-        http://www.ibm.com/developerworks/library/x-hiperfparse/
+        counts the number of documents in an ExportXML file by scanning
+        its raw bytes for <text> start tags.
         '''
-        parser = etree.XMLParser(target = XMLElementCountTarget('text'))
-        # When iterated over, 'results' will contain the output from
-        # target parser's close() method
-        num_of_documents = etree.parse(self.exportxml_file, parser)
-        self._num_of_documents = num_of_documents
-        return num_of_documents
+        self._num_of_documents = count_elements(self.path, 'text')
+        return self._num_of_documents
 
     def __iter__(self):
         return iter(self.text_iter(self.__context))
@@ -141,6 +266,50 @@ class ExportXMLCorpus(object):
         # but adding a next() method is quite common
         return self.__iter__().next()
 
+    def sentence_iter(self):
+        """
+        Iterates over all <sentence> elements in the corpus and yields an
+        ExportXMLSentenceGraph instance for each of them (or the <sentence>
+        element itself, if ``self.debug`` is set to ``True``).
+
+        Memory usage is bounded by the size of a sentence, not of the
+        document: the elements are removed from memory after processing
+        them. The only state kept between the sentences of a document
+        is the text of their tokens and syntax nodes, which is used to
+        describe the antecedents of coreference relations.
+        Annotations outside of <sentence> elements (e.g. topics or EDU
+        ranges spanning multiple sentences) are ignored. This includes
+        <word> elements which belong to a sentence with a ``span``
+        attribute, but occur after its closing tag.
+        """
+        context = etree.iterparse(
+            self.exportxml_file, events=('start', 'end'),
+            tag=('text', 'sentence'), recover=True)
+        text_id = None
+        antecedents = {}
+        for event, elem in context:
+            if elem.tag == 'text':
+                if event == 'start':
+                    text_id = elem.attrib[add_ns('id')]
+                    antecedents = {}
+                else:
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                continue
+
+            if event == 'end':
+                if not self.debug:
+                    yield ExportXMLSentenceGraph(
+                        elem, text_id=text_id, antecedents=antecedents,
+                        include_layers=self.include_layers)
+                else:
+                    yield elem
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        del context
+
     def text_iter(self, context):
         """
         Iterates over all the elements in an iterparse context
@@ -154,7 +323,9 @@ class ExportXMLCorpus(object):
         """
         for _event, elem in context:
             if not self.debug:
-                yield ExportXMLDocumentGraph(elem, name=elem.attrib[add_ns('id')])
+                yield ExportXMLDocumentGraph(
+                    elem, name=elem.attrib[add_ns('id')],
+                    include_layers=self.include_layers)
             else:
                 yield elem
             # removes element (and references to it) from memory after processing it
@@ -168,9 +339,13 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
     """
     represents an ExportXML document as a document graph.
     """
+    # maps from an element tag to the bound method that parses it
+    _transient_attributes = ('parsers',)
+
     def __init__(self, text_element=None, name=None, namespace='exportxml',
                  precedence=False, ignore_relations=False,
-                 ignore_splitrelations=False, ignore_secedges=False):
+                 ignore_splitrelations=False, ignore_secedges=False,
+                 include_layers=None):
         """
         creates a document graph from a <text> element from an ExportXML file.
 
@@ -197,6 +372,13 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
         ignore_secedges : bool
             If True, don't add pointing relations representing secondary
             edges (between elements in a syntax tree)
+        include_layers : set of str or None
+            the annotation layers to be added to the document graph,
+            e.g. {'syntax', 'coreference'} (cf. ``LAYER_ELEMENTS``).
+            Tokens and sentences are always added. Elements belonging to
+            other layers are skipped by lxml and never turned into graph
+            objects. Layers needed by the given ones are added, too
+            (cf. ``LAYER_DEPENDENCIES``). If None, add all layers.
         """
         text_id = text_element.attrib[add_ns('id')]
         # super calls __init__() of base class DiscourseDocumentGraph
@@ -218,6 +400,28 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
         self.ignore_splitrelations = ignore_splitrelations
         self.ignore_secedges = ignore_secedges
 
+        if include_layers is None:
+            self.include_layers = set(LAYER_ELEMENTS)
+            self.parsed_tags = None  # parse all elements
+        else:
+            self.include_layers = close_layers(include_layers)
+            self.parsed_tags = ['sentence', 'word']
+            for layer in self.include_layers:
+                self.parsed_tags.extend(LAYER_ELEMENTS[layer])
+
+        self._init_transient_attributes()
+
+        if text_element.tag == 'sentence':
+            # the graph of a single sentence is rooted in the sentence itself
+            # (cf. ExportXMLSentenceGraph)
+            self.add_sentence(text_element)
+        self.parse_descedant_elements(text_element)
+
+        if precedence:
+            self.add_precedence_relations()
+
+    def _init_transient_attributes(self):
+        """creates the mapping from element tags to their parsing methods"""
         self.parsers = {
             'connective': self.add_connective,
             'discRel': self.add_discrel,
@@ -234,19 +438,22 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
             'word': self.add_word
         }
 
-        self.parse_descedant_elements(text_element)
-
-        if precedence:
-            self.add_precedence_relations()
-
     def parse_child_elements(self, element):
         '''parses all children of an etree element'''
-        for child in element.iterchildren():
+        if self.parsed_tags is None:
+            children = element.iterchildren()
+        else:
+            children = element.iterchildren(*self.parsed_tags)
+        for child in children:
             self.parsers[child.tag](child)
 
     def parse_descedant_elements(self, element):
         '''parses all descendants of an etree element'''
-        for descendant in element.iterdescendants():
+        if self.parsed_tags is None:
+            descendants = element.iterdescendants()
+        else:
+            descendants = element.iterdescendants(*self.parsed_tags)
+        for descendant in descendants:
             self.parsers[descendant.tag](descendant)
 
     def add_connective(self, connective):
@@ -268,9 +475,8 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
         # add a key 'connective' to the token with add rel1/rel2 attributes as a dict and
         # add the token to the namespace:connective layer
         connective_attribs = {key: val for (key, val) in connective.attrib.items() if key != 'konn'}
-        word_node = self.node[word_node_id]
-        word_node['layers'].add(self.ns+':connective')
-        word_node.update({'connective': connective_attribs})
+        self.add_layer(word_node_id, self.ns+':connective')
+        self.node[word_node_id].update({'connective': connective_attribs})
 
     def add_discrel(self, discrel):
         """
@@ -537,8 +743,10 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
             (syntax tree with coreference annotation)
         """
         sent_root_id = sentence.attrib[add_ns('id')]
-        # add edge from document root to sentence root
-        self.add_edge(self.root, sent_root_id, edge_type=dg.EdgeTypes.dominance_relation)
+        if sent_root_id != self.root:
+            # add edge from document root to sentence root
+            self.add_edge(self.root, sent_root_id,
+                          edge_type=dg.EdgeTypes.dominance_relation)
         self.sentences.append(sent_root_id)
 
         sentence_token_ids = []
@@ -639,7 +847,10 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
             (i.e. a token, which might contain child elements)
         """
         word_id = self.get_element_id(word)
-        if word.getparent().tag in ('node', 'sentence'):
+        if 'syntax' not in self.include_layers:
+            # without syntax nodes, tokens are attached to their sentence
+            parent_id = self.get_sentence_id(word)
+        elif word.getparent().tag in ('node', 'sentence'):
             parent_id = self.get_parent_id(word)
         else:
             # ExportXML is an inline XML format. Therefore, a <word>
@@ -710,6 +921,106 @@ class ExportXMLDocumentGraph(DiscourseDocumentGraph):
         return self.get_element_id(sentence_elem)
 
 
+class ExportXMLSentenceGraph(ExportXMLDocumentGraph):
+    """
+    represents a single <sentence> element of an ExportXML document as a
+    graph, whose root node is the sentence itself.
+
+    Nodes outside of the sentence (e.g. the antecedents of coreference
+    relations) are added to the ``exportxml:external`` layer. If they
+    occurred in an earlier sentence of the same document, they carry the
+    ID of that sentence (``sentence``) and their text (``label``).
+    """
+    def __init__(self, sentence_element, name=None, namespace='exportxml',
+                 text_id=None, antecedents=None, **kwargs):
+        """
+        creates a graph from a <sentence> element from an ExportXML file.
+
+        Parameters
+        ----------
+        sentence_element : lxml.etree._Element
+            A <sentence> element from an ExportXML file parsed with lxml
+        name : str or None
+            the name or ID of the graph to be generated. If no name is
+            given, the xml:id of the <sentence> element is used
+        namespace : str
+            the namespace of the graph (default: exportxml)
+        text_id : str or None
+            the xml:id of the <text> element the sentence belongs to
+        antecedents : dict or None
+            maps from the IDs of the tokens and syntax nodes of the
+            preceding sentences of the document to a (sentence ID, text)
+            tuple. The tokens and syntax nodes of this sentence will
+            be added to it.
+        kwargs :
+            further arguments of ``ExportXMLDocumentGraph``, e.g.
+            ``include_layers``
+        """
+        super(ExportXMLSentenceGraph, self).__init__(
+            sentence_element, name=name, namespace=namespace, **kwargs)
+        self.text_id = text_id
+
+        sentence_elem_ids = set(sentence_element.xpath('.//@xml:id'))
+        for node_id in self.nodes():
+            if node_id != self.root and node_id not in sentence_elem_ids \
+                    and self.ns+':targetspan' not in self.node[node_id]['layers']:
+                self.add_layer(node_id, self.ns+':external')
+                if antecedents and node_id in antecedents:
+                    sentence_id, text = antecedents[node_id]
+                    self.node[node_id].update(
+                        {'sentence': sentence_id, 'label': text})
+
+        if antecedents is not None:
+            for node_id in dg.select_nodes_by_layer(
+                    self, {self.ns+':syntax', self.ns+':token'}):
+                antecedents[node_id] = (self.root, dg.get_text(self, node_id))
+
+
+def close_layers(include_layers):
+    """
+    returns the given set of ExportXML annotation layers together with all
+    the layers they depend on (cf. ``LAYER_DEPENDENCIES``).
+    """
+    unknown_layers = set(include_layers).difference(LAYER_ELEMENTS)
+    assert not unknown_layers, \
+        "Unknown layer(s): {0}. Choose from: {1}".format(
+            sorted(unknown_layers), sorted(LAYER_ELEMENTS))
+    layers = set()
+    unchecked_layers = list(include_layers)
+    while unchecked_layers:
+        layer = unchecked_layers.pop()
+        if layer not in layers:
+            layers.add(layer)
+            unchecked_layers.extend(LAYER_DEPENDENCIES.get(layer, ()))
+    return layers
+
+
+def _parse_text_range(task, wire_format=True):
+    """
+    parses an (exportxml_file, start, end, encoding, include_layers,
+    function) task into an ExportXMLDocumentGraph. This is the worker
+    function used by ``ExportXMLCorpus.parallel_iter()``.
+
+    Returns
+    -------
+    result : str or ExportXMLDocumentGraph or object
+        the result of calling ``function`` on the document graph (if
+        ``function`` is given). Otherwise, the pickled document graph
+        (if ``wire_format`` is True) or the document graph itself.
+    """
+    exportxml_file, start, end, encoding, include_layers, function = task
+    text_elem = read_xml_element(exportxml_file, start, end, encoding)
+    docgraph = ExportXMLDocumentGraph(
+        text_elem, name=text_elem.attrib[add_ns('id')],
+        include_layers=include_layers)
+    if function:
+        return function(docgraph)
+    if wire_format:
+        # the parser dispatch table consists of (unpicklable) bound methods
+        return dumps_docgraph(docgraph)
+    return docgraph
+
+
 def add_ns(key, ns='http://www.w3.org/XML/1998/namespace'):
     """
     adds a namespace prefix to a string, e.g. turns 'foo' into
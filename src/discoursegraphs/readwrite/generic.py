@@ -6,10 +6,18 @@
 This module contains code that is used by multiple importers and/or exporters.
 """
 
+import cPickle
+import gc
 import os
+import re
 import sys
+import json
+import mmap
+import multiprocessing
 import argparse
 
+from lxml import etree
+
 from discoursegraphs.readwrite.dot import write_dot
 from discoursegraphs.util import ensure_utf8, ensure_ascii
 
@@ -39,6 +47,341 @@ class XMLElementCountTarget(object):
         return self.count
 
 
+def get_xml_encoding(xml_filepath):
+    """
+    returns the encoding declared in the XML declaration of the given file
+    (or 'utf-8', if the file has no such declaration).
+    """
+    with open(xml_filepath, 'rb') as xml_file:
+        head = xml_file.read(256)
+    match = re.match(r'\s*<\?xml[^>]*encoding\s*=\s*["\']([\w.:-]+)["\']', head)
+    return match.group(1) if match else 'utf-8'
+
+
+def scan_xml_bytes(xml_filepath, regex):
+    """
+    yields all matches of a regular expression in the raw bytes of an XML
+    file. The file is memory-mapped, i.e. it isn't read into memory and
+    the search runs in C without parsing the file.
+
+    Parameters
+    ----------
+    xml_filepath : str
+        path to an XML file
+    regex : _sre.SRE_Pattern
+        a compiled regular expression, e.g. for matching start tags
+
+    Yields
+    ------
+    match : _sre.SRE_Match
+        a match of the regular expression
+    """
+    if os.path.getsize(xml_filepath) == 0:  # empty files can't be mmap'ed
+        return
+
+    with open(xml_filepath, 'rb') as xml_file:
+        xml_map = mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for match in regex.finditer(xml_map):
+                yield match
+        finally:
+            xml_map.close()
+
+
+def count_elements(xml_filepath, tag, recover=False):
+    """
+    counts the <``tag``> elements in an XML file.
+
+    By default, the raw bytes of the file are scanned for <``tag``> start
+    tags (cf. ``scan_xml_bytes()``), which is much faster than parsing the
+    file. Use ``recover=True`` to count the elements that lxml's recovering
+    parser finds instead (e.g. if the file isn't well-formed or contains
+    start tags in comments or CDATA sections).
+
+    Parameters
+    ----------
+    xml_filepath : str
+        path to an XML file
+    tag : str
+        name of the elements to count, e.g. 'text'
+    recover : bool
+        If True, count the elements with lxml's recovering parser
+
+    Returns
+    -------
+    num_of_elements : int
+        the number of <``tag``> elements in the file
+    """
+    if recover:
+        parser = etree.XMLParser(target=XMLElementCountTarget(tag),
+                                 recover=True)
+        # the result is the output of the target parser's close() method
+        return etree.parse(xml_filepath, parser)
+
+    start_tag_regex = re.compile(r'<{0}[\s/>]'.format(re.escape(tag)))
+    return sum(1 for _match in scan_xml_bytes(xml_filepath, start_tag_regex))
+
+
+def element_offsets(xml_filepath, tag, id_attrib='xml:id'):
+    """
+    returns the byte offsets of all <``tag``> elements in an XML file.
+
+    Instead of parsing the file, this function scans its raw bytes in a
+    single pass (cf. ``scan_xml_bytes()``), looking for the start and end
+    tags of the elements. Nested <``tag``> elements are treated as part of
+    the outermost one.
+
+    Parameters
+    ----------
+    xml_filepath : str
+        path to an XML file
+    tag : str
+        name of the element whose offsets should be found, e.g. 'text'
+    id_attrib : str
+        name of the attribute that contains the ID of the element
+
+    Returns
+    -------
+    offsets : list of (int, int, str or None)
+        a list of (start offset, end offset, element ID) tuples, one for
+        each <``tag``> element in document order. ``xml_file[start:end]``
+        contains the complete element. The ID is None, if the element
+        has no ``id_attrib`` attribute.
+    """
+    tag_regex = re.compile(r'<{0}[\s/>][^>]*>|</{0}\s*>'.format(re.escape(tag)))
+    id_regex = re.compile(
+        r'\s{}\s*=\s*["\']([^"\']*)["\']'.format(re.escape(id_attrib)))
+
+    offsets = []
+    depth = 0
+    for match in scan_xml_bytes(xml_filepath, tag_regex):
+        tag_str = match.group()
+        if tag_str.startswith('</'):
+            depth -= 1
+            if depth == 0:
+                offsets.append((start, match.end(), element_id))
+            depth = max(depth, 0)
+            continue
+
+        if depth == 0:
+            start = match.start()
+            id_match = id_regex.search(tag_str)
+            element_id = id_match.group(1) if id_match else None
+        if tag_str.endswith('/>'):
+            if depth == 0:
+                offsets.append((start, match.end(), element_id))
+        else:
+            depth += 1
+    return offsets
+
+
+def load_offset_index(xml_filepath, tag, index_filepath=None,
+                      id_attrib='xml:id'):
+    """
+    returns the byte offsets of all <``tag``> elements in an XML file
+    (cf. ``element_offsets()``), using a persistent sidecar index file.
+
+    The index is only rebuilt if the index file doesn't exist or if the
+    size or modification time of the XML file have changed since the
+    index was written. If the index file can't be written (e.g. because
+    the directory is read-only), the offsets are simply returned.
+
+    Parameters
+    ----------
+    xml_filepath : str
+        path to an XML file
+    tag : str
+        name of the element whose offsets should be found, e.g. 'text'
+    index_filepath : str or None
+        path to the index file. If None, the offsets won't be persisted.
+    id_attrib : str
+        name of the attribute that contains the ID of the element
+
+    Returns
+    -------
+    offsets : list of (int, int, str or None)
+        a list of (start offset, end offset, element ID) tuples
+    """
+    stat = os.stat(xml_filepath)
+    header = {'size': stat.st_size, 'mtime': stat.st_mtime,
+              'tag': tag, 'id_attrib': id_attrib}
+
+    if index_filepath and os.path.isfile(index_filepath):
+        try:
+            with open(index_filepath, 'rb') as index_file:
+                index = json.load(index_file)
+            if all(index.get(key) == value
+                   for key, value in header.iteritems()):
+                return [(start, end, element_id)
+                        for start, end, element_id in index['offsets']]
+        except (IOError, ValueError, KeyError, TypeError):
+            pass  # unreadable or outdated index, we'll rebuild it
+
+    offsets = element_offsets(xml_filepath, tag, id_attrib=id_attrib)
+    if index_filepath:
+        header['offsets'] = offsets
+        try:
+            with open(index_filepath, 'wb') as index_file:
+                json.dump(header, index_file)
+        except (IOError, OSError):
+            pass
+    return offsets
+
+
+def read_xml_element(xml_filepath, start, end, encoding='utf-8'):
+    """
+    parses the XML element found between the given byte offsets of an
+    XML file (cf. ``element_offsets()``).
+
+    Returns
+    -------
+    element : lxml.etree._Element
+        the parsed element
+    """
+    parser = etree.XMLParser(recover=True, encoding=encoding)
+    with open(xml_filepath, 'rb') as xml_file:
+        xml_file.seek(start)
+        return etree.fromstring(xml_file.read(end - start), parser)
+
+
+class XMLElementIndex(object):
+    """
+    an index of the byte offsets of all <``tag``> elements in an XML file
+    (cf. ``load_offset_index()``), which is used to parse single elements
+    without parsing the rest of the file. The index is reloaded
+    automatically, if the size or modification time of the file changes.
+    """
+    def __init__(self, xml_filepath, tag, index_filepath=None,
+                 id_attrib='xml:id'):
+        """
+        Parameters
+        ----------
+        xml_filepath : str
+            path to an XML file
+        tag : str
+            name of the indexed elements, e.g. 'text'
+        index_filepath : str or None
+            path to the sidecar file the index is stored in. If None,
+            the index is only kept in memory.
+        id_attrib : str
+            name of the attribute that contains the ID of an element
+        """
+        self.path = os.path.abspath(xml_filepath)
+        self.tag = tag
+        self.index_filepath = index_filepath
+        self.id_attrib = id_attrib
+        self._offsets = None
+        self._offsets_stat = None
+        self._id2position = None
+        self._encoding = None
+
+    @property
+    def offsets(self):
+        """
+        returns a list of (start offset, end offset, element ID) tuples,
+        one for each indexed element in the file.
+        """
+        stat = os.stat(self.path)
+        if self._offsets_stat != (stat.st_size, stat.st_mtime):
+            self._offsets = load_offset_index(
+                self.path, self.tag, index_filepath=self.index_filepath,
+                id_attrib=self.id_attrib)
+            self._offsets_stat = (stat.st_size, stat.st_mtime)
+            self._id2position = None
+        return self._offsets
+
+    @property
+    def encoding(self):
+        """returns the encoding of the XML file"""
+        if self._encoding is None:
+            self._encoding = get_xml_encoding(self.path)
+        return self._encoding
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def position(self, element_id):
+        """
+        returns the position of the element with the given ID.
+        Raises a KeyError, if there's no such element.
+        """
+        offsets = self.offsets
+        if self._id2position is None:
+            self._id2position = {element_id: i for i, (_, _, element_id)
+                                 in enumerate(offsets)}
+        return self._id2position[element_id]
+
+    def positions(self, key):
+        """
+        returns the positions of the elements selected by the given key,
+        i.e. an index, a slice or an element ID.
+        """
+        if isinstance(key, slice):
+            return range(*key.indices(len(self)))
+        elif isinstance(key, basestring):
+            return [self.position(key)]
+        return [xrange(len(self))[key]]  # raises an IndexError if needed
+
+    def read_element(self, position):
+        """parses the element at the given position in the file"""
+        start, end, _element_id = self.offsets[position]
+        return read_xml_element(self.path, start, end, self.encoding)
+
+
+def dumps_docgraph(docgraph):
+    """
+    pickles a document graph into a string, which can be sent between
+    processes. Document graphs are pickled in a compact binary
+    representation (cf. ``DiscourseDocumentGraph.__getstate__()``).
+    """
+    return cPickle.dumps(docgraph, cPickle.HIGHEST_PROTOCOL)
+
+
+def loads_docgraph(docgraph_str):
+    """
+    restores a document graph pickled with ``dumps_docgraph()``.
+    """
+    # the garbage collector would repeatedly scan the (acyclic) dicts
+    # created by the unpickler, which makes restoring the graph much slower
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return cPickle.loads(docgraph_str)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def parallel_imap(function, tasks, workers=None, ordered=True, chunksize=1):
+    """
+    calls a function on each task in a pool of worker processes and
+    yields the results.
+
+    Parameters
+    ----------
+    function : function
+        a module-level (i.e. picklable) function
+    tasks : iterable
+        the (picklable) arguments ``function`` will be called with
+    workers : int or None
+        number of worker processes. If None, one process per CPU is used.
+    ordered : bool
+        If True, yield the results in the order of the tasks. If False,
+        yield them as soon as they are available.
+    chunksize : int
+        number of tasks sent to a worker process at once
+    """
+    pool = multiprocessing.Pool(workers)
+    try:
+        pool_iter = pool.imap if ordered else pool.imap_unordered
+        for result in pool_iter(function, tasks, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def generic_converter_cli(docgraph_class, file_descriptor=''):
     """
     generic command line interface for importers. Will convert the file
@@ -66,93 +409,169 @@ def generic_converter_cli(docgraph_class, file_descriptor=''):
     write_dot(docgraph, args.output_file)
 
 
-def layerset2list(discoursegraph):
+class ExportView(object):
     """
-    typecasts all `layers` sets to lists to make the graph
-    exportable (e.g. into the `geoff` format).
-
-    Parameters
-    ----------
-    discoursegraph : DiscourseDocumentGraph
+    a lightweight, read-only view of a document graph for exporters. It
+    relabels nodes and converts node/edge attributes on the fly, while an
+    exporter iterates over the nodes and edges, i.e. the document graph
+    is neither changed nor copied. A view provides the parts of the
+    networkx graph API that exporters use (e.g. ``nodes_iter()``,
+    ``edges_iter()``, ``node``, ``graph`` and ``is_directed()``).
     """
-    for node_id in discoursegraph:
-        discoursegraph.node[node_id]['layers'] = \
-            list(discoursegraph.node[node_id]['layers'])
-    for (from_id, to_id) in discoursegraph.edges_iter():
-        # there might be multiple edges between 2 nodes
-        edge_dict = discoursegraph.edge[from_id][to_id]
-        for edge_id in edge_dict:
-            edge_dict[edge_id]['layers'] = \
-                list(edge_dict[edge_id]['layers'])
+    def __init__(self, docgraph, node_id=None, layers=None, lists=None,
+                 strip_metadata=False, id_labels=False):
+        """
+        Parameters
+        ----------
+        docgraph : DiscourseDocumentGraph
+            the document graph to be exported
+        node_id : function or None
+            maps a node ID to the ID it shall be exported with
+            (e.g. ``ensure_xpointer_compatibility``)
+        layers : function or None
+            converts the ``layers`` set of a node/edge (e.g. into a ``list``
+            or a ``str``, cf. ``layers2str()``)
+        lists : function or None
+            converts attribute values that are lists (e.g. into a ``str``)
+        strip_metadata : bool
+            If True, remove the ``metadata`` attribute of the root node, the
+            generic root node and all merged root nodes. Some exporters need
+            this, as the attribute may contain (nested) dictionaries.
+        id_labels : bool
+            If True, add the ID of each node as its ``label`` attribute
+            (unless it isn't a string or the node already has a label,
+            cf. ``neo4j.add_node_ids_as_labels()``).
+        """
+        self.docgraph = docgraph
+        self.relabel = node_id is not None
+        self.node_id = node_id if node_id else lambda node_id: node_id
+        self.layers = layers
+        self.lists = lists
+        self.id_labels = id_labels
+        self.name = docgraph.name
+        # some exporters write to the graph attributes
+        self.graph = dict(docgraph.graph)
 
+        self.metadata_nodes = set()
+        if strip_metadata:
+            self.metadata_nodes.update(
+                [docgraph.root, 'discoursegraph:root_node'])
+            self.metadata_nodes.update(
+                getattr(docgraph, 'merged_rootnodes', []))
+        self._exported2node = None
 
-def layerset2str(discoursegraph):
-    """
-    typecasts all `layers` from sets of strings into a single string to make
-    the graph exportable (e.g. into the `gexf` and `graphml` formats).
+    def is_directed(self):
+        return self.docgraph.is_directed()
 
-    Parameters
-    ----------
-    discoursegraph : DiscourseDocumentGraph
-    """
-    for node_id in discoursegraph:
-        discoursegraph.node[node_id]['layers'] = \
-            str(discoursegraph.node[node_id]['layers'])
-    for (from_id, to_id) in discoursegraph.edges_iter():
-        # there might be multiple edges between 2 nodes
-        edge_dict = discoursegraph.edge[from_id][to_id]
-        for edge_id in edge_dict:
-            edge_dict[edge_id]['layers'] = \
-                str(edge_dict[edge_id]['layers'])
+    def is_multigraph(self):
+        return self.docgraph.is_multigraph()
 
+    def __len__(self):
+        return len(self.docgraph)
 
-def attriblist2str(discoursegraph):
-    """
-    converts all node/edge attributes whose values are lists into string
-    values (e.g. to export them into the `gexf` and `graphml` formats).
+    def number_of_nodes(self):
+        return self.docgraph.number_of_nodes()
 
-    WARNING: This function iterates over all nodes and edges! You can speed up
-    conversion by writing a custom function that only fixes those attributes
-    that have lists (of strings) as values.
+    def number_of_edges(self):
+        return self.docgraph.number_of_edges()
 
-    Parameters
-    ----------
-    discoursegraph : DiscourseDocumentGraph
-    """
-    for node_id in discoursegraph:
-        node_dict = discoursegraph.node[node_id]
-        for attrib in node_dict:
-            if isinstance(node_dict[attrib], list):
-                node_dict[attrib] = str(node_dict[attrib])
-    for (from_id, to_id) in discoursegraph.edges_iter():
-        # there might be multiple edges between 2 nodes
-        edge_dict = discoursegraph.edge[from_id][to_id]
-        for edge_id in edge_dict:
-            for attrib in edge_dict[edge_id]:
-                if isinstance(edge_dict[edge_id][attrib], list):
-                    edge_dict[edge_id][attrib] \
-                        = str(edge_dict[edge_id][attrib])
-
-
-def remove_root_metadata(docgraph):
-    """
-    removes the ``metadata`` attribute of the root node of a document graph.
-    this is necessary for some exporters, as the attribute may contain
-    (nested) dictionaries.
-    """
-    docgraph.node[docgraph.root].pop('metadata', None)
-    # delete metadata from the generic root node (which probably only exists
-    # when we merge graphs on the command line, cf. issue #89
-    if 'discoursegraph:root_node' in docgraph.node:
-        docgraph.node['discoursegraph:root_node'].pop('metadata', None)
-    # delete the metadata from all former root nodes which have been merged
-    # into this graph
-    if hasattr(docgraph, 'merged_rootnodes'):
-        for merged_rootnode in docgraph.merged_rootnodes:
-            try:  # some of these nodes may not exist any longer
-                docgraph.node[merged_rootnode].pop('metadata', None)
-            except KeyError as e:
-                pass
+    def __iter__(self):
+        return self.nodes_iter()
+
+    def __contains__(self, node_id):
+        return node_id in self.node
+
+    @property
+    def node(self):
+        """maps from an exported node ID to its (converted) attributes"""
+        return _ExportViewNodes(self)
+
+    def original_node_id(self, exported_id):
+        """returns the ID of a node in the document graph"""
+        if not self.relabel:
+            return exported_id
+        if self._exported2node is None:
+            self._exported2node = {
+                self.node_id(node_id): node_id for node_id in self.docgraph}
+        return self._exported2node[exported_id]
+
+    def node_attribs(self, node_id):
+        """
+        returns the converted attributes of the node with the given ID (in
+        the document graph)
+        """
+        attribs = self._convert(self.docgraph.node[node_id])
+        if node_id in self.metadata_nodes:
+            attribs.pop('metadata', None)
+        if self.id_labels and 'label' not in attribs:
+            exported_id = self.node_id(node_id)
+            if isinstance(exported_id, (str, unicode)):
+                attribs['label'] = ensure_utf8(exported_id)
+        return attribs
+
+    def _convert(self, attribs):
+        """returns a converted copy of the given node/edge attributes"""
+        converted = attribs.copy()
+        for attrib, value in attribs.iteritems():
+            if attrib == 'layers' and self.layers:
+                converted[attrib] = self.layers(value)
+            elif isinstance(value, list) and self.lists:
+                converted[attrib] = self.lists(value)
+        return converted
+
+    def nodes_iter(self, data=False):
+        node_id = self.node_id
+        for node in self.docgraph.nodes_iter():
+            if data:
+                yield node_id(node), self.node_attribs(node)
+            else:
+                yield node_id(node)
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data=data))
+
+    def edges_iter(self, nbunch=None, data=False, keys=False):
+        if nbunch is not None:
+            nbunch = [self.original_node_id(node) for node in nbunch]
+        node_id = self.node_id
+        for edge in self.docgraph.edges_iter(nbunch, data=True, keys=True):
+            source_id, target_id, key, attribs = edge
+            exported_edge = (node_id(source_id), node_id(target_id))
+            if keys:
+                exported_edge += (key,)
+            if data:
+                exported_edge += (self._convert(attribs),)
+            yield exported_edge
+
+    def edges(self, nbunch=None, data=False, keys=False):
+        return list(self.edges_iter(nbunch=nbunch, data=data, keys=keys))
+
+
+class _ExportViewNodes(object):
+    """the ``node`` attribute of an ExportView"""
+    def __init__(self, view):
+        self.view = view
+
+    def __getitem__(self, exported_id):
+        return self.view.node_attribs(self.view.original_node_id(exported_id))
+
+    def __contains__(self, exported_id):
+        try:
+            self.view.original_node_id(exported_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return self.view.nodes_iter()
+
+    def __len__(self):
+        return len(self.view)
+
+
+def layers2str(layers):
+    """converts a set of layers into a string (e.g. for GEXF and GraphML)"""
+    return str(set(layers))
 
 
 def convert_spanstring(span_string):
@@ -102,7 +102,7 @@ def graph2geoff(graph, edge_rel_name, encoder=None):
     """
     if encoder is None:
         encoder = json.JSONEncoder()
-    is_digraph = isinstance(graph, nx.DiGraph)
+    is_digraph = graph.is_directed()
 
     lines = []
     lapp = lines.append
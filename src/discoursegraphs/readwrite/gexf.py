@@ -6,20 +6,15 @@
 This module contains code to convert document graphs to GEXF files.
 """
 
-from copy import deepcopy
-
 from networkx import write_gexf as nx_write_gexf
-from discoursegraphs.readwrite.generic import (
-    attriblist2str, layerset2str, remove_root_metadata)
+from discoursegraphs.readwrite.generic import ExportView, layers2str
 
 
 def write_gexf(docgraph, output_file):
     """
     takes a document graph, converts it into GEXF format and writes it to
-    a file.
+    a file. The document graph isn't changed.
     """
-    dg_copy = deepcopy(docgraph)
-    remove_root_metadata(dg_copy)
-    layerset2str(dg_copy)
-    attriblist2str(dg_copy)
-    nx_write_gexf(dg_copy, output_file)
+    export_view = ExportView(docgraph, layers=layers2str, lists=str,
+                             strip_metadata=True)
+    nx_write_gexf(export_view, output_file)
@@ -6,21 +6,16 @@
 This module contains code to convert document graphs to GraphML files.
 """
 
-from copy import deepcopy
-
 from networkx import write_graphml as nx_write_graphml
-from discoursegraphs.readwrite.generic import (
-    attriblist2str, layerset2str, remove_root_metadata)
+from discoursegraphs.readwrite.generic import ExportView, layers2str
 
 
 def write_graphml(docgraph, output_file):
     """
     takes a document graph, converts it into GraphML format and writes it to
-    a file.
+    a file. The document graph isn't changed.
     """
-    dg_copy = deepcopy(docgraph)
-    layerset2str(dg_copy)
-    attriblist2str(dg_copy)
-    remove_root_metadata(dg_copy)
-    nx_write_graphml(dg_copy, output_file)
+    export_view = ExportView(docgraph, layers=layers2str, lists=str,
+                             strip_metadata=True)
+    nx_write_graphml(export_view, output_file)
 
@@ -11,8 +11,8 @@ import os
 from lxml import etree
 
 import discoursegraphs as dg
-from discoursegraphs import (DiscourseDocumentGraph, EdgeTypes,
-                             select_nodes_by_layer)
+from discoursegraphs import (DiscourseDocumentGraph, DocumentGraphBuilder,
+                             EdgeTypes, select_nodes_by_layer)
 from discoursegraphs.util import add_prefix, ensure_unicode, natural_sort_key
 from discoursegraphs.readwrite.generic import convert_spanstring, generic_converter_cli
 
@@ -226,6 +226,29 @@ class MMAXDocumentGraph(DiscourseDocumentGraph):
         """returns a list of token node IDs belonging to the given sentence"""
         return spanstring2tokens(self, self.node[sentence_root_node][self.ns+':span'])
 
+    @staticmethod
+    def input_files(mmax_base_file):
+        """
+        returns the paths of all files that are read to create the
+        document graph of the given MMAX2 base file (``*.mmax``), i.e.
+        the base file, the project's ``common_paths.xml``, the
+        ``_words.xml`` file and the markable files of all annotation levels.
+        (This is used by ``discoursegraphs.cache.DocumentCache``.)
+        """
+        mmax_base_file = os.path.abspath(os.path.expanduser(mmax_base_file))
+        mmax_rootdir, _ = os.path.split(mmax_base_file)
+        mmax_project = MMAXProject(mmax_rootdir)
+        words_file = os.path.join(mmax_project.paths['project_path'],
+                                  mmax_project.paths['basedata'],
+                                  etree.parse(mmax_base_file).find('//words').text)
+        file_id = MMAXDocumentGraph.get_file_id(mmax_base_file)
+        annotation_files = [
+            os.path.join(mmax_rootdir, mmax_project.paths['markable'],
+                         file_id+layer_dict['file_extension'])
+            for layer_dict in mmax_project.annotations.itervalues()]
+        return [mmax_base_file, os.path.join(mmax_rootdir, 'common_paths.xml'),
+                words_file] + annotation_files
+
     @staticmethod
     def get_file_id(mmax_base_file):
         """
@@ -255,17 +278,19 @@ class MMAXDocumentGraph(DiscourseDocumentGraph):
             Make the graph connected, i.e. add an edge from root to each
             token.
         """
+        builder = DocumentGraphBuilder(self)
         for word in etree.parse(words_file).iterfind('//word'):
             token_node_id = word.attrib['id']
             self.tokens.append(token_node_id)
             token_str = ensure_unicode(word.text)
-            self.add_node(token_node_id,
-                          layers={self.ns, self.ns+':token'},
-                          attr_dict={self.ns+':token': token_str,
-                                     'label': token_str})
+            builder.add_node(token_node_id,
+                             layers={self.ns, self.ns+':token'},
+                             attr_dict={self.ns+':token': token_str,
+                                        'label': token_str})
             if connected:
-                self.add_edge(self.root, token_node_id,
-                              layers={self.ns, self.ns+':token'})
+                builder.add_edge(self.root, token_node_id,
+                                 layers={self.ns, self.ns+':token'})
+        builder.commit()
 
     def add_annotation_layer(self, annotation_file, layer_name):
         """
@@ -279,30 +304,31 @@ class MMAXDocumentGraph(DiscourseDocumentGraph):
 
         default_layers = {self.ns, self.ns+':markable', self.ns+':'+layer_name}
 
+        builder = DocumentGraphBuilder(self)
         # avoids eml.org namespace handling
         for markable in root.iterchildren():
             markable_node_id = markable.attrib['id']
             markable_attribs = add_prefix(markable.attrib, self.ns+':')
-            self.add_node(markable_node_id,
-                          layers=default_layers,
-                          attr_dict=markable_attribs,
-                          label=markable_node_id+':'+layer_name)
+            builder.add_node(markable_node_id,
+                             layers=default_layers,
+                             attr_dict=markable_attribs,
+                             label=markable_node_id+':'+layer_name)
 
             for target_node_id in spanstring2tokens(self, markable.attrib['span']):
                 # manually add to_node if it's not in the graph, yet
                 # cf. issue #39
-                if target_node_id not in self:
-                    self.add_node(target_node_id,
-                                  # adding 'mmax:layer_name' here could be
-                                  # misleading (e.g. each token would be part
-                                  # of the 'mmax:sentence' layer
-                                  layers={self.ns, self.ns+':markable'},
-                                  label=target_node_id)
-
-                self.add_edge(markable_node_id, target_node_id,
-                              layers=default_layers,
-                              edge_type=EdgeTypes.spanning_relation,
-                              label=self.ns+':'+layer_name)
+                if target_node_id not in builder:
+                    builder.add_node(target_node_id,
+                                     # adding 'mmax:layer_name' here could be
+                                     # misleading (e.g. each token would be part
+                                     # of the 'mmax:sentence' layer
+                                     layers={self.ns, self.ns+':markable'},
+                                     label=target_node_id)
+
+                builder.add_edge(markable_node_id, target_node_id,
+                                 layers=default_layers,
+                                 edge_type=EdgeTypes.spanning_relation,
+                                 label=self.ns+':'+layer_name)
 
             # this is a workaround for Chiarcos-style MMAX files
             if has_antecedent(markable):
@@ -328,14 +354,15 @@ class MMAXDocumentGraph(DiscourseDocumentGraph):
 
                     # manually add antecedent node if it's not yet in the graph
                     # cf. issue #39
-                    if antecedent_node_id not in self:
-                        self.add_node(antecedent_node_id,
-                                      layers=default_layers)
-
-                    self.add_edge(markable_node_id, antecedent_node_id,
-                                  layers=default_layers,
-                                  edge_type=EdgeTypes.pointing_relation,
-                                  label=self.ns+edge_label)
+                    if antecedent_node_id not in builder:
+                        builder.add_node(antecedent_node_id,
+                                         layers=default_layers)
+
+                    builder.add_edge(markable_node_id, antecedent_node_id,
+                                     layers=default_layers,
+                                     edge_type=EdgeTypes.pointing_relation,
+                                     label=self.ns+edge_label)
+        builder.commit()
 
 
 def has_antecedent(markable):
@@ -21,10 +21,9 @@ from lxml.builder import ElementMaker
 
 from discoursegraphs import (EdgeTypes, get_text, get_top_level_layers,
                              istoken, select_edges_by, select_nodes_by_layer,
-                             tokens2text)
-from discoursegraphs.util import (create_dir, ensure_xpointer_compatibility,
-                                  natural_sort_key)
-from discoursegraphs.relabel import relabel_nodes
+                             sort_tokens, tokens2text)
+from discoursegraphs.util import create_dir, ensure_xpointer_compatibility
+from discoursegraphs.readwrite.generic import ExportView
 
 
 NSMAP = {'xlink': 'http://www.w3.org/1999/xlink',
@@ -93,6 +92,9 @@ class PaulaDocument(object):
             handle
         """
         self.dg = docgraph
+        # node IDs are made xpointer compatible, when they are written
+        self.view = ExportView(docgraph,
+                               node_id=ensure_xpointer_compatibility)
         self.human_readable = human_readable
         # remove file extension from document name
         self.name = docgraph.name.rsplit('.')[0]
@@ -104,7 +106,6 @@ class PaulaDocument(object):
         # map file IDs to DTDs
         self.file2dtd = {}
 
-        self.__make_xpointer_compatible()
         self.__gen_primary_text_file()
         self.__gen_tokenization_file()
 
@@ -119,21 +120,6 @@ class PaulaDocument(object):
             self.__gen_pointing_anno_file(top_level_layer)
         self.__gen_annoset_file()
 
-    def __make_xpointer_compatible(self):
-        """
-        ensure that all node and IDs in the document graph are valid
-        xpointer IDs. this will relabel all node IDs in place in the discourse
-        graph and change its ``.tokens`` list accordingly.
-        """
-
-        node_id_map = {node: ensure_xpointer_compatibility(node)
-                       for node in self.dg.nodes_iter()}
-
-        old_token_ids = self.dg.tokens
-        # replace document graph with node relabeled version
-        self.dg = relabel_nodes(self.dg, node_id_map, copy=True)
-        self.dg.tokens = [node_id_map[tok] for tok in old_token_ids]
-
     def __gen_primary_text_file(self):
         """
         generate the PAULA file that contains the primary text of the document
@@ -188,11 +174,12 @@ class PaulaDocument(object):
         mlist = E('markList',
                   {'type': 'tok',
                    XMLBASE: base_paula_id+'.xml'})
-        tok_tuples = self.dg.get_tokens()
-        for (tid, onset, tlen) in get_onsets(tok_tuples):
+        for (tid, onset, offset) in self.dg.get_offsets():
             # even SaltNPepper still uses xpointers for string-ranges!
-            xp = "#xpointer(string-range(//body,'',{0},{1}))".format(onset, tlen)
-            mlist.append(E('mark', {'id': tid,
+            # Note that PAULA starts counting string onsets with 1!
+            xp = "#xpointer(string-range(//body,'',{0},{1}))".format(
+                onset+1, offset-onset)
+            mlist.append(E('mark', {'id': self.view.node_id(tid),
                                     XLINKHREF: xp}))
         tree.append(mlist)
         self.files[paula_id] = tree
@@ -228,15 +215,16 @@ class PaulaDocument(object):
         for source_id, target_id, edge_attrs in edges:
             span_dict[source_id][target_id] = edge_attrs
 
+        xpid = self.view.node_id
         target_dict = defaultdict(list)
         for source_id in span_dict:
-            targets = sorted(span_dict[source_id], key=natural_sort_key)
+            targets = sort_tokens(self.dg, span_dict[source_id])
             if saltnpepper_compatible:  # SNP doesn't like xpointer ranges
-                xp = ' '.join('#{0}'.format(target_id)
+                xp = ' '.join('#{0}'.format(xpid(target_id))
                               for target_id in targets)
             else:  # PAULA XML 1.1 specification
-                xp = '#xpointer(id({0})/range-to(id({1})))'.format(targets[0],
-                                                                 targets[-1])
+                xp = '#xpointer(id({0})/range-to(id({1})))'.format(
+                    xpid(targets[0]), xpid(targets[-1]))
             mark = E('mark', {XLINKHREF: xp})
             if self.human_readable:
                 # add <!-- comments --> containing the token strings
@@ -246,7 +234,7 @@ class PaulaDocument(object):
                 mlist.append(mark)
 
         if self.human_readable:  # order <mark> elements by token ordering
-            for target in sorted(target_dict, key=natural_sort_key):
+            for target in sort_tokens(self.dg, target_dict):
                 for mark in target_dict[target]:
                     mlist.append(mark)
 
@@ -273,7 +261,7 @@ class PaulaDocument(object):
 
         for token_id in self.dg.tokens:
             mfeat = E('multiFeat',
-                      {XLINKHREF: '#{0}'.format(token_id)})
+                      {XLINKHREF: '#{0}'.format(self.view.node_id(token_id))})
             token_dict = self.dg.node[token_id]
             for feature in token_dict:
                 # TODO: highly inefficient! refactor!1!!
@@ -321,9 +309,12 @@ class PaulaDocument(object):
         span_edges = select_edges_by(
             self.dg, layer=layer, edge_type=EdgeTypes.spanning_relation,
             data=True)
+        xpid = self.view.node_id
+        # root nodes are compared by their exported (xpointer) IDs
+        root_id = xpid(layer+':root_node')
         dominance_dict = defaultdict(lambda: defaultdict(str))
         for source_id, target_id, edge_attrs in dominance_edges:
-            if source_id != layer+':root_node':
+            if xpid(source_id) != root_id:
                 dominance_dict[source_id][target_id] = edge_attrs
 
         # in PAULA XML, token spans are also part of the hierarchy
@@ -336,20 +327,21 @@ class PaulaDocument(object):
         slist = E('structList', {'type': layer})
         for source_id in dominance_dict:
             struct = E('struct',
-                       {'id': str(source_id)})
+                       {'id': str(xpid(source_id))})
             if self.human_readable:
                 struct.append(Comment(self.dg.node[source_id].get('label')))
 
             for target_id in dominance_dict[source_id]:
                 if istoken(self.dg, target_id):
                     href = '{0}.xml#{1}'.format(self.paulamap['tokenization'],
-                                              target_id)
+                                              xpid(target_id))
                 else:
-                    href = '#{0}'.format(target_id)
+                    href = '#{0}'.format(xpid(target_id))
 
                 rel = E(
                     'rel',
-                    {'id': 'rel_{0}_{1}'.format(source_id, target_id),
+                    {'id': 'rel_{0}_{1}'.format(xpid(source_id),
+                                                xpid(target_id)),
                      'type': dominance_dict[source_id][target_id]['edge_type'],
                      XLINKHREF: href})
                 struct.append(rel)
@@ -382,7 +374,8 @@ class PaulaDocument(object):
         for node_id in select_nodes_by_layer(self.dg, top_level_layer):
             if not istoken(self.dg, node_id):
                 mfeat = E('multiFeat',
-                          {XLINKHREF: '#{0}'.format(node_id)})
+                          {XLINKHREF: '#{0}'.format(
+                              self.view.node_id(node_id))})
                 node_dict = self.dg.node[node_id]
                 for attr in node_dict:
                     if attr not in IGNORED_NODE_ATTRIBS:
@@ -412,9 +405,11 @@ class PaulaDocument(object):
         dominance_edges = select_edges_by(
             self.dg, layer=top_level_layer,
             edge_type=EdgeTypes.dominance_relation, data=True)
+        xpid = self.view.node_id
+        root_id = xpid(top_level_layer+':root_node')
         dominance_dict = defaultdict(lambda: defaultdict(str))
         for source_id, target_id, edge_attrs in dominance_edges:
-            if source_id != top_level_layer+':root_node':
+            if xpid(source_id) != root_id:
                 dominance_dict[source_id][target_id] = edge_attrs
 
         base_paula_id = self.paulamap['hierarchy'][top_level_layer]
@@ -422,7 +417,8 @@ class PaulaDocument(object):
                    {XMLBASE: base_paula_id+'.xml'})
         for source_id in dominance_dict:
             for target_id in dominance_dict[source_id]:
-                rel_href = '#rel_{0}_{1}'.format(source_id, target_id)
+                rel_href = '#rel_{0}_{1}'.format(xpid(source_id),
+                                                 xpid(target_id))
                 mfeat = E('multiFeat',
                           {XLINKHREF: rel_href})
                 edge_attrs = dominance_dict[source_id][target_id]
@@ -467,13 +463,15 @@ class PaulaDocument(object):
 
         # NOTE: we don't add a base file here, because the nodes could be
         # tokens or structural nodes
+        xpid = self.view.node_id
         rlist = E('relList')
         for source_id in pointing_dict:
             for target_id in pointing_dict[source_id]:
                 source_href = self.__gen_node_href(top_level_layer, source_id)
                 target_href = self.__gen_node_href(top_level_layer, target_id)
                 rel = E('rel',
-                        {'id': 'rel_{0}_{1}'.format(source_id, target_id),
+                        {'id': 'rel_{0}_{1}'.format(xpid(source_id),
+                                                    xpid(target_id)),
                          XLINKHREF: source_href,
                          'target': target_href})
 
@@ -510,12 +508,14 @@ class PaulaDocument(object):
         for source_id, target_id, edge_attrs in pointing_edges:
             pointing_dict[source_id][target_id] = edge_attrs
 
+        xpid = self.view.node_id
         base_paula_id = self.paulamap['pointing'][top_level_layer]
         mflist = E('multiFeatList',
                    {XMLBASE: base_paula_id+'.xml'})
         for source_id in pointing_dict:
             for target_id in pointing_dict[source_id]:
-                rel_href = '#rel_{0}_{1}'.format(source_id, target_id)
+                rel_href = '#rel_{0}_{1}'.format(xpid(source_id),
+                                                 xpid(target_id))
                 mfeat = E('multiFeat',
                           {XLINKHREF: rel_href})
                 edge_attrs = pointing_dict[source_id][target_id]
@@ -574,7 +574,7 @@ class PaulaDocument(object):
             base_paula_id = self.paulamap['tokenization']
         else:
             base_paula_id = self.paulamap['hierarchy'][layer]
-        return '{0}.xml#{1}'.format(base_paula_id, node_id)
+        return '{0}.xml#{1}'.format(base_paula_id, self.view.node_id(node_id))
 
 
 def paula_etree_to_string(tree, dtd_filename):
@@ -595,25 +595,6 @@ def gen_paula_etree(paula_id):
     return E, tree
 
 
-def get_onsets(token_tuples):
-    """
-    Parameters
-    ----------
-    token_tuples : list of (str, unicode)
-        a list/generator of (token ID, token string) tuples
-
-    Returns
-    -------
-    onset_tuples : generator of (str, int, int)
-        A list/generator of (token ID, onset, token length) tuples.
-        Note that PAULA starts counting string onsets with 1!
-    """
-    onset = 1
-    for (token_id, token) in token_tuples:
-        yield (token_id, onset, len(token))
-        onset += (len(token) + 1)
-
-
 def write_paula(docgraph, output_root_dir, human_readable=False):
     """
     converts a DiscourseDocumentGraph into a set of PAULA XML files
@@ -20,10 +20,9 @@ import sys
 
 from lxml import etree
 
-from discoursegraphs.util import (get_segment_token_offsets, natural_sort_key,
-                                  sanitize_string, TokenMapper)
+from discoursegraphs.util import get_segment_token_offsets, sanitize_string
 from discoursegraphs import (DiscourseDocumentGraph, EdgeTypes, get_span,
-                             istoken, select_neighbors_by_layer)
+                             istoken, select_neighbors_by_layer, sort_tokens)
 from discoursegraphs.readwrite.generic import generic_converter_cli
 from discoursegraphs.readwrite.rst.common import get_segment_label
 from discoursegraphs.readwrite.rst.rs3 import extract_relationtypes
@@ -206,8 +205,8 @@ class RSTGraph(DiscourseDocumentGraph):
                 # it, since 'span' is not very informative
                 if not self.ns+':segment_type' in self.node[group_id]:
                     group_attrs[self.ns+':segment_type'] = segment_type
-            self.node[group_id].update(group_attrs,
-                                       layers={self.ns, self.ns+':group'})
+            self.add_node(group_id, layers={self.ns, self.ns+':group'},
+                          attr_dict=group_attrs)
 
         if 'parent' not in group.attrib:  # mark group as RST root node
             # each discourse docgraphs has a default root node, but we will
@@ -215,12 +214,10 @@ class RSTGraph(DiscourseDocumentGraph):
             old_root_id = self.root
             self.root = group_id
             # workaround for #141: the layers attribute is append-only,
-            # but here we're updating it as a part of the attribute dict
-            #
+            # so we'll have to replace it explicitly
+            self.set_node_layers(group_id, {self.ns, self.ns+':root'})
             # root segment type: always span
-            root_attrs = {'layers': {self.ns, self.ns+':root'},
-                          self.ns+':segment_type': 'span'}
-            self.node[group_id].update(root_attrs)
+            self.node[group_id].update({self.ns+':segment_type': 'span'})
             # copy metadata from old root node
             self.node[group_id]['metadata'] = self.node[old_root_id]['metadata']
             # finally, remove the old root node
@@ -432,8 +429,9 @@ def get_rst_relations(docgraph):
             list(select_neighbors_by_layer(docgraph, dom_node,
                                            layer={'rst:segment', 'rst:group'}))
         multinuc_nuc_count = 1
-        directly_dominated_tokens = sorted([node for node in docgraph.neighbors(dom_node)
-                                            if istoken(docgraph, node)], key=natural_sort_key)
+        directly_dominated_tokens = sort_tokens(
+            docgraph, [node for node in docgraph.neighbors(dom_node)
+                       if istoken(docgraph, node)])
         if directly_dominated_tokens:
             rst_relations[dom_node]['tokens'] = directly_dominated_tokens
 
@@ -497,7 +495,7 @@ def get_rst_spans(rst_graph):
         ('rst:16-rst:2', 'N', 'evaluation-s', 9, 24),
         ('rst:16-rst:2', 'S', 'evaluation-s', 4, 8)]
     """
-    token_map = TokenMapper(rst_graph).id2index
+    token_map = rst_graph.token2position
     rst_relations = get_rst_relations(rst_graph)
     all_spans = []
     for dom_node in rst_relations:
@@ -15,7 +15,9 @@ import networkx as nx
 
 from discoursegraphs import DiscourseDocumentGraph, EdgeTypes
 from discoursegraphs.util import sanitize_string
-from discoursegraphs.readwrite.generic import XMLElementCountTarget
+from discoursegraphs.readwrite.generic import (
+    count_elements, dumps_docgraph, loads_docgraph, parallel_imap,
+    read_xml_element, XMLElementIndex)
 from discoursegraphs.readwrite.rst.common import get_segment_label
 
 
@@ -29,9 +31,14 @@ class URMLCorpus(object):
     little memory as possible. To retrieve the document graphs of the
     documents contained in the corpus, simply iterate over the class
     instance (or use the ``.next()`` method).
+
+    Single documents can be retrieved by their position or ID
+    (``corpus[3]``, ``corpus['maz3377']``, ``corpus[10:20]``), using an
+    index of the byte offsets of all <document> elements, which is stored
+    in a sidecar file next to the corpus file (cf. ``ExportXMLCorpus``).
     """
     def __init__(self, urml_file, name=None, debug=False, tokenize=True,
-                 precedence=False):
+                 precedence=False, index_file=None):
         """
         Parameters
         ----------
@@ -53,6 +60,10 @@ class URMLCorpus(object):
         precedence : bool
             If True (and if tokenize == True), add precedence relation edges
             (root precedes token1, which precedes token2 etc.)
+        index_file : str or None or False
+            path to the file that stores the byte offsets of all <document>
+            elements in the corpus. If None, ``urml_file`` + '.idx'
+            is used. If False, the index is only kept in memory.
         """
         self.name = name if name else os.path.basename(urml_file)
         self._num_of_documents = None
@@ -62,6 +73,13 @@ class URMLCorpus(object):
         self.tokenize = tokenize
         self.precedence = precedence
 
+        if index_file is None:
+            index_file = self.path + '.idx'
+        self.index_file = index_file
+        self.index = XMLElementIndex(self.path, 'document',
+                                     index_filepath=index_file or None,
+                                     id_attrib='id')
+
         self.__context = None
         self._reset_corpus_iterator()
 
@@ -81,18 +99,87 @@ class URMLCorpus(object):
             return self._num_of_documents
         return self._get_num_of_documents()
 
+    def __getitem__(self, key):
+        """
+        returns the document at the given position in the corpus or with
+        the given ID (or a list of documents, if ``key`` is a slice).
+        """
+        documents = [self._parse_document(position)
+                     for position in self.index.positions(key)]
+        return documents if isinstance(key, slice) else documents[0]
+
+    def get(self, document_id, default=None):
+        """
+        returns the document with the given ID (or ``default``, if the
+        corpus doesn't contain a <document> element with that ID).
+        """
+        try:
+            return self._parse_document(self.index.position(document_id))
+        except KeyError:
+            return default
+
+    def _parse_document(self, position):
+        """
+        parses the <document> element at the given position in the corpus
+        file into an URMLDocumentGraph (or returns the element itself, if
+        ``self.debug`` is set to ``True``).
+        """
+        document_elem = self.index.read_element(position)
+        if self.debug:
+            return document_elem
+        return URMLDocumentGraph(document_elem, tokenize=self.tokenize,
+                                 precedence=self.precedence)
+
+    def parallel_iter(self, workers=None, ordered=True, function=None,
+                      chunksize=1):
+        """
+        parses the documents of the corpus in a pool of worker processes
+        and yields the resulting URMLDocumentGraph instances
+        (cf. ``ExportXMLCorpus.parallel_iter()``).
+
+        Parameters
+        ----------
+        workers : int or None
+            number of worker processes. If None, one process per CPU
+            is used. If 1, the documents are parsed in this process.
+        ordered : bool
+            If True, yield the documents in corpus order. If False,
+            yield them as soon as they are parsed.
+        function : function or None
+            a module-level (i.e. picklable) function which takes an
+            URMLDocumentGraph and returns a picklable result
+        chunksize : int
+            number of documents sent to a worker process at once
+
+        Yields
+        ------
+        result : URMLDocumentGraph or object
+            the document graph of a <document> element (or the result of
+            calling ``function`` on it)
+        """
+        assert not self.debug, \
+            "parallel_iter() can't yield <document> elements in debug mode."
+        tasks = [(self.path, start, end, self.index.encoding,
+                  self.tokenize, self.precedence, function)
+                 for start, end, _document_id in self.index.offsets]
+
+        if workers == 1:
+            for task in tasks:
+                yield _parse_document_range(task, wire_format=False)
+            return
+
+        for result in parallel_imap(_parse_document_range, tasks,
+                                    workers=workers, ordered=ordered,
+                                    chunksize=chunksize):
+            yield result if function else loads_docgraph(result)
+
     def _get_num_of_documents(self):
         '''
-        counts the number of documents in an URML file.
-        adapted from Listing 2 on
-        http://www.ibm.com/developerworks/library/x-hiperfparse/
+        counts the number of documents in an URML file by scanning
+        its raw bytes for <document> start tags.
         '''
-        parser = etree.XMLParser(target=XMLElementCountTarget('document'))
-        # When iterated over, 'results' will contain the output from
-        # target parser's close() method
-        num_of_documents = etree.parse(self.urml_file, parser)
-        self._num_of_documents = num_of_documents
-        return num_of_documents
+        self._num_of_documents = count_elements(self.path, 'document')
+        return self._num_of_documents
 
     def __iter__(self):
         return iter(self.document_iter(self.__context))
@@ -401,4 +488,26 @@ def extract_segment_types(urml_document_element, namespace):
 
 
 # pseudo-function(s) to create a document graph from a URML file
+def _parse_document_range(task, wire_format=True):
+    """
+    parses an (urml_file, start, end, encoding, tokenize, precedence,
+    function) task into an URMLDocumentGraph. This is the worker function
+    used by ``URMLCorpus.parallel_iter()``.
+
+    Returns
+    -------
+    result : str or URMLDocumentGraph or object
+        the result of calling ``function`` on the document graph (if
+        ``function`` is given). Otherwise, the pickled document graph
+        (if ``wire_format`` is True) or the document graph itself.
+    """
+    urml_file, start, end, encoding, tokenize, precedence, function = task
+    document_elem = read_xml_element(urml_file, start, end, encoding)
+    docgraph = URMLDocumentGraph(document_elem, tokenize=tokenize,
+                                 precedence=precedence)
+    if function:
+        return function(docgraph)
+    return dumps_docgraph(docgraph) if wire_format else docgraph
+
+
 read_urml = URMLCorpus
@@ -8,10 +8,13 @@ document graph.
 """
 
 import os
+from collections import OrderedDict
+
 from lxml import etree
 
 import discoursegraphs as dg
-from discoursegraphs import DiscourseDocumentGraph, EdgeTypes
+from discoursegraphs import (DiscourseDocumentGraph, DocumentGraphBuilder,
+                             EdgeTypes)
 from discoursegraphs.util import natural_sort_key, ensure_unicode, add_prefix
 from discoursegraphs.readwrite.generic import generic_converter_cli
 from discoursegraphs.relabel import relabel_nodes
@@ -54,10 +57,13 @@ class TigerDocumentGraph(DiscourseDocumentGraph):
     tokens : list of str
         sorted list of all token node IDs contained in this document graph
     """
-    def __init__(self, tiger_filepath=None, name=None, namespace='tiger'):
+    def __init__(self, tiger_filepath=None, name=None, namespace='tiger',
+                 limit=None, sentence_ids=None):
         """
         Creates a directed graph that represents all syntax annotated
-        sentences in the given TigerXML file.
+        sentences in the given TigerXML file. The file is parsed one
+        sentence at a time (cf. ``iter_tiger_sentence_elements``), so the
+        complete DOM is never kept in memory.
 
         Parameters
         ----------
@@ -69,6 +75,10 @@ class TigerDocumentGraph(DiscourseDocumentGraph):
             given, the basename of the input file is used.
         namespace : str
             the namespace of the graph (default: tiger)
+        limit : int or None
+            If given, only add (at most) this many sentences to the graph.
+        sentence_ids : collection of str or None
+            If given, only add the sentences with these IDs to the graph.
         """
         # super calls __init__() of base class DiscourseDocumentGraph
         super(TigerDocumentGraph, self).__init__(namespace=namespace)
@@ -77,23 +87,21 @@ class TigerDocumentGraph(DiscourseDocumentGraph):
         if not tiger_filepath:
             return  # create empty document graph
 
-        utf8_parser = etree.XMLParser(encoding="utf-8")
-        tigerxml_tree = etree.parse(tiger_filepath, utf8_parser)
-        tigerxml_root = tigerxml_tree.getroot()
-
         self.name = name if name else os.path.basename(tiger_filepath)
-        self.corpus_id = tigerxml_root.attrib['id']
+        self.corpus_id = get_tiger_corpus_id(tiger_filepath)
 
         self.tokens = []
         self.sentences = []
-        for sentence in tigerxml_root.iterfind('./body/s'):
-            self.__add_sentence_to_document(sentence)
+        with DocumentGraphBuilder(self) as builder:
+            for sentence in iter_tiger_sentence_elements(
+                    tiger_filepath, limit=limit, sentence_ids=sentence_ids):
+                self.__add_sentence_to_document(builder, sentence)
         self.sentences = sorted(self.sentences, key=natural_sort_key)
 
-    def __add_sentence_to_document(self, sentence):
+    def __add_sentence_to_document(self, builder, sentence):
         """
-        Converts a sentence into a TigerSentenceGraph and adds all
-        its nodes, edges (and their features) to this document graph.
+        Adds all the nodes and edges (and their features) of a sentence
+        directly to this document graph (cf. ``add_tiger_sentence``).
 
         This also adds a ``dominance_relation`` edge from the root node of this
         document graph to the root node of the sentence and appends the
@@ -101,18 +109,17 @@ class TigerDocumentGraph(DiscourseDocumentGraph):
 
         Parameters
         ----------
+        builder : DocumentGraphBuilder
+            the builder that collects the nodes/edges of the document
         sentence : lxml.etree._Element
             a sentence from a TigerXML file in etree element format
         """
-        sentence_graph = TigerSentenceGraph(sentence)
-        self.tokens.extend(sentence_graph.tokens)
-        sentence_root_node_id = sentence_graph.root
-
-        self.add_nodes_from(sentence_graph.nodes(data=True))
-        self.add_edges_from(sentence_graph.edges(data=True))
-        self.add_edge(self.root, sentence_root_node_id,
-                      layers={self.ns, self.ns+':sentence'},
-                      edge_type=EdgeTypes.dominance_relation)
+        sentence_root_node_id, sentence_tokens = add_tiger_sentence(
+            builder, sentence, self.ns)
+        self.tokens.extend(sentence_tokens)
+        builder.add_edge(self.root, sentence_root_node_id,
+                         layers={self.ns, self.ns+':sentence'},
+                         edge_type=EdgeTypes.dominance_relation)
         self.sentences.append(sentence_root_node_id)
 
 
@@ -121,6 +128,9 @@ class TigerSentenceGraph(DiscourseDocumentGraph):
     A directed graph (based on a networkx.MultiDiGraph) that represents
     one syntax annotated sentence extracted from a TigerXML file.
 
+    ``TigerDocumentGraph`` adds sentences directly to the document graph,
+    so this class is only needed to look at a single sentence in isolation.
+
     Attributes
     ----------
     ns : str
@@ -149,142 +159,300 @@ class TigerSentenceGraph(DiscourseDocumentGraph):
         super(TigerSentenceGraph, self).__init__(namespace=namespace)
         self.remove_node(self.root)  # delete default root node
         self.ns = namespace
-
-        self.tokens = []
-
-        graph_element = sentence.find('./graph')
-        self.root = graph_element.attrib['root']
         self.name = sentence.attrib.get('id', '')
 
-        # sentence.attrib is a lxml.etree._Attrib, which is 'dict-like'
-        # but doesn't behave exactly like a dict (i.e. it threw an error
-        # when I tried to update it)
-        sentence_attributes = add_prefix(sentence.attrib, self.ns+':')
+        with DocumentGraphBuilder(self) as builder:
+            self.root, self.tokens = add_tiger_sentence(builder, sentence,
+                                                        namespace)
 
-        # some sentences in the Tiger corpus are marked as discontinuous
-        if 'discontinuous' in graph_element.attrib:
-            sentence_attributes.update(
-                {self.ns+':discontinuous':
-                    graph_element.attrib['discontinuous']})
 
-        self.__tigersentence2graph(sentence)
-        self.__repair_unconnected_nodes()
+class TigerCorpus(object):
+    """
+    represents a TigerXML file as an iterable over TigerSentenceGraph
+    instances (or an iterable over <s> elements if ``debug`` is set to
+    ``True``).
 
-    def __tigersentence2graph(self, sentence):
+    The file is parsed iteratively (one sentence at a time), so even
+    large treebanks can be processed with little memory. Each iteration
+    over the corpus starts at the beginning of the file.
+    """
+    def __init__(self, tiger_filepath, name=None, namespace='tiger',
+                 limit=None, sentence_ids=None, debug=False):
         """
-        Reads a sentence with syntax annotation (parsed from a TigerXML
-        file) into this directed graph. Adds an attribute named 'tokens'
-        to the sentence root node containing a sorted list of token node
-        IDs. (The same list is also stored in ``self.tokens``).
-
         Parameters
         ----------
-        sentence : lxml.etree._Element
-            a sentence from a TigerXML file in etree element format
+        tiger_filepath : str
+            path to a TigerXML file
+        name : str or None
+            the name of the corpus. If no name is given, the basename of
+            the input file is used.
+        namespace : str
+            the namespace of the sentence graphs (default: tiger)
+        limit : int or None
+            If given, only iterate over (at most) this many sentences.
+        sentence_ids : collection of str or None
+            If given, only iterate over the sentences with these IDs.
+        debug : bool
+            If True, yield the etree element representations of the <s>
+            elements instead of TigerSentenceGraph instances.
+            (default: False)
         """
-        # add sentence root to graph
-        self.add_node(self.root,
-                      layers={self.ns, self.ns+':sentence',
-                              self.ns+':sentence:root',
-                              self.ns+':syntax'})
-
-        token_ids = []
-        # add terminals to graph (tokens)
-        for t in sentence.iterfind('./graph/terminals/t'):
-            terminal_id = t.attrib['id']
-            token_ids.append(terminal_id)
-            # all token attributes shall belong to the tiger namespace
-            terminal_features = add_prefix(t.attrib, self.ns+':')
-            # convert tokens to unicode
-            terminal_features[self.ns+':token'] = ensure_unicode(
-                terminal_features[self.ns+':word'])
-            self.add_node(terminal_id, layers={self.ns, self.ns+':token'},
-                          attr_dict=terminal_features,
-                          label=terminal_features[self.ns+':token'])
-
-            # add secedge pointing relations from tokens to other tokens or
-            # syntactic categories
-            for secedge in t.iterfind('./secedge'):
-                to_id = secedge.attrib['idref']
-                secedge_attribs = add_prefix(secedge.attrib, self.ns+':')
-                if to_id not in self:  # if graph doesn't contain to-node, yet
-                    self.add_node(to_id, layers={self.ns, self.ns+':secedge'})
-                self.add_edge(terminal_id, to_id,
-                              layers={self.ns, self.ns+':secedge'},
-                              attr_dict=secedge_attribs,
-                              edge_type=EdgeTypes.pointing_relation)
-
-        # add sorted list of all token node IDs to sentence root node
-        # to make queries simpler/faster
-        sorted_token_ids = sorted(token_ids, key=natural_sort_key)
-        self.node[self.root].update({'tokens': sorted_token_ids})
-        self.tokens = sorted_token_ids
-
-        # add nonterminals (syntax categories) to graph
-        for nt in sentence.iterfind('./graph/nonterminals/nt'):
-            from_id = nt.attrib['id']
-            nt_feats = add_prefix(nt.attrib, self.ns+':')
-            nt_feats['label'] = nt_feats[self.ns+':cat']
-            # root node already exists, but doesn't have a cat value
-            if from_id in self:
-                self.node[from_id].update(nt_feats)
+        self.name = name if name else os.path.basename(tiger_filepath)
+        self.tiger_filepath = tiger_filepath
+        self.path = os.path.abspath(tiger_filepath)
+        self.ns = namespace
+        self.limit = limit
+        self.sentence_ids = sentence_ids
+        self.debug = debug
+
+    @property
+    def corpus_id(self):
+        """the ID of the corpus (i.e. the 'id' of the <corpus> element)"""
+        return get_tiger_corpus_id(self.tiger_filepath)
+
+    def __iter__(self):
+        sentences = iter_tiger_sentence_elements(
+            self.tiger_filepath, limit=self.limit,
+            sentence_ids=self.sentence_ids)
+        for sentence in sentences:
+            if self.debug:
+                yield sentence
             else:
-                self.add_node(from_id, layers={self.ns, self.ns+':syntax'},
-                              attr_dict=nt_feats)
-
-            # add edges to graph (syntax cat dominances token/other cat)
-            for edge in nt.iterfind('./edge'):
-                to_id = edge.attrib['idref']
-                if to_id not in self:  # if graph doesn't contain to-node, yet
-                    self.add_node(to_id, layers={self.ns, self.ns+':secedge'})
-                edge_attribs = add_prefix(edge.attrib, self.ns+':')
-
-                # add a spanning relation from a syntax cat to a token
-                if self.ns+':token' in self.node[to_id]['layers']:
-                    edge_type = EdgeTypes.spanning_relation
-                else:  # add a dominance relation between two syntax categories
-                    edge_type = EdgeTypes.dominance_relation
-
-                self.add_edge(from_id, to_id,
-                              layers={self.ns, self.ns+':edge'},
-                              attr_dict=edge_attribs,
-                              label=edge_attribs[self.ns+':label'],
-                              edge_type=edge_type)
-
-            # add secondary edges to graph (cat points to other cat/token)
-            for secedge in nt.iterfind('./secedge'):
-                to_id = secedge.attrib['idref']
-                if to_id not in self:  # if graph doesn't contain to-node, yet
-                    self.add_node(to_id, layers={self.ns, self.ns+':secedge'})
-                secedge_attribs = add_prefix(secedge.attrib, self.ns+':')
-                self.add_edge(from_id, to_id,
-                              layers={self.ns, self.ns+':secedge'},
-                              attr_dict=secedge_attribs,
-                              label=edge_attribs[self.ns+':label'],
-                              edge_type=EdgeTypes.pointing_relation)
-
-    def __repair_unconnected_nodes(self):
+                yield TigerSentenceGraph(sentence, namespace=self.ns)
+
+    def document_graph(self, name=None):
         """
-        Adds a (``dominance_relation``) edge from the sentence root node to all
-        previously unconnected nodes (token nodes, that either represent a
-        punctuation mark or are part of a headline 'sentence' that has no
-        full syntax structure annotation).
+        returns a TigerDocumentGraph that contains all the (selected)
+        sentences of the corpus.
         """
-        unconnected_node_ids = get_unconnected_nodes(self)
-        if dg.istoken(self, self.root):
-            # This sentence has no hierarchical structure, i.e. the root
-            # node is also a terminal / token node.
-            # We will add a virtual root node to compensate for this.
-            self.root = self.ns+':VROOT'
-            self.add_node(self.root,
-                layers={'tiger', 'tiger:syntax', 'tiger:sentence',
-                        'tiger:sentence:root'})
-
-        for unconnected_node_id in unconnected_node_ids:
-            self.add_edge(self.root, unconnected_node_id,
-                          layers={self.ns, self.ns+':sentence',
-                                  self.ns+':unconnected'},
-                          edge_type=EdgeTypes.dominance_relation)
+        return TigerDocumentGraph(
+            self.tiger_filepath, name=name if name else self.name,
+            namespace=self.ns, limit=self.limit,
+            sentence_ids=self.sentence_ids)
+
+
+def get_tiger_corpus_id(tiger_filepath):
+    """
+    returns the ID of a TigerXML corpus (i.e. the 'id' attribute of its
+    <corpus> root element) without parsing the rest of the file.
+    """
+    _event, corpus = next(iter(etree.iterparse(tiger_filepath,
+                                               events=('start',))))
+    return corpus.attrib['id']
+
+
+def iter_tiger_sentence_elements(tiger_filepath, limit=None,
+                                 sentence_ids=None):
+    """
+    Iterates over the <s> elements of a TigerXML file (using iterparse).
+    For efficiency, each element is removed from the DOM / main memory
+    after it was processed.
+
+    Parameters
+    ----------
+    tiger_filepath : str
+        path to a TigerXML file
+    limit : int or None
+        If given, stop after (at most) this many sentences.
+    sentence_ids : collection of str or None
+        If given, only yield the sentences with these IDs (and stop
+        parsing as soon as all of them were found).
+
+    Yields
+    ------
+    sentence : lxml.etree._Element
+        a sentence from a TigerXML file in etree element format
+    """
+    if limit is not None and limit < 1:
+        return
+    if sentence_ids is not None:
+        sentence_ids = set(sentence_ids)
+        if not sentence_ids:
+            return
+
+    num_of_sentences = 0
+    context = etree.iterparse(tiger_filepath, events=('end',), tag='s',
+                              encoding='utf-8')
+    for _event, elem in context:
+        sentence_id = elem.attrib.get('id')
+        if sentence_ids is None or sentence_id in sentence_ids:
+            yield elem
+            num_of_sentences += 1
+            if sentence_ids is not None:
+                sentence_ids.discard(sentence_id)
+
+        # removes element (and references to it) from memory after processing it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+        if num_of_sentences == limit or sentence_ids == set():
+            break
+    del context
+
+
+def iter_tiger_sentences(tiger_filepath, namespace='tiger', limit=None,
+                         sentence_ids=None):
+    """
+    Iterates over the sentences of a TigerXML file (using iterparse) and
+    yields a TigerSentenceGraph for each of them.
+
+    Parameters
+    ----------
+    tiger_filepath : str
+        path to a TigerXML file
+    namespace : str
+        the namespace of the sentence graphs (default: tiger)
+    limit : int or None
+        If given, stop after (at most) this many sentences.
+    sentence_ids : collection of str or None
+        If given, only yield the sentences with these IDs.
+
+    Yields
+    ------
+    sentence_graph : TigerSentenceGraph
+        a graph representing one sentence
+    """
+    sentences = iter_tiger_sentence_elements(tiger_filepath, limit=limit,
+                                             sentence_ids=sentence_ids)
+    for sentence in sentences:
+        yield TigerSentenceGraph(sentence, namespace=namespace)
+
+
+def add_tiger_sentence(builder, sentence, namespace='tiger'):
+    """
+    Adds all the nodes and edges of a syntax annotated sentence (i.e.
+    a <s> element from a TigerXML file parsed into an lxml etree
+    Element) to the given ``DocumentGraphBuilder``. The sentence root node
+    gets an attribute named 'tokens', which contains a sorted list of
+    the token node IDs of the sentence.
+
+    Nodes that aren't connected to any other node of the sentence (token
+    nodes, that either represent a punctuation mark or are part of a
+    headline 'sentence' that has no full syntax structure annotation) will
+    be connected to the sentence root node via a ``dominance_relation``.
+
+    Parameters
+    ----------
+    builder : DocumentGraphBuilder
+        the builder that collects the nodes/edges of a document graph
+    sentence : lxml.etree._Element
+        a sentence from a TigerXML file in etree element format
+    namespace : str
+        the namespace of the sentence (default: tiger)
+
+    Returns
+    -------
+    root : str
+        the node ID of the root node of the sentence
+    tokens : list of str
+        a sorted list of the token node IDs of the sentence
+    """
+    ns = namespace
+    # maps from the node IDs of this sentence to their attribute dicts
+    # (in the order they were added)
+    node_attribs = OrderedDict()
+    # IDs of all nodes that are the source/target of an edge
+    connected_nodes = set()
+
+    def add_node(node_id, layers, attr_dict):
+        builder.add_node(node_id, layers=layers, attr_dict=attr_dict)
+        node_attribs.setdefault(node_id, attr_dict)
+
+    def add_edge(source_id, target_id, layers, attr_dict, **attr):
+        builder.add_edge(source_id, target_id, layers=layers,
+                         attr_dict=attr_dict, **attr)
+        connected_nodes.update((source_id, target_id))
+
+    # add sentence root to graph
+    root = sentence.find('./graph').attrib['root']
+    add_node(root, {ns, ns+':sentence', ns+':sentence:root', ns+':syntax'},
+             {})
+
+    token_ids = []
+    # add terminals to graph (tokens)
+    for t in sentence.iterfind('./graph/terminals/t'):
+        terminal_id = t.attrib['id']
+        token_ids.append(terminal_id)
+        # all token attributes shall belong to the tiger namespace
+        terminal_features = add_prefix(t.attrib, ns+':')
+        # convert tokens to unicode
+        terminal_features[ns+':token'] = ensure_unicode(
+            terminal_features[ns+':word'])
+        terminal_features['label'] = terminal_features[ns+':token']
+        add_node(terminal_id, {ns, ns+':token'}, terminal_features)
+
+        # add secedge pointing relations from tokens to other tokens or
+        # syntactic categories
+        for secedge in t.iterfind('./secedge'):
+            to_id = secedge.attrib['idref']
+            secedge_attribs = add_prefix(secedge.attrib, ns+':')
+            if to_id not in node_attribs:  # sentence doesn't contain to-node
+                add_node(to_id, {ns, ns+':secedge'}, {})
+            add_edge(terminal_id, to_id, {ns, ns+':secedge'}, secedge_attribs,
+                     edge_type=EdgeTypes.pointing_relation)
+
+    # add sorted list of all token node IDs to sentence root node
+    # to make queries simpler/faster
+    sorted_token_ids = sorted(token_ids, key=natural_sort_key)
+    node_attribs[root].update({'tokens': sorted_token_ids})
+    terminals = set(token_ids)
+
+    # add nonterminals (syntax categories) to graph
+    for nt in sentence.iterfind('./graph/nonterminals/nt'):
+        from_id = nt.attrib['id']
+        nt_feats = add_prefix(nt.attrib, ns+':')
+        nt_feats['label'] = nt_feats[ns+':cat']
+        # root node already exists, but doesn't have a cat value
+        if from_id in node_attribs:
+            node_attribs[from_id].update(nt_feats)
+        else:
+            add_node(from_id, {ns, ns+':syntax'}, nt_feats)
+
+        # add edges to graph (syntax cat dominances token/other cat)
+        for edge in nt.iterfind('./edge'):
+            to_id = edge.attrib['idref']
+            if to_id not in node_attribs:  # sentence doesn't contain to-node
+                add_node(to_id, {ns, ns+':secedge'}, {})
+            edge_attribs = add_prefix(edge.attrib, ns+':')
+
+            # add a spanning relation from a syntax cat to a token
+            if to_id in terminals:
+                edge_type = EdgeTypes.spanning_relation
+            else:  # add a dominance relation between two syntax categories
+                edge_type = EdgeTypes.dominance_relation
+
+            add_edge(from_id, to_id, {ns, ns+':edge'}, edge_attribs,
+                     label=edge_attribs[ns+':label'], edge_type=edge_type)
+
+        # add secondary edges to graph (cat points to other cat/token)
+        for secedge in nt.iterfind('./secedge'):
+            to_id = secedge.attrib['idref']
+            if to_id not in node_attribs:  # sentence doesn't contain to-node
+                add_node(to_id, {ns, ns+':secedge'}, {})
+            secedge_attribs = add_prefix(secedge.attrib, ns+':')
+            add_edge(from_id, to_id, {ns, ns+':secedge'}, secedge_attribs,
+                     label=edge_attribs[ns+':label'],
+                     edge_type=EdgeTypes.pointing_relation)
+
+    # A node is unconnected, if it doesn't have any in- or outgoing edges
+    # (unless the sentence only consists of that particular node).
+    unconnected_node_ids = [node_id for node_id in node_attribs
+                            if node_id not in connected_nodes
+                            and len(node_attribs) > 1]
+    if root in terminals:
+        # This sentence has no hierarchical structure, i.e. the root
+        # node is also a terminal / token node.
+        # We will add a virtual root node to compensate for this.
+        root = ns+':VROOT'
+        add_node(root, {'tiger', 'tiger:syntax', 'tiger:sentence',
+                        'tiger:sentence:root'}, {})
+
+    for unconnected_node_id in unconnected_node_ids:
+        add_edge(root, unconnected_node_id,
+                 {ns, ns+':sentence', ns+':unconnected'}, {},
+                 edge_type=EdgeTypes.dominance_relation)
+    return root, sorted_token_ids
 
 
 def _get_terminals_and_nonterminals(sentence_graph):
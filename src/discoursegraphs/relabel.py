@@ -6,15 +6,14 @@
 #    BSD license.
 
 """
-This is a slightly modified version of ``networkx.relabel``. The only
-difference between the two versions is that this one supports the ``layers``
-attribute (which each node and edge in a ``DisourseDocumentGraph``) must have.
+This is a slightly modified version of ``networkx.relabel``. It supports the
+``layers`` attribute (which each node and edge in a ``DisourseDocumentGraph``)
+must have and relabels nodes in place in a single pass (instead of removing
+and re-adding each node and its edges).
 """
 
 # flake8: noqa
 
-from copy import deepcopy
-
 import networkx as nx
 __author__ = """\n""".join(['Aric Hagberg <aric.hagberg@gmail.com>',
                            'Pieter Swart (swart@lanl.gov)',
@@ -73,9 +72,16 @@ def relabel_nodes(G, mapping, copy=True):
     -----
     Only the nodes specified in the mapping will be relabeled.
 
-    The keyword setting copy=False modifies the graph in place.
-    This is not always possible if the mapping is circular.
-    In that case use copy=True.
+    The keyword setting copy=False modifies the graph in place (keeping
+    the order of its nodes). Overlapping and circular mappings are
+    supported.
+
+    Nodes that are mapped onto themselves are left untouched. (Before
+    the single-pass relabeling, such nodes were removed and re-added by
+    their edges, which reset their attributes and layers. This is why the
+    PAULA exporter, which maps all node IDs to XPointer compatible ones,
+    used to put e.g. the ``tiger`` and ``mmax`` nodes of a merged document
+    into the ``rst`` layer.)
 
     See Also
     --------
@@ -94,58 +100,111 @@ def relabel_nodes(G, mapping, copy=True):
 
 
 def _relabel_inplace(G, mapping):
-    old_labels = set(mapping.keys())
-    new_labels = set(mapping.values())
-    if len(old_labels & new_labels) > 0:
-        # labels sets overlap
-        # can we topological sort and still do the relabeling?
-        D = nx.DiGraph(list(mapping.items()))
-        D.remove_edges_from(D.selfloop_edges())
-        try:
-            nodes = nx.topological_sort(D)
-        except nx.NetworkXUnfeasible:
-            raise nx.NetworkXUnfeasible('The node label sets are overlapping '
-                                        'and no ordering can resolve the '
-                                        'mapping. Use copy=True.')
-        nodes.reverse()  # reverse topological order
-    else:
-        # non-overlapping label sets
-        nodes = old_labels
+    """
+    relabels the nodes of G in place, rebuilding its node, successor and
+    predecessor dicts in a single pass. The order of the nodes and edges
+    is kept, i.e. a relabeled node keeps its position. If a node is
+    relabeled to the label of another node, both are merged (the
+    attributes of the relabeled node and of its edges take precedence,
+    layers are united).
+    Nodes mapped onto themselves keep their attributes and layers.
+    """
+    for old in mapping:
+        if old not in G.node:
+            raise KeyError("Node {0} is not in the graph".format(old))
+    mapping = {old: new for old, new in mapping.iteritems() if old != new}
+    if not mapping:
+        return G
 
     multigraph = G.is_multigraph()
-    directed = G.is_directed()
-
-    for old in nodes:
-        try:
-            new = mapping[old]
-        except KeyError:
-            continue
-        try:
-            layers = G.node[old]['layers']
-            G.add_node(new, layers, attr_dict=G.node[old])
-        except KeyError:
-            raise KeyError("Node {0} is not in the graph".format(old))
-        if multigraph:
-            new_edges = [(new, old == target and new or target, key, data)
-                         for (_, target, key, data)
-                         in G.edges(old, data=True, keys=True)]
-            if directed:
-                new_edges += [(old == source and new or source, new, key, data)
-                              for (source, _, key, data)
-                              in G.in_edges(old, data=True, keys=True)]
+    intern_layers = getattr(G, '_intern_layers', frozenset)
+
+    def merge_attrs(attrs, other_attrs, override):
+        """merges the attributes of a node/edge into the ones of another"""
+        layers = attrs.get('layers')
+        if override:
+            attrs.update(other_attrs)
+        else:
+            for key, value in other_attrs.iteritems():
+                attrs.setdefault(key, value)
+        if layers is not None and 'layers' in other_attrs:
+            attrs['layers'] = intern_layers(
+                layers.union(other_attrs['layers']))
+
+    # the relabeled dicts are collected in plain dicts (and their order in
+    # lists), as filling the (slow) OrderedDicts of a document graph twice
+    # would double the costs
+    new_node = {}
+    new_nodes = []
+    for old, attrs in G.node.iteritems():
+        new = mapping.get(old, old)
+        if new in new_node:
+            merge_attrs(new_node[new], attrs, override=old in mapping)
         else:
-            new_edges = [(new, old == target and new or target, data)
-                         for (_, target, data) in G.edges(old, data=True)]
-            if directed:
-                new_edges += [(old == source and new or source, new, data)
-                              for (source, _, data) in G.in_edges(old, data=True)]
-        G.remove_node(old)
-        G.add_edges_from(new_edges)
+            new_node[new] = attrs
+            new_nodes.append(new)
+
+    def relabel_adjacency(adj):
+        """
+        returns a new adjacency dict with relabeled nodes and neighbors,
+        (re)using the given edge attribute dicts / key dicts.
+        """
+        new_adj = {}
+        for old, nbrs in adj.iteritems():
+            new = mapping.get(old, old)
+            if new not in new_adj:
+                new_adj[new] = nbrs.__class__()
+            new_nbrs = new_adj[new]
+            for old_nbr, edge_data in nbrs.iteritems():
+                new_nbr = mapping.get(old_nbr, old_nbr)
+                if new_nbr not in new_nbrs:
+                    new_nbrs[new_nbr] = edge_data
+                elif new_nbrs[new_nbr] is not edge_data:
+                    # two edges were merged by relabeling their nodes. the
+                    # attributes of the relabeled edge take precedence.
+                    merged_data = new_nbrs[new_nbr]
+                    override = old in mapping or old_nbr in mapping
+                    if multigraph:
+                        for key, attrs in edge_data.iteritems():
+                            if key in merged_data:
+                                merge_attrs(merged_data[key], attrs, override)
+                            else:
+                                merged_data[key] = attrs
+                    else:
+                        merge_attrs(merged_data, edge_data, override)
+        return new_adj
+
+    new_succ = relabel_adjacency(G.adj)
+    if G.is_directed():
+        # the predecessor dicts must share the edge data of the successors
+        new_pred = {}
+        for old, nbrs in G.pred.iteritems():
+            new = mapping.get(old, old)
+            if new not in new_pred:
+                new_pred[new] = nbrs.__class__()
+            for old_nbr in nbrs:
+                new_nbr = mapping.get(old_nbr, old_nbr)
+                new_pred[new][new_nbr] = new_succ[new_nbr][new]
+        G.pred.clear()
+        G.pred.update((node, new_pred[node]) for node in new_nodes)
+
+    # update the dicts in place, as they are referenced by several attributes
+    # (e.g. adj, succ and edge)
+    G.node.clear()
+    G.node.update((node, new_node[node]) for node in new_nodes)
+    G.adj.clear()
+    G.adj.update((node, new_succ[node]) for node in new_nodes)
+
+    rebuild_index = getattr(G, '_rebuild_index', None)
+    if rebuild_index is not None:  # e.g. the layer index of a document graph
+        rebuild_index()
     return G
 
 
 def _relabel_copy(G, mapping):
-    H = deepcopy(G)
+    # the copy of a document graph shares its attribute values with G,
+    # which is much cheaper than a deepcopy
+    H = G.copy()
     return _relabel_inplace(H, mapping)
 
 
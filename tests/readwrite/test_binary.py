@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursegraphs.programming@arne.cl>
+
+import pytest
+
+import discoursegraphs as dg
+from discoursegraphs.corpora import pcc
+from discoursegraphs.readwrite.binary import MappedArray, PREFIX
+
+
+def test_binary_roundtrip(tmpdir):
+    """a document graph survives a save/load round trip"""
+    docgraph = pcc.get_document('maz-1423')
+    binary_file = str(tmpdir.join('maz-1423.dg'))
+    dg.save(docgraph, binary_file)
+
+    loaded = dg.load(binary_file)
+    assert isinstance(loaded, docgraph.__class__)
+    assert loaded.name == docgraph.name
+    assert loaded.nodes(data=True) == docgraph.nodes(data=True)
+    assert sorted(loaded.edges(keys=True, data=True)) == \
+        sorted(docgraph.edges(keys=True, data=True))
+    assert loaded.tokens == docgraph.tokens
+    assert dg.get_text(loaded) == dg.get_text(docgraph)
+
+    # metadata can still be added on the fly
+    metadata = loaded.node[loaded.root]['metadata']
+    metadata['foo']['bar'] = 'baz'
+    assert 'foo' not in docgraph.node[docgraph.root]['metadata']
+
+
+def test_binary_frozen(tmpdir):
+    """a stored graph can be loaded as a (memory-mapped) frozen graph"""
+    docgraph = pcc.get_document('maz-1423')
+    binary_file = str(tmpdir.join('maz-1423.dg'))
+    dg.write_binary(docgraph.freeze(), binary_file)
+
+    for mmap in (False, True):
+        frozen = dg.read_binary(binary_file, frozen=True, mmap=mmap)
+        assert isinstance(frozen, dg.FrozenDocumentGraph)
+        assert isinstance(frozen._in_ptr, MappedArray) == mmap
+        assert frozen.nodes(data=True) == docgraph.nodes(data=True)
+        assert sorted(frozen.edges(data=True)) == \
+            sorted(docgraph.edges(data=True))
+        for layer in ('mmax:markable', 'tiger:syntax', 'rst'):
+            assert list(dg.select_nodes_by_layer(frozen, layer)) == \
+                list(dg.select_nodes_by_layer(docgraph, layer))
+        assert dg.get_text(frozen) == dg.get_text(docgraph)
+
+    with pytest.raises(ValueError):
+        dg.load(pcc.rst[0])
+
+
+def test_binary_truncated(tmpdir):
+    """truncated files are rejected with a ValueError"""
+    docgraph = pcc.get_document('maz-1423')
+    binary_file = str(tmpdir.join('maz-1423.dg'))
+    dg.save(docgraph, binary_file)
+    with open(binary_file, 'rb') as binary:
+        binary_str = binary.read()
+
+    truncated_file = str(tmpdir.join('truncated.dg'))
+    for length in (3, PREFIX.size + 10, len(binary_str) - 8):
+        with open(truncated_file, 'wb') as truncated:
+            truncated.write(binary_str[:length])
+        for frozen, mmap in ((False, False), (True, False), (True, True)):
+            with pytest.raises(ValueError):
+                dg.load(truncated_file, frozen=frozen, mmap=mmap)
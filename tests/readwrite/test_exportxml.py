@@ -11,7 +11,7 @@ import pytest
 
 import discoursegraphs as dg
 from discoursegraphs.readwrite.exportxml import (
-    ExportXMLCorpus, ExportXMLDocumentGraph)
+    ExportXMLCorpus, ExportXMLDocumentGraph, ExportXMLSentenceGraph)
 
 
 class Capturing(list):
@@ -281,3 +281,131 @@ def test_read_exportxml():
     text_elem = next(exportxml_corpus_debug)
     assert isinstance(text_elem, lxml.etree._Element)
     assert text_elem.tag == 'text'
+
+
+def test_exportxml_corpus_index(tmpdir):
+    """An ExportXML corpus can be accessed by position and xml:id."""
+    exportxml_filepath = str(tmpdir.join('exportxml-example.xml'))
+    with open(os.path.join(dg.DATA_ROOT_DIR, 'exportxml-example.xml')) as example:
+        example_str = example.read()
+    with open(exportxml_filepath, 'w') as exportxml_file:
+        exportxml_file.write(example_str)
+
+    exportxml_corpus = ExportXMLCorpus(exportxml_filepath)
+    assert len(exportxml_corpus) == 3
+    assert os.path.isfile(exportxml_filepath + '.idx')
+    assert [text_id for _, _, text_id in exportxml_corpus.offsets] == \
+        ['text_0', 'text_9', 'text_22']
+
+    for docgraph, expected_stats in ((exportxml_corpus[1], text_9_stats),
+                                     (exportxml_corpus[-1], text_22_stats),
+                                     (exportxml_corpus.get('text_0'), text_0_stats)):
+        with Capturing() as output:
+            dg.info(docgraph)
+        assert output == expected_stats
+
+    assert [docgraph.name for docgraph in exportxml_corpus[1:]] == \
+        ['text_9', 'text_22']
+    assert exportxml_corpus.get('text_1') is None
+    with pytest.raises(IndexError):
+        exportxml_corpus[3]
+
+    debug_corpus = ExportXMLCorpus(exportxml_filepath, debug=True)
+    assert debug_corpus[0].tag == 'text'
+
+    # the index is rebuilt when the corpus file changes
+    text_22_start = example_str.index('<text xml:id="text_22"')
+    with open(exportxml_filepath, 'w') as exportxml_file:
+        exportxml_file.write(example_str[:text_22_start] + '</body>\n</exml-doc>\n')
+    os.utime(exportxml_filepath, (0, 0))
+    assert len(ExportXMLCorpus(exportxml_filepath)) == 2
+    assert len(exportxml_corpus) == 2
+
+
+def test_exportxml_corpus_parallel_iter():
+    """An ExportXML corpus can be parsed by multiple worker processes."""
+    exportxml_filepath = os.path.join(dg.DATA_ROOT_DIR, 'exportxml-example.xml')
+    exportxml_corpus = ExportXMLCorpus(exportxml_filepath, index_file=False)
+
+    docgraph_stats = []
+    for docgraph in exportxml_corpus.parallel_iter(workers=2):
+        assert isinstance(docgraph, ExportXMLDocumentGraph)
+        # the parser dispatch table isn't pickled, but rebuilt
+        assert docgraph.parsers['word'].__self__ is docgraph
+        with Capturing() as output:
+            dg.info(docgraph)
+        docgraph_stats.append(output)
+    assert docgraph_stats == [text_0_stats, text_9_stats, text_22_stats]
+
+    unordered_names = [docgraph.name for docgraph in
+                       exportxml_corpus.parallel_iter(workers=2, ordered=False)]
+    assert sorted(unordered_names) == ['text_0', 'text_22', 'text_9']
+
+    assert list(exportxml_corpus.parallel_iter(workers=2, function=len)) == \
+        list(exportxml_corpus.parallel_iter(workers=1, function=len)) == \
+        [1592, 1369, 1331]
+
+
+def test_exportxml_include_layers():
+    """Only the selected annotation layers are added to the document graph."""
+    exportxml_filepath = os.path.join(dg.DATA_ROOT_DIR, 'exportxml-example.xml')
+    text_elem = ExportXMLCorpus(
+        exportxml_filepath, debug=True, index_file=False)[0]
+    full_docgraph = ExportXMLDocumentGraph(text_elem)
+
+    def coreference_edges(docgraph):
+        return sorted((source, target) for source, target in
+                      dg.select_edges_by(docgraph, layer='exportxml:coreference'))
+
+    coref_docgraph = ExportXMLDocumentGraph(
+        text_elem, include_layers={'coreference'})
+    # coreference relations need the syntax layer
+    assert 'exportxml:syntax' in coref_docgraph.layer2nodes
+    assert 'exportxml:ne' not in coref_docgraph.layer2nodes
+    assert coreference_edges(coref_docgraph) == coreference_edges(full_docgraph)
+
+    token_docgraph = ExportXMLDocumentGraph(text_elem, include_layers=set())
+    assert token_docgraph.tokens == full_docgraph.tokens
+    assert dg.get_text(token_docgraph) == dg.get_text(full_docgraph)
+    assert set(token_docgraph.layer2nodes) == {'exportxml', 'exportxml:token'}
+    for sentence_id in token_docgraph.sentences:
+        assert dg.get_span(token_docgraph, sentence_id) == \
+            dg.get_span(full_docgraph, sentence_id)
+
+    with pytest.raises(AssertionError):
+        ExportXMLDocumentGraph(text_elem, include_layers={'morphology'})
+
+    exportxml_corpus = ExportXMLCorpus(
+        exportxml_filepath, index_file=False, include_layers={'ne'})
+    for docgraph in exportxml_corpus:
+        assert 'exportxml:ne' in docgraph.layer2nodes
+        assert 'exportxml:markable' not in docgraph.layer2nodes
+
+
+def test_exportxml_sentence_iter():
+    """An ExportXML corpus can be streamed sentence by sentence."""
+    exportxml_filepath = os.path.join(dg.DATA_ROOT_DIR, 'exportxml-example.xml')
+    exportxml_corpus = ExportXMLCorpus(exportxml_filepath, index_file=False)
+    text_0 = exportxml_corpus[0]
+
+    sentence_graphs = list(exportxml_corpus.sentence_iter())
+    assert len(sentence_graphs) == 102
+    assert [sgraph.root for sgraph in sentence_graphs[:len(text_0.sentences)]] == \
+        text_0.sentences
+
+    first_sentence = sentence_graphs[0]
+    assert isinstance(first_sentence, ExportXMLSentenceGraph)
+    assert first_sentence.text_id == 'text_0'
+    assert first_sentence.sentences == [first_sentence.root]
+    assert dg.get_text(first_sentence) == dg.get_text(text_0, first_sentence.root)
+
+    # antecedents in preceding sentences are represented by their text
+    external_nodes = list(dg.select_nodes_by_layer(
+        sentence_graphs[5], 'exportxml:external', data=True))
+    assert external_nodes
+    for node_id, node_attrs in external_nodes:
+        assert node_attrs['sentence'] in text_0.sentences
+        assert node_attrs['label'] == dg.get_text(text_0, node_id)
+
+    debug_corpus = ExportXMLCorpus(exportxml_filepath, debug=True)
+    assert next(debug_corpus.sentence_iter()).tag == 'sentence'
@@ -2,9 +2,16 @@
 # coding: utf-8
 # Author: Arne Neumann <discoursegraphs.programming@arne.cl>
 
+import os
+
 import pytest
 
-from discoursegraphs.readwrite.generic import convert_spanstring
+import discoursegraphs as dg
+from discoursegraphs.corpora import pcc
+from discoursegraphs.readwrite.generic import (
+    ExportView, convert_spanstring, count_elements, element_offsets)
+from discoursegraphs.readwrite.neo4j import convert_to_geoff
+from discoursegraphs.util import ensure_xpointer_compatibility
 
 
 def test_convert_spanstring():
@@ -40,3 +47,74 @@ def test_convert_spanstring():
     # (cf. see issue #144).
     with pytest.raises(AssertionError):
         convert_spanstring('s2011_6..s2012_13')
+
+
+def test_count_elements(tmpdir):
+    """elements can be counted and located without parsing the XML file"""
+    xml_filepath = str(tmpdir.join('corpus.xml'))
+    with open(xml_filepath, 'w') as xml_file:
+        xml_file.write(
+            '<corpus><text-attr name="form"/>\n'
+            '<text xml:id="t1"><w>a</w></text>\n'
+            '<text\nxml:id="t2"/><!-- <text xml:id="t3"></text> -->'
+            '</corpus>')
+    assert count_elements(xml_filepath, 'text') == 3
+    # the parser ignores the element in the comment
+    assert count_elements(xml_filepath, 'text', recover=True) == 2
+
+    offsets = element_offsets(xml_filepath, 'text')
+    assert [text_id for _, _, text_id in offsets] == ['t1', 't2', 't3']
+    with open(xml_filepath, 'rb') as xml_file:
+        xml_str = xml_file.read()
+    start, end, _ = offsets[0]
+    assert xml_str[start:end] == '<text xml:id="t1"><w>a</w></text>'
+
+    empty_filepath = str(tmpdir.join('empty.xml'))
+    open(empty_filepath, 'w').close()
+    assert count_elements(empty_filepath, 'text') == 0
+
+    urml_filepath = os.path.join(dg.DATA_ROOT_DIR, 'urml-example.xml')
+    assert len(dg.read_urml(urml_filepath)) == 1
+
+
+def test_export_view(tmpdir):
+    """exporters don't change (or copy) the document graph"""
+    docgraph = pcc.get_document('maz-1423')
+    docgraph.node[docgraph.root]['metadata']['rst']['title'] = 'maz-1423'
+    docgraph.node[docgraph.tokens[0]]['test:spans'] = ['x', 'y']
+    nodes_before = {node_id: dict(attribs)
+                    for node_id, attribs in docgraph.nodes_iter(data=True)}
+    edges_before = docgraph.edges(data=True, keys=True)
+
+    view = ExportView(docgraph, node_id=ensure_xpointer_compatibility,
+                      layers=list, lists=str, strip_metadata=True,
+                      id_labels=True)
+    assert len(view) == len(docgraph)
+    assert view.number_of_edges() == docgraph.number_of_edges()
+    token_id = ensure_xpointer_compatibility(docgraph.tokens[0])
+    assert token_id in view and docgraph.tokens[0] not in view
+    token_attribs = view.node[token_id]
+    assert token_attribs['test:spans'] == "['x', 'y']"
+    assert isinstance(token_attribs['layers'], list)
+    # existing labels are kept, other nodes are labeled with their ID
+    assert token_attribs['label'] == 'Zum'
+    unlabeled = [node_id for node_id, attribs in docgraph.nodes_iter(data=True)
+                 if 'label' not in attribs]
+    assert view.node[ensure_xpointer_compatibility(unlabeled[0])]['label'] \
+        == ensure_xpointer_compatibility(unlabeled[0])
+    assert 'metadata' not in \
+        view.node[ensure_xpointer_compatibility(docgraph.root)]
+    assert all(':' not in source and ':' not in target
+               for source, target in view.edges_iter())
+
+    dg.write_gexf(docgraph, str(tmpdir.join('maz-1423.gexf')))
+    dg.write_graphml(docgraph, str(tmpdir.join('maz-1423.graphml')))
+    geoff_str = convert_to_geoff(docgraph)
+    dg.write_paula(docgraph, str(tmpdir.join('paula')))
+    assert '"label": "{0}"'.format(unlabeled[0]) in geoff_str
+
+    assert {node_id: dict(attribs) for node_id, attribs
+            in docgraph.nodes_iter(data=True)} == nodes_before
+    assert docgraph.edges(data=True, keys=True) == edges_before
+    assert docgraph.node[docgraph.root]['metadata']['rst']['title'] \
+        == 'maz-1423'
@@ -2,10 +2,14 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursegraphs.programming@arne.cl>
 
+import os
 from tempfile import NamedTemporaryFile, mkdtemp
 
+from lxml import etree
 from pytest import maz_1423  # global fixture
 import discoursegraphs as dg
+from discoursegraphs.readwrite.paulaxml.paula import NSMAP, XLINKHREF
+from discoursegraphs.util import ensure_xpointer_compatibility
 
 """
 Basic tests for the gexf output format.
@@ -17,3 +21,34 @@ def test_write_paula():
     temp_dir = mkdtemp()
     dg.write_paula(maz_1423, temp_dir)
 
+
+
+def test_write_paula_struct_annotations():
+    """
+    the struct annotation file of a layer contains the attributes of exactly
+    the non-token nodes of that layer (the nodes of other layers used to end
+    up in the layer of the merged graph, cf. ``relabel_nodes()``).
+    """
+    temp_dir = mkdtemp()
+    dg.write_paula(maz_1423, temp_dir)
+    doc_name = maz_1423.name.rsplit('.')[0]
+
+    for layer in ('tiger', 'rst', 'mmax'):
+        struct_file = os.path.join(
+            temp_dir, doc_name, '{0}.mycorpus.{1}_{0}_struct.xml'.format(
+                layer, doc_name))
+        multifeats = etree.parse(struct_file).iterfind('//multiFeat')
+        hrefs = [mfeat.attrib[XLINKHREF] for mfeat in multifeats]
+        expected_hrefs = [
+            '#'+ensure_xpointer_compatibility(node_id)
+            for node_id in dg.select_nodes_by_layer(maz_1423, layer)
+            if not dg.istoken(maz_1423, node_id)]
+        assert sorted(hrefs) == sorted(expected_hrefs)
+
+    tiger_struct = etree.parse(os.path.join(
+        temp_dir, doc_name,
+        'tiger.mycorpus.{0}_tiger_struct.xml'.format(doc_name)))
+    feats = tiger_struct.xpath('//multiFeat[@xlink:href="#s524_500"]/feat',
+                               namespaces=NSMAP)
+    assert [(feat.attrib['name'], feat.attrib['value'])
+            for feat in feats] == [('tiger:cat', 'PP')]
@@ -269,3 +269,39 @@ def test_fix_148():
         assert all('tiger:syntax' in tdg.node[node_id]['layers']
                    for node_id in dg.select_nodes_by_layer(
                        tdg, 'tiger:sentence:root'))
+
+
+def test_iter_tiger_sentences():
+    """TigerXML files can be parsed one sentence at a time."""
+    tiger_fpath = os.path.join(pcc.path, 'syntax/maz-10374.xml')
+    tdg = dg.read_tiger(tiger_fpath)
+
+    sentence_graphs = list(dg.readwrite.iter_tiger_sentences(tiger_fpath))
+    assert [sg.root for sg in sentence_graphs] == tdg.sentences
+    assert sum(len(sg.tokens) for sg in sentence_graphs) == len(tdg.tokens)
+
+    # sentences can be filtered by number and by ID
+    first_two = list(dg.readwrite.iter_tiger_sentences(tiger_fpath, limit=2))
+    assert [sg.name for sg in first_two] == \
+        [sg.name for sg in sentence_graphs[:2]]
+    selected_ids = [sentence_graphs[3].name, sentence_graphs[1].name]
+    selected = list(dg.readwrite.iter_tiger_sentences(
+        tiger_fpath, sentence_ids=selected_ids))
+    assert [sg.name for sg in selected] == sorted(selected_ids)
+    assert list(dg.readwrite.iter_tiger_sentences(tiger_fpath, limit=0)) == []
+
+    # a corpus can be iterated more than once
+    corpus = dg.readwrite.TigerCorpus(tiger_fpath, limit=3)
+    assert corpus.corpus_id == tdg.corpus_id == 'ID_maz-10374'
+    assert [sg.root for sg in corpus] == [sg.root for sg in corpus] == \
+        tdg.sentences[:3]
+    assert [s.attrib['id'] for s in dg.readwrite.TigerCorpus(
+        tiger_fpath, limit=3, debug=True)] == \
+        [sg.name for sg in sentence_graphs[:3]]
+
+    # documents can be restricted to a subset of their sentences
+    partial_tdg = corpus.document_graph()
+    assert partial_tdg.sentences == tdg.sentences[:3]
+    assert partial_tdg.tokens == \
+        [tok for sg in sentence_graphs[:3] for tok in sg.tokens]
+    assert set(partial_tdg.nodes()).issubset(tdg.nodes())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursegraphs.programming@arne.cl>
+
+import os
+
+import pytest
+
+import discoursegraphs as dg
+from discoursegraphs.readwrite.rst.urml import URMLCorpus, URMLDocumentGraph
+
+
+@pytest.fixture
+def urml_filepath(tmpdir):
+    """an URML corpus file with three copies of the example document"""
+    with open(os.path.join(dg.DATA_ROOT_DIR, 'urml-example.xml')) as urml_file:
+        urml_str = urml_file.read()
+    doc_start = urml_str.index('<document id="maz3377">')
+    doc_end = urml_str.index('</document>') + len('</document>')
+    document = urml_str[doc_start:doc_end]
+    documents = [document.replace('maz3377', doc_id, 1)
+                 for doc_id in ('maz1', 'maz2', 'maz3')]
+
+    urml_filepath = str(tmpdir.join('urml-corpus.xml'))
+    with open(urml_filepath, 'w') as corpus_file:
+        corpus_file.write(
+            urml_str[:doc_start] + '\n'.join(documents) + urml_str[doc_end:])
+    return urml_filepath
+
+
+def test_urml_corpus_index(urml_filepath):
+    """An URML corpus can be accessed by position and document ID."""
+    urml_corpus = URMLCorpus(urml_filepath)
+    assert len(urml_corpus) == 3
+
+    assert isinstance(urml_corpus[0], URMLDocumentGraph)
+    assert urml_corpus[-1].name == 'maz3'
+    assert urml_corpus['maz2'].name == 'maz2'
+    assert [docgraph.name for docgraph in urml_corpus[:2]] == ['maz1', 'maz2']
+    assert urml_corpus.get('maz4') is None
+    with pytest.raises(KeyError):
+        urml_corpus['maz4']
+
+    first_doc = next(iter(URMLCorpus(urml_filepath)))
+    assert dg.get_text(urml_corpus[0]) == dg.get_text(first_doc)
+
+
+def test_urml_corpus_parallel_iter(urml_filepath):
+    """An URML corpus can be parsed by multiple worker processes."""
+    urml_corpus = URMLCorpus(urml_filepath, index_file=False)
+    docgraphs = list(urml_corpus.parallel_iter(workers=2))
+    assert [docgraph.name for docgraph in docgraphs] == ['maz1', 'maz2', 'maz3']
+
+    first_doc = urml_corpus[0]
+    assert sorted(docgraphs[0].nodes(data=True)) == \
+        sorted(first_doc.nodes(data=True))
+    assert docgraphs[0].node[docgraphs[0].root]['metadata'] == \
+        first_doc.node[first_doc.root]['metadata']
+
+    assert list(urml_corpus.parallel_iter(workers=2, function=len)) == \
+        [len(first_doc)] * 3
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursegraphs.programming@arne.cl>
+
+import os
+import shutil
+
+import discoursegraphs as dg
+from discoursegraphs.cache import DocumentCache
+from discoursegraphs.corpora import pcc
+
+
+def cache_files(cache):
+    return sorted(fname for fname in os.listdir(cache.cache_dir)
+                  if fname.endswith('.dg'))
+
+
+def test_document_cache(tmpdir):
+    """document graphs are only parsed again if the input file changes"""
+    rs3_filepath = str(tmpdir.join('maz-1423.rs3'))
+    shutil.copy(pcc.rst[0], rs3_filepath)
+    cache = DocumentCache(cache_dir=str(tmpdir.join('cache')))
+
+    read_rs3 = cache(dg.read_rs3)
+    docgraph = read_rs3(rs3_filepath)
+    assert len(cache_files(cache)) == 1
+    cached_docgraph = read_rs3(rs3_filepath)
+    assert cached_docgraph is not docgraph
+    assert isinstance(cached_docgraph, dg.readwrite.RSTGraph)
+    assert sorted(cached_docgraph.edges(data=True)) == \
+        sorted(docgraph.edges(data=True))
+    assert len(cache_files(cache)) == 1
+
+    # reader arguments and file changes result in new cache entries
+    read_rs3(rs3_filepath, tokenize=False)
+    assert len(cache_files(cache)) == 2
+    os.utime(rs3_filepath, (0, 0))
+    read_rs3(rs3_filepath)
+    assert len(cache_files(cache)) == 3
+
+    cache.clear()
+    assert cache_files(cache) == []
+
+
+def test_document_cache_eviction(tmpdir):
+    """the least recently used graphs are evicted from a full cache"""
+    cache = DocumentCache(cache_dir=str(tmpdir.join('cache')))
+    rst_files = pcc.rst[:3]
+    for rst_file in rst_files:
+        cache.read(dg.read_rs3, rst_file)
+    sizes = [os.path.getsize(os.path.join(cache.cache_dir, fname))
+             for fname in cache_files(cache)]
+
+    first_key = cache.key(dg.read_rs3, rst_files[0], {})
+    for i, rst_file in enumerate(rst_files):  # mark as used in this order
+        cache_file = os.path.join(cache.cache_dir,
+                                  cache.key(dg.read_rs3, rst_file, {}) + '.dg')
+        os.utime(cache_file, (i, i))
+    cache.max_size = sum(sizes) - 1
+    cache.evict()
+    assert len(cache_files(cache)) == 2
+    assert cache.get(first_key) is None
+
+
+def test_pcc_document_cache(tmpdir):
+    """PCC documents are read from the active cache"""
+    with DocumentCache(cache_dir=str(tmpdir.join('cache'))) as cache:
+        docgraph = pcc.get_document('maz-1423')
+        num_of_files = len(cache_files(cache))
+        assert num_of_files == len(pcc.get_files_by_document_id('maz-1423'))
+        cached_docgraph = pcc.get_document('maz-1423')
+        assert len(cache_files(cache)) == num_of_files
+    assert dg.get_text(cached_docgraph) == dg.get_text(docgraph)
+    assert sorted(cached_docgraph.nodes()) == sorted(docgraph.nodes())
+
+
+def test_document_cache_corrupt_entry(tmpdir):
+    """corrupt cache entries are removed and the input file is parsed again"""
+    cache = DocumentCache(cache_dir=str(tmpdir.join('cache')))
+    read_rs3 = cache(dg.read_rs3)
+    docgraph = read_rs3(pcc.rst[0])
+    key = cache.key(dg.read_rs3, pcc.rst[0], {})
+    for garbage in ('garbage', 'cfoo\nBar\nq\x00.', ''):
+        with open(os.path.join(cache.cache_dir, key + '.dg'), 'wb') as cached:
+            cached.write(garbage)
+        assert cache.get(key) is None
+        assert cache_files(cache) == []
+        cached_docgraph = read_rs3(pcc.rst[0])
+        assert sorted(cached_docgraph.nodes()) == sorted(docgraph.nodes())
+        assert cache_files(cache) == [key + '.dg']
+
+
+def test_document_cache_positional_args(tmpdir):
+    """positional reader arguments are part of the cache key"""
+    cache = DocumentCache(cache_dir=str(tmpdir.join('cache')))
+    read_rs3 = cache(dg.read_rs3)
+    docgraph = read_rs3(pcc.rst[0], 'foo')
+    assert docgraph.name == 'foo'
+    assert read_rs3(pcc.rst[0], 'foo').name == 'foo'
+    assert read_rs3(pcc.rst[0], 'bar').name == 'bar'
+    assert len(cache_files(cache)) == 2
+
+
+def test_document_cache_input_files(tmpdir):
+    """changes to the markables of an MMAX2 document invalidate its graph"""
+    mmax_dir = str(tmpdir.join('coreference'))
+    shutil.copytree(os.path.dirname(pcc.coreference[0]), mmax_dir)
+    mmax_file = os.path.join(mmax_dir, 'maz-1423.mmax')
+    cache = DocumentCache(cache_dir=str(tmpdir.join('cache')))
+    read_mmax2 = cache(dg.read_mmax2)
+
+    docgraph = read_mmax2(mmax_file)
+    assert 'markable_1' in docgraph
+    assert len(cache_files(cache)) == 1
+
+    primmark_file = os.path.join(mmax_dir, 'markables',
+                                 'maz-1423_primmark_level.xml')
+    with open(primmark_file) as markables:
+        primmark_str = markables.read()
+    with open(primmark_file, 'w') as markables:
+        markables.write(primmark_str.replace('"markable_1"', '"markable_x"'))
+    os.utime(primmark_file, (0, 0))
+    docgraph = read_mmax2(mmax_file)
+    assert 'markable_1' not in docgraph
+    assert 'markable_x' in docgraph
+    assert len(cache_files(cache)) == 2
@@ -2,15 +2,19 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursegraphs.programming@arne.cl>
 
+from collections import defaultdict
 from copy import deepcopy
+import cPickle
 import os
 
-from networkx import is_directed_acyclic_graph
+import networkx
+from networkx import is_directed_acyclic_graph, MultiDiGraph
 import pytest
 
 import discoursegraphs as dg
 from discoursegraphs.discoursegraph import create_token_mapping, get_kwic
 from discoursegraphs.corpora import pcc
+from discoursegraphs.relabel import relabel_nodes
 
 """
 This module contains some tests for the ``discoursegraph`` module.
@@ -260,6 +264,44 @@ class TestDiscourseDocumentGraph(object):
         self.docgraph.add_layer((1, 2), 'fake')
         assert self.docgraph[1][2] == {0: {'layers': {'discoursegraph', 'fake'}}}
 
+    def test_layer_index(self):
+        """the layer index must be updated when nodes/edges are changed"""
+        self.docgraph.add_node(1, layers={'foo'})
+        self.docgraph.add_node(2, layers={'foo', 'bar'})
+        self.docgraph.add_nodes_from([(3, {'layers': {'bar'}})])
+        self.docgraph.add_edge(1, 2, layers={'foo:edge'})
+        self.docgraph.add_edge(2, 3, layers={'bar:edge'})
+        self.docgraph.add_layer(1, 'baz')
+        self.docgraph.add_layer((2, 3), 'baz:edge')
+
+        assert self.docgraph.layer2nodes == {
+            'discoursegraph': {'discoursegraph:root_node'},
+            'foo': {1, 2}, 'bar': {2, 3}, 'baz': {1}}
+        assert self.docgraph.layer2edges == {
+            'foo:edge': {(1, 2, 0)}, 'bar:edge': {(2, 3, 0)},
+            'baz:edge': {(2, 3, 0)}}
+        assert dg.get_annotation_layers(self.docgraph) == {
+            'discoursegraph', 'foo', 'bar', 'baz',
+            'foo:edge', 'bar:edge', 'baz:edge'}
+        assert dg.get_top_level_layers(self.docgraph) == {
+            'discoursegraph', 'foo', 'bar', 'baz'}
+
+        # nodes are returned in the order they were added to the graph
+        assert list(dg.select_nodes_by_layer(
+            self.docgraph, {'bar', 'baz'})) == [1, 2, 3]
+
+        self.docgraph.remove_edge(1, 2)
+        assert 'foo:edge' not in self.docgraph.layer2edges
+        self.docgraph.remove_node(2)
+        assert self.docgraph.layer2nodes == {
+            'discoursegraph': {'discoursegraph:root_node'},
+            'foo': {1}, 'bar': {3}, 'baz': {1}}
+        assert self.docgraph.layer2edges == {}
+
+        self.docgraph.remove_nodes_from([1, 3, 42])
+        assert list(dg.select_nodes_by_layer(self.docgraph, 'foo')) == []
+        assert dg.get_annotation_layers(self.docgraph) == {'discoursegraph'}
+
     def test_add_offsets_get_offsets(self):
         """annotate tokens with offsets and retrieve them."""
         # add a few tokens to the docgraph
@@ -283,6 +325,15 @@ class TestDiscourseDocumentGraph(object):
         self.docgraph.add_offsets()
         assert self.docgraph.node == nodes_dict
 
+        # offsets are stored in columns aligned with the token list
+        onsets, offsets = self.docgraph.get_offset_arrays()
+        assert list(onsets) == [0, 4, 8, 12, 21]
+        assert list(offsets) == [3, 7, 11, 20, 22]
+
+        # offsets are recalculated, if tokens are added
+        add_tokens(self.docgraph, ['!'])
+        assert self.docgraph.get_offsets(5) == (23, 24)
+
     @staticmethod
     def test_get_phrases():
         """extract all VPs from a document"""
@@ -361,6 +412,24 @@ def test_create_token_mapping():
     assert 'Ich bin [[kein]] Berliner .' in str(excinfo.value)
 
 
+def test_sort_tokens():
+    """tokens are sorted by their position, not by their IDs"""
+    docgraph = dg.DiscourseDocumentGraph()
+    add_tokens(docgraph, ['This', 'is', 'a', 'test', '.'])
+    docgraph.tokens = ['t10', 't2', 't1', 't3', 't11']
+    assert docgraph.token2position == \
+        {'t10': 0, 't2': 1, 't1': 2, 't3': 3, 't11': 4}
+    assert dg.sort_tokens(docgraph, ['t1', 't11', 't10']) == ['t10', 't1', 't11']
+    assert dg.sort_tokens(docgraph, ['t1', 't11', 't10'], reverse=True) == \
+        ['t11', 't1', 't10']
+
+    # appended tokens are picked up, unknown tokens are sorted last
+    docgraph.tokens.append('t0')
+    assert docgraph.token2position['t0'] == 5
+    assert dg.sort_tokens(docgraph, ['x2', 't0', 'x10', 't3']) == \
+        ['t3', 't0', 'x2', 'x10']
+
+
 def test_is_continuous():
     """tests, if a discontinuous span of tokens is recognised as such.
 
@@ -396,6 +465,40 @@ def test_is_continuous():
     assert dg.is_continuous(docgraph, '3')
     assert dg.is_continuous(docgraph, '4')
 
+    # tokens that aren't adjacent in the token list are discontinuous,
+    # regardless of their character offsets
+    docgraph.tokens = ['1', '4', '2', '3']
+    assert dg.is_continuous(docgraph, 'lower')
+    docgraph.tokens = ['1', '2', '4', '3']
+    assert not dg.is_continuous(docgraph, 'lower')
+
+    docgraph.add_node('empty', layers={'test'})
+    with pytest.raises(KeyError) as excinfo:
+        dg.is_continuous(docgraph, 'empty')
+    assert "doesn't span any tokens" in str(excinfo.value)
+
+
+def test_continuity_report():
+    """all markables of a layer are classified in a single pass"""
+    docgraph = dg.DiscourseDocumentGraph()
+    for token in ('1', '2', '3', '4'):
+        docgraph.add_node(token, attr_dict={'discoursegraph:token': token})
+    docgraph.tokens = ['1', '2', '3', '4']
+    for markable, tokens in (('cont', ('2', '3')), ('discont', ('1', '4')),
+                             ('single', ('4',)), ('empty', ())):
+        docgraph.add_node(markable, layers={'markable'})
+        for token in tokens:
+            docgraph.add_edge(markable, token, layers={'markable'},
+                              edge_type=dg.EdgeTypes.spanning_relation)
+
+    report = dg.continuity_report(docgraph, 'markable')
+    assert report == {'continuous': ['cont', 'single'],
+                      'discontinuous': ['discont'],
+                      'empty': ['empty']}
+    for node_id in report['continuous']:
+        assert dg.is_continuous(docgraph, node_id)
+    assert not dg.is_continuous(docgraph, 'discont')
+
 
 def test_select_nodes_by_attribute():
     """Are node lists are correctly filtered based on their attribs/values?"""
@@ -466,6 +569,13 @@ def test_select_nodes_by_layer():
         ddg, layer={'test', 'foo', 'bar'}))
     assert len(test_foobar_ids) == 7
 
+    # the layer index must return the same results as a full scan
+    pdg = pcc[DOC_ID]
+    for layer in dg.get_annotation_layers(pdg):
+        expected = [node_id for node_id, attrs in pdg.nodes_iter(data=True)
+                    if layer in attrs['layers']]
+        assert list(dg.select_nodes_by_layer(pdg, layer)) == expected
+
     # test if data=True works as expected
     for nodelist in (all_nodes, test_nodes, test_foo_nodes):
         for node_id, attr_dict in nodelist:
@@ -473,6 +583,48 @@ def test_select_nodes_by_layer():
             assert isinstance(attr_dict, dict)
 
 
+def test_layer_index_of_merged_document():
+    """the layer index of a merged document must match its node/edge layers"""
+    pdg = pcc['maz-1423']
+    node_layers = defaultdict(set)
+    for node_id, attrs in pdg.nodes_iter(data=True):
+        for layer in attrs['layers']:
+            node_layers[layer].add(node_id)
+    assert pdg.layer2nodes == node_layers
+
+    edge_layers = defaultdict(set)
+    for src, target, key, attrs in pdg.edges_iter(data=True, keys=True):
+        for layer in attrs['layers']:
+            edge_layers[layer].add((src, target, key))
+    assert pdg.layer2edges == edge_layers
+
+
+def test_layer_index_bypassed():
+    """nodes added to the node dict directly (e.g. by networkx) are indexed"""
+    pdg = pcc['maz-1423']
+    tiger_tokens = list(dg.select_nodes_by_layer(pdg, 'tiger:token'))
+    assert len(tiger_tokens) == 185
+
+    relabeled = networkx.relabel_nodes(pdg, lambda node_id: node_id)
+    assert sorted(dg.select_nodes_by_layer(relabeled, 'tiger:token')) == \
+        sorted(tiger_tokens)
+    assert dg.discoursegraph.get_node_annotation_layers(relabeled) == \
+        dg.discoursegraph.get_node_annotation_layers(pdg)
+
+    docgraph = dg.DiscourseDocumentGraph(namespace='test')
+    docgraph.add_node('a', layers={'test:a'})
+    docgraph.node['b'] = {'layers': frozenset(['test:b'])}
+    assert list(dg.select_nodes_by_layer(docgraph, 'test:b')) == ['b']
+    assert not docgraph.node.bypassed
+
+    # plain networkx graphs are scanned
+    graph = MultiDiGraph()
+    graph.add_node(1, layers={'foo'})
+    graph.add_node(2, layers={'bar'})
+    assert list(dg.select_nodes_by_layer(graph, 'foo')) == [1]
+    assert list(dg.select_nodes_by_layer(graph, ['foo', 'bar'])) == [1, 2]
+
+
 def test_select_edges_by_attribute():
     """test if edges can be filtered for attributes/values"""
     # create a simple graph with 3 tokens, all dominated by the root node
@@ -564,6 +716,31 @@ def test_select_edges_by():
     assert len(dom_edge_ids) == len(dom_edges) == 6
     assert set(dom_edge_ids) == expected_sytax_edge_ids
 
+    # the indices must return the same edges (in the same order) as a scan
+    pdg = pcc[DOC_ID]
+    for layer in dg.get_annotation_layers(pdg):
+        for edge_type in (None, dg.EdgeTypes.dominance_relation,
+                          dg.EdgeTypes.pointing_relation):
+            expected = [
+                (src, target) for (src, target, attrs) in pdg.edges_iter(data=True)
+                if layer in attrs['layers'] and
+                (edge_type is None or attrs.get('edge_type') == edge_type)]
+            assert list(dg.select_edges_by(
+                pdg, layer=layer, edge_type=edge_type)) == expected
+
+    # overwriting the edge type of an existing edge updates the index
+    sg1.add_edge('S', 'NP1', key=0, edge_type=dg.EdgeTypes.spanning_relation)
+    assert ('S', 'NP1') not in list(dg.select_edges_by(
+        sg1, edge_type=dg.EdgeTypes.dominance_relation))
+    assert list(dg.select_edges_by(
+        sg1, layer=sg1.ns+':syntax',
+        edge_type=dg.EdgeTypes.spanning_relation)) == [('S', 'NP1')]
+
+    # conditions can still be given as Python expressions
+    assert list(dg.discoursegraph.select_edges(
+        sg1, ["edge_attribs['edge_type'] == 'spans'"], data=False)) == \
+        list(dg.select_edges_by(sg1, edge_type='spans'))
+
     # test if data=True works as expected
     edge_lists = (all_edges, syntax_edges, precedence_edges, syndom_edges,
                   dom_edges)
@@ -574,6 +751,23 @@ def test_select_edges_by():
             assert isinstance(attrs, dict)
 
 
+def test_select_edges_networkx_graph():
+    """plain networkx graphs (without indices) are scanned"""
+    graph = MultiDiGraph()
+    graph.add_edge(1, 2, layers={'foo'},
+                   edge_type=dg.EdgeTypes.pointing_relation)
+    graph.add_edge(2, 3, layers={'bar'},
+                   edge_type=dg.EdgeTypes.dominance_relation)
+    assert list(dg.select_edges_by(
+        graph, layer='foo', edge_type=dg.EdgeTypes.pointing_relation)) == \
+        [(1, 2)]
+    assert list(dg.select_edges_by_attribute(
+        graph, 'edge_type', dg.EdgeTypes.dominance_relation)) == [(2, 3)]
+    assert sorted(dg.select_edges_by_attribute(graph, 'edge_type')) == \
+        [(1, 2), (2, 3)]
+    assert dg.get_pointing_chains(graph) == [[1, 2]]
+
+
 def make_sentencegraph1():
     """return a docgraph containing one sentence with syntax and coreference
     annotation, as well as precedence relations.
@@ -655,6 +849,44 @@ def test_get_span():
         assert dg.get_span(sg1, 'S')
 
 
+def test_compute_all_spans():
+    """spans are computed in one pass, cached and reset on graph changes"""
+    sg1 = make_sentencegraph1()
+    spans = dg.compute_all_spans(sg1)
+    assert len(spans) == len(sg1)
+    assert spans['S'] == (0, 1, 3, 4, 5, 6)
+    assert spans['VP2'] == (4, 5, 6)
+    assert spans[sg1.root] == (0, 1, 3, 4, 5, 6)
+
+    # returned spans are copies, i.e. modifying them doesn't affect the cache
+    vp2_span = dg.get_span(sg1, 'VP2')
+    vp2_span.append(7)
+    assert dg.get_span(sg1, 'VP2') == [4, 5, 6]
+
+    # adding an edge invalidates the cache
+    sg1.add_edge('VP2', 7, edge_type=dg.EdgeTypes.spanning_relation)
+    assert dg.get_span(sg1, 'VP2') == [4, 5, 6, 7]
+    assert dg.get_span(sg1, 'S') == [0, 1, 3, 4, 5, 6, 7]
+
+    # removing a node invalidates the cache
+    sg1.remove_node('NP2')
+    assert dg.get_span(sg1, 'SBAR') == [4, 5, 6, 7]
+
+    # the spans of a real document must match the recursively computed ones
+    def recursive_span(docgraph, node_id):
+        span = [node_id] if dg.istoken(docgraph, node_id) else []
+        for _, target, attrs in docgraph.out_edges_iter(node_id, data=True):
+            if target != node_id and \
+                    attrs['edge_type'] != dg.EdgeTypes.pointing_relation:
+                span.extend(recursive_span(docgraph, target))
+        return dg.sort_tokens(docgraph, span)
+
+    pdg = pcc[DOC_ID]
+    all_spans = dg.compute_all_spans(pdg)
+    for node_id in pdg.nodes_iter():
+        assert list(all_spans[node_id]) == recursive_span(pdg, node_id)
+
+
 def test_get_span_offsets():
     """test, if offsets can be retrieved from tokens, spans of tokens or
     dominating nodes.
@@ -746,3 +978,347 @@ def test_select_neighbors_by_layer():
         sg1, 0, layer=sg1.ns+':token')) == [1] # via precedence
     assert list(dg.select_neighbors_by_layer(
         sg1, 3, layer=sg1.ns+':token')) == [0, 4] # 3->0 coref, 3->4 precedence
+
+
+def test_freeze():
+    """a frozen snapshot answers queries exactly like the document graph"""
+    pdg = pcc[DOC_ID]
+    frozen = pdg.freeze()
+    assert isinstance(frozen, dg.FrozenDocumentGraph)
+    assert len(frozen) == len(pdg)
+    assert frozen.number_of_edges() == pdg.number_of_edges()
+    assert frozen.nodes(data=True) == pdg.nodes(data=True)
+    assert sorted(frozen.edges(data=True)) == sorted(pdg.edges(data=True))
+    assert frozen.tokens == tuple(pdg.tokens)
+
+    for layer in ('mmax:markable', 'tiger:syntax', 'rst',
+                  {'tiger:token', 'mmax:markable'}, None):
+        assert list(dg.select_nodes_by_layer(frozen, layer, data=True)) == \
+            list(dg.select_nodes_by_layer(pdg, layer, data=True))
+    for attribute, value in (('tiger:cat', None), ('tiger:cat', 'NP'),
+                             ('tiger:cat', ['NP', 'PP']), (None, None),
+                             ('mmax:phrase_type', ['np', 'pp'])):
+        assert list(dg.select_nodes_by_attribute(
+            frozen, attribute, value, data=True)) == \
+            list(dg.select_nodes_by_attribute(pdg, attribute, value, data=True))
+
+    for layer, edge_type in (('mmax', None), (None, 'points_to'),
+                             ('tiger', 'dominates'), (None, None)):
+        assert sorted(dg.select_edges_by(frozen, layer, edge_type, True)) == \
+            sorted(dg.select_edges_by(pdg, layer, edge_type, True))
+    for attribute, value in (('tiger:label', None), ('edge_type', 'spans'),
+                             ('relname', ['joint', 'list'])):
+        assert sorted(dg.select_edges_by_attribute(frozen, attribute, value)) \
+            == sorted(dg.select_edges_by_attribute(pdg, attribute, value))
+
+    for node_id in pdg.nodes_iter():
+        assert dg.get_span(frozen, node_id) == dg.get_span(pdg, node_id)
+        assert dg.istoken(frozen, node_id) == dg.istoken(pdg, node_id)
+        assert set(dg.select_neighbors_by_layer(frozen, node_id, 'tiger')) \
+            == set(dg.select_neighbors_by_layer(pdg, node_id, 'tiger'))
+        assert set(dg.select_neighbors_by_edge_attribute(
+            frozen, node_id, 'edge_type', 'dominates')) == \
+            set(dg.select_neighbors_by_edge_attribute(
+                pdg, node_id, 'edge_type', 'dominates'))
+    assert dg.compute_all_spans(frozen) == dg.compute_all_spans(pdg)
+    assert dg.continuity_report(frozen, 'mmax:markable') == \
+        dg.continuity_report(pdg, 'mmax:markable')
+    assert dg.get_text(frozen) == dg.get_text(pdg)
+    sentence_id = pdg.sentences[0]
+    assert dg.get_text(frozen, sentence_id) == dg.get_text(pdg, sentence_id)
+
+    coref_doc = pcc['maz-00001']
+    assert dg.get_pointing_chains(coref_doc)
+    assert sorted(dg.get_pointing_chains(coref_doc.freeze())) == \
+        sorted(dg.get_pointing_chains(coref_doc))
+
+    # the snapshot isn't affected by later changes of the document graph
+    # or of the attribute dicts it returns
+    pdg.add_node('new', layers={'mmax:markable'})
+    assert 'new' not in frozen
+    node_id, attribs = next(dg.select_nodes_by_layer(
+        frozen, 'mmax:markable', data=True))
+    attribs['foo'] = 'bar'
+    assert 'foo' not in frozen.node_attribs(node_id)
+
+
+
+def test_merged_document_graph():
+    """a merged view answers queries exactly like a merged document graph"""
+    pdg = pcc[DOC_ID]
+    merged = pcc.get_merged_view(DOC_ID)
+    layer_graphs = merged.docgraphs
+    layer_sizes = [(len(docgraph), docgraph.number_of_edges())
+                   for docgraph in layer_graphs]
+    assert len(merged) == len(pdg)
+    assert merged.number_of_edges() == pdg.number_of_edges()
+    assert merged.nodes(data=True) == pdg.nodes(data=True)
+    assert merged.tokens == tuple(pdg.tokens)
+    assert merged.merged_rootnodes == pdg.merged_rootnodes
+    assert merged.renamed_nodes == pdg.renamed_nodes
+
+    for layer in ('mmax:markable', 'tiger:syntax', 'rst',
+                  {'tiger:token', 'mmax:markable'}, None):
+        assert list(dg.select_nodes_by_layer(merged, layer, data=True)) == \
+            list(dg.select_nodes_by_layer(pdg, layer, data=True))
+    for attribute, value in (('tiger:cat', None), ('tiger:cat', ['NP', 'PP']),
+                             (None, None)):
+        assert list(dg.select_nodes_by_attribute(
+            merged, attribute, value, data=True)) == \
+            list(dg.select_nodes_by_attribute(pdg, attribute, value, data=True))
+    for layer, edge_type in (('mmax', None), (None, 'points_to'),
+                             ('tiger:sentence', 'dominates'), (None, None)):
+        assert sorted(dg.select_edges_by(merged, layer, edge_type)) == \
+            sorted(dg.select_edges_by(pdg, layer, edge_type))
+    assert sorted(dg.select_edges_by_attribute(merged, 'edge_type', 'spans')) \
+        == sorted(dg.select_edges_by_attribute(pdg, 'edge_type', 'spans'))
+
+    for node_id in pdg.nodes_iter():
+        assert dg.get_span(merged, node_id) == dg.get_span(pdg, node_id)
+        assert dg.istoken(merged, node_id) == dg.istoken(pdg, node_id)
+        assert set(dg.select_neighbors_by_layer(merged, node_id, 'tiger')) \
+            == set(dg.select_neighbors_by_layer(pdg, node_id, 'tiger'))
+        assert set(merged.predecessors_iter(node_id)) == \
+            set(pdg.predecessors_iter(node_id))
+    assert dg.continuity_report(merged, 'mmax:markable') == \
+        dg.continuity_report(pdg, 'mmax:markable')
+    assert dg.get_text(merged) == dg.get_text(pdg)
+
+    # the layer graphs aren't changed, neither by the view, nor by
+    # materializing it
+    materialized = merged.materialize()
+    assert materialized.nodes(data=True) == pdg.nodes(data=True)
+    assert sorted(materialized.edges(data=True)) == \
+        sorted(pdg.edges(data=True))
+    assert [(len(docgraph), docgraph.number_of_edges())
+            for docgraph in layer_graphs] == layer_sizes
+    assert all(docgraph.root in docgraph for docgraph in layer_graphs)
+
+
+
+def test_materialize():
+    """materializing a merged view creates the same graph as merge_graphs"""
+    merged = pcc.get_merged_view('maz-1423')
+    materialized = merged.materialize()
+
+    layer_graphs = pcc.get_layer_graphs('maz-1423')
+    pdg = layer_graphs[0]
+    for layer_graph in layer_graphs[1:]:
+        pdg.merge_graphs(layer_graph)
+
+    def edge_counts(docgraph):
+        """counts the edges, represented by their source, target and layers"""
+        counts = defaultdict(int)
+        for source_id, target_id, attrs in docgraph.edges_iter(data=True):
+            counts[(source_id, target_id, attrs['layers'])] += 1
+        return counts
+
+    assert materialized.nodes() == pdg.nodes()
+    assert edge_counts(materialized) == edge_counts(pdg)
+    assert edge_counts(merged) == edge_counts(pdg)
+    # edges moved from the other root nodes only belong to the
+    # namespace layer of the merged graph (cf. merge_rootnodes)
+    root_layers = set(attrs['layers'] for _, _, attrs
+                      in materialized.out_edges_iter(pdg.root, data=True))
+    assert root_layers == {frozenset([pdg.ns])}
+    assert materialized.layer2edges == pdg.layer2edges
+
+
+def test_thaw():
+    """a thawed snapshot is an independent copy of the document graph"""
+    pdg = pcc[DOC_ID]
+    frozen = pdg.freeze()
+    thawed = frozen.thaw()
+    assert isinstance(thawed, pdg.__class__)
+    assert thawed.nodes(data=True) == pdg.nodes(data=True)
+    assert sorted(thawed.edges(keys=True, data=True)) == \
+        sorted(pdg.edges(keys=True, data=True))
+    assert thawed.tokens == pdg.tokens
+    assert list(thawed.sentences) == list(pdg.sentences)
+    assert dg.get_text(thawed) == dg.get_text(pdg)
+    assert thawed.layer2nodes == pdg.layer2nodes
+    assert thawed.layer2edges == pdg.layer2edges
+    assert thawed.edgetype2edges == pdg.edgetype2edges
+
+    # the thawed graph can be modified without affecting the snapshot
+    thawed.node[thawed.root]['metadata']['foo']['bar'] = 'baz'
+    thawed.add_node('new', layers={'mmax:markable'})
+    assert 'new' not in frozen
+    assert 'foo' not in frozen.node_attribs(frozen.root)['metadata']
+
+
+def test_copy():
+    """a copy shares immutable attribute values, but not the graph structure"""
+    pdg = pcc[DOC_ID]
+    pdg_copy = pdg.copy()
+    assert isinstance(pdg_copy, pdg.__class__)
+    assert pdg_copy.nodes(data=True) == pdg.nodes(data=True)
+    assert sorted(pdg_copy.edges(keys=True, data=True)) == \
+        sorted(pdg.edges(keys=True, data=True))
+    assert pdg_copy.tokens == pdg.tokens
+    assert pdg_copy.layer2edges == pdg.layer2edges
+    token_id = pdg.tokens[0]
+    assert pdg_copy.node[token_id]['layers'] is pdg.node[token_id]['layers']
+    source_id, target_id, key = next(pdg.edges_iter(keys=True))
+    assert pdg_copy.pred[target_id][source_id] is \
+        pdg_copy.succ[source_id][target_id]
+
+    # changing the copy doesn't affect the original
+    pdg_copy.node[token_id]['layers'] = 'foo'
+    pdg_copy.node[pdg.root]['metadata']['foo']['bar'] = 'baz'
+    pdg_copy.remove_node(token_id)
+    pdg_copy.add_edge(pdg.root, 'new', layers={'foo'})
+    assert isinstance(pdg.node[token_id]['layers'], frozenset)
+    assert 'foo' not in pdg.node[pdg.root]['metadata']
+    assert 'new' not in pdg
+    assert 'foo' not in pdg.layer2edges
+    assert pdg.tokens[0] == token_id
+
+
+def test_copy_mutable_attributes():
+    """mutable attribute values aren't shared with the copy"""
+    docgraph = dg.DiscourseDocumentGraph(namespace='test')
+    docgraph.add_node('a', layers={'test'}, spans=['t1', 't2'])
+    docgraph.add_edge('a', 'b', layers={'test'}, labels=['x'])
+
+    for docgraph_copy in (docgraph.copy(),
+                          relabel_nodes(docgraph, {'a': 'c'}, copy=True)):
+        node_id = 'a' if 'a' in docgraph_copy else 'c'
+        docgraph_copy.node[node_id]['spans'].append('t3')
+        docgraph_copy.succ[node_id]['b'][0]['labels'].append('y')
+        assert docgraph.node['a']['spans'] == ['t1', 't2']
+        assert docgraph.succ['a']['b'][0]['labels'] == ['x']
+
+
+def test_pickle():
+    """document graphs and their snapshots can be pickled"""
+    pdg = pcc[DOC_ID]
+    for protocol in (0, cPickle.HIGHEST_PROTOCOL):
+        unpickled = cPickle.loads(cPickle.dumps(pdg, protocol))
+        assert isinstance(unpickled, pdg.__class__)
+        assert unpickled.nodes(data=True) == pdg.nodes(data=True)
+        assert sorted(unpickled.edges(keys=True, data=True)) == \
+            sorted(pdg.edges(keys=True, data=True))
+        assert unpickled.tokens == pdg.tokens
+
+        # metadata can still be added on the fly
+        unpickled.node[unpickled.root]['metadata']['foo']['bar'] = 'baz'
+
+    frozen = pdg.freeze()
+    unpickled = cPickle.loads(cPickle.dumps(frozen, cPickle.HIGHEST_PROTOCOL))
+    assert unpickled.nodes(data=True) == frozen.nodes(data=True)
+    assert dg.get_text(unpickled) == dg.get_text(frozen)
+
+
+def test_get_pointing_chains():
+    """maximal chains of pointing relations, cf. Issue #40"""
+    docgraph = dg.DiscourseDocumentGraph()
+    pointing_relations = [
+        ('a', 'b'), ('b', 'c'), ('b', 'd'),  # b has two antecedents
+        ('e', 'c'),
+        ('f', 'g'), ('g', 'h'), ('h', 'f'),  # cycle
+        ('i', 'i')]  # a self-reference isn't a chain
+    for source, target in pointing_relations:
+        docgraph.add_edge(source, target, layers={docgraph.ns},
+                          edge_type=dg.EdgeTypes.pointing_relation)
+    docgraph.add_edge('a', 'x', layers={docgraph.ns},
+                      edge_type=dg.EdgeTypes.dominance_relation)
+
+    chains = dg.get_pointing_chains(docgraph)
+    assert sorted(chains) == [['a', 'b', 'c'], ['a', 'b', 'd'], ['e', 'c'],
+                              ['f', 'g', 'h']]
+    assert list(dg.iter_pointing_chains(docgraph)) == chains
+    assert dg.get_pointing_chains(docgraph, layer='foo') == []
+
+    # a cycle in a chain that also has a start markable
+    docgraph = dg.DiscourseDocumentGraph()
+    for source, target in [('s', 'x'), ('g', 'x'), ('f', 'g'), ('g', 'h'),
+                           ('h', 'f')]:
+        docgraph.add_edge(source, target, layers={docgraph.ns},
+                          edge_type=dg.EdgeTypes.pointing_relation)
+    assert sorted(dg.get_pointing_chains(docgraph)) == [
+        ['g', 'h', 'f'], ['g', 'x'], ['s', 'x']]
+
+    # a cycle pointed to from another cycle is walked from the latter
+    docgraph = dg.DiscourseDocumentGraph()
+    for source, target in [('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'd'),
+                           ('d', 'c')]:
+        docgraph.add_edge(source, target, layers={docgraph.ns},
+                          edge_type=dg.EdgeTypes.pointing_relation)
+    assert sorted(dg.get_pointing_chains(docgraph)) == [['a', 'b', 'c', 'd']]
+
+    # long chains don't exhaust the stack
+    docgraph = dg.DiscourseDocumentGraph()
+    for i in xrange(2000):
+        docgraph.add_edge(i+1, i, layers={docgraph.ns},
+                          edge_type=dg.EdgeTypes.pointing_relation)
+    assert range(2000, -1, -1) in dg.get_pointing_chains(docgraph)
+
+
+def test_interned_layers():
+    """nodes/edges with the same layers share one immutable layer set"""
+    docgraph = dg.DiscourseDocumentGraph()
+    docgraph.add_node('a', layers={'foo', 'bar'})
+    docgraph.add_node('b', layers={'bar', 'foo'})
+    docgraph.add_edge('a', 'b', layers={'foo', 'bar'})
+    layers_a = docgraph.node['a']['layers']
+    assert isinstance(layers_a, frozenset)
+    assert layers_a == {'foo', 'bar'}
+    assert docgraph.node['b']['layers'] is layers_a
+    assert docgraph.edge['a']['b'][0]['layers'] is layers_a
+
+    # adding a layer to one node doesn't affect the others
+    docgraph.add_layer('a', 'baz')
+    assert docgraph.node['a']['layers'] == {'foo', 'bar', 'baz'}
+    assert docgraph.node['b']['layers'] == {'foo', 'bar'}
+    assert docgraph.edge['a']['b'][0]['layers'] == {'foo', 'bar'}
+
+    # union of layers (e.g. when merging) returns interned sets, too
+    docgraph.add_node('b', layers={'baz'})
+    assert docgraph.node['b']['layers'] is docgraph.node['a']['layers']
+
+    pdg = pcc[DOC_ID]
+    layersets = set(id(attrs['layers'])
+                    for _, attrs in pdg.nodes_iter(data=True))
+    assert len(layersets) == len(set(
+        attrs['layers'] for _, attrs in pdg.nodes_iter(data=True)))
+
+
+def test_document_graph_builder():
+    """buffered nodes/edges result in the same graph as add_node/add_edge"""
+    def build(docgraph):
+        docgraph.add_node('a', layers={'foo'}, attr_dict={'x': 1})
+        docgraph.add_node('b', layers={'foo', 'foo:token'}, y=2)
+        docgraph.add_node('a', layers={'bar'}, x=3)
+        docgraph.add_edge('a', 'b', layers={'foo'}, label='first')
+        docgraph.add_edge('a', 'b', layers={'bar'}, label='second')
+        docgraph.add_edge('a', 'b', layers={'baz'}, key=0, weight=42)
+        docgraph.add_edge('b', 'c', edge_type=dg.EdgeTypes.pointing_relation)
+
+    expected = dg.DiscourseDocumentGraph()
+    build(expected)
+    docgraph = dg.DiscourseDocumentGraph()
+    with dg.DocumentGraphBuilder(docgraph) as builder:
+        build(builder)
+        assert 'a' in builder and 'c' not in builder
+        assert 'a' not in docgraph  # nothing is added before the commit
+
+    assert docgraph.nodes(data=True) == expected.nodes(data=True)
+    assert sorted(docgraph.edges(data=True, keys=True)) == \
+        sorted(expected.edges(data=True, keys=True))
+    assert docgraph.layer2nodes == expected.layer2nodes
+    assert docgraph.layer2edges == expected.layer2edges
+    assert docgraph.edgetype2edges == expected.edgetype2edges
+
+    # invalid layers are detected when the buffered nodes are committed
+    builder = dg.DocumentGraphBuilder(docgraph)
+    builder.add_node('d', layers={'foo', 42})
+    with pytest.raises(AssertionError):
+        builder.commit()
+
+    # nothing is committed if an exception occurs within the with-block
+    with pytest.raises(ValueError):
+        with dg.DocumentGraphBuilder(docgraph) as builder:
+            builder.add_node('e', layers={'foo'})
+            raise ValueError
+    assert 'e' not in docgraph
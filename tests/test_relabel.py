@@ -137,9 +137,7 @@ def test_convert_to_integers_raise():
         H=convert_node_labels_to_integers(G, ordering="increasing age")
 
 
-@pytest.mark.xfail
 def test_relabel_nodes_copy():
-    """failed after switching to dg.relabel_nodes"""
     G = empty_graph()
     G.add_edges_from([('A','B'),('A','C'),('B','C'),('C','D')])
     mapping={'A':'aardvark','B':'bear','C':'cat','D':'dog'}
@@ -147,9 +145,7 @@ def test_relabel_nodes_copy():
     assert sorted(H.nodes()) == ['aardvark', 'bear', 'cat', 'dog']
 
 
-@pytest.mark.xfail
 def test_relabel_nodes_function():
-    """failed after switching to dg.relabel_nodes"""
     G = empty_graph()
     G.add_edges_from([('A','B'),('A','C'),('B','C'),('C','D')])
     # function mapping no longer encouraged but works
@@ -158,27 +154,21 @@ def test_relabel_nodes_function():
     H = relabel_nodes(G,mapping)
     assert sorted(H.nodes()) == [65, 66, 67, 68]
 
-@pytest.mark.xfail
 def test_relabel_nodes_graph():
-    """failed after switching to dg.relabel_nodes"""
     G = Graph([('A','B'),('A','C'),('B','C'),('C','D')])
     mapping = {'A':'aardvark','B':'bear','C':'cat','D':'dog'}
     H = relabel_nodes(G,mapping)
     assert sorted(H.nodes()) == ['aardvark', 'bear', 'cat', 'dog']
 
 
-@pytest.mark.xfail
 def test_relabel_nodes_digraph():
-    """failed after switching to dg.relabel_nodes"""
     G = DiGraph([('A','B'),('A','C'),('B','C'),('C','D')])
     mapping = {'A':'aardvark','B':'bear','C':'cat','D':'dog'}
     H = relabel_nodes(G,mapping,copy=False)
     assert sorted(H.nodes()) == ['aardvark', 'bear', 'cat', 'dog']
 
 
-@pytest.mark.xfail
 def test_relabel_nodes_multigraph():
-    """failed after switching to dg.relabel_nodes"""
     G = MultiGraph([('a','b'),('a','b')])
     mapping = {'a':'aardvark','b':'bear'}
     G = relabel_nodes(G,mapping,copy=False)
@@ -187,9 +177,7 @@ def test_relabel_nodes_multigraph():
                        [('aardvark', 'bear'), ('aardvark', 'bear')])
 
 
-@pytest.mark.xfail
 def test_relabel_nodes_multidigraph():
-    """failed after switching to dg.relabel_nodes"""
     G = MultiDiGraph([('a','b'),('a','b')])
     mapping = {'a':'aardvark','b':'bear'}
     G = relabel_nodes(G,mapping,copy=False)
@@ -197,9 +185,7 @@ def test_relabel_nodes_multidigraph():
     assert sorted(G.edges()) == [('aardvark', 'bear'), ('aardvark', 'bear')]
 
 
-@pytest.mark.xfail
 def test_relabel_isolated_nodes_to_same():
-    """failed after switching to dg.relabel_nodes"""
     G = Graph()
     G.add_nodes_from(range(4))
     mapping = {1:1}
@@ -235,3 +221,77 @@ def test_relabel_selfloop():
     G = nx.MultiDiGraph([(1, 1)])
     G = nx.relabel_nodes(G, {1: 0}, copy=False)
     assert sorted(G.nodes()) == [0]
+
+
+def test_relabel_docgraph_inplace():
+    """nodes keep their position, the layer index is updated"""
+    import discoursegraphs as dg
+    docgraph = dg.DiscourseDocumentGraph(namespace='test')
+    docgraph.add_node('a', layers={'test:token'})
+    docgraph.add_node('b', layers={'test:token'})
+    docgraph.add_edge('a', 'b', layers={'test'},
+                      edge_type=dg.EdgeTypes.pointing_relation)
+    docgraph.add_edge('b', 'b', layers={'test'})
+
+    # overlapping label sets (a swap) don't need an ordering
+    relabel_nodes(docgraph, {'a': 'b', 'b': 'a'}, copy=False)
+    assert docgraph.nodes() == ['test:root_node', 'b', 'a']
+    assert sorted(docgraph.edges(keys=True)) == [('a', 'a', 0), ('b', 'a', 0)]
+    assert docgraph.pred['a']['b'] is docgraph.succ['b']['a']
+    assert docgraph.layer2nodes['test:token'] == {'a', 'b'}
+    assert docgraph.edgetype2edges[dg.EdgeTypes.pointing_relation] == \
+        {('b', 'a', 0)}
+    assert list(dg.select_nodes_by_layer(docgraph, 'test:token')) == ['b', 'a']
+
+    # relabeling a node to an existing one merges them
+    relabel_nodes(docgraph, {'a': 'b'}, copy=False)
+    assert docgraph.nodes() == ['test:root_node', 'b']
+    assert docgraph.node['b']['layers'] == {'test:token'}
+    assert sorted(docgraph.edges(keys=True)) == [('b', 'b', 0)]
+    assert docgraph.layer2edges['test'] == {('b', 'b', 0)}
+
+
+def test_relabel_docgraph_identity_mapping():
+    """nodes mapped onto themselves keep their attributes and layers"""
+    import discoursegraphs as dg
+    docgraph = dg.DiscourseDocumentGraph(namespace='test')
+    docgraph.add_node('syn:1', layers={'syn', 'syn:cat'}, cat='NP')
+    docgraph.add_node('tok', layers={'syn', 'syn:token'}, token='Hund')
+    docgraph.add_edge('syn:1', 'tok', layers={'syn'},
+                      edge_type=dg.EdgeTypes.dominance_relation)
+
+    mapping = {node_id: node_id.replace(':', '_')
+               for node_id in docgraph.nodes_iter()}
+    relabeled = relabel_nodes(docgraph, mapping, copy=True)
+    assert relabeled.node['tok'] == {'layers': {'syn', 'syn:token'},
+                                     'token': 'Hund'}
+    assert relabeled.node['syn_1'] == {'layers': {'syn', 'syn:cat'},
+                                       'cat': 'NP'}
+    assert sorted(dg.select_nodes_by_layer(relabeled, 'syn')) == \
+        ['syn_1', 'tok']
+    assert list(dg.select_nodes_by_layer(relabeled, 'test')) == \
+        ['test_root_node']
+    assert relabeled.edges(data=True) == [
+        ('syn_1', 'tok', {'layers': {'syn'},
+                          'edge_type': dg.EdgeTypes.dominance_relation})]
+
+
+def test_relabel_docgraph_merged_edge_attributes():
+    """the attributes of the relabeled node and its edges take precedence"""
+    import discoursegraphs as dg
+    for mapping, kept in (({'a': 'b'}, 'A'), ({'b': 'a'}, 'B')):
+        docgraph = dg.DiscourseDocumentGraph(namespace='test')
+        docgraph.add_node('a', layers={'test:a'}, label='A')
+        docgraph.add_node('b', layers={'test:b'}, label='B')
+        docgraph.add_edge('a', 'x', layers={'test:a'}, label='A')
+        docgraph.add_edge('b', 'x', layers={'test:b'}, label='B')
+        docgraph.add_edge('x', 'a', layers={'test:a'}, label='A')
+        docgraph.add_edge('x', 'b', layers={'test:b'}, label='B')
+
+        relabeled = relabel_nodes(docgraph, mapping, copy=True)
+        new = mapping.values()[0]
+        assert relabeled.node[new]['label'] == kept
+        assert relabeled.node[new]['layers'] == {'test:a', 'test:b'}
+        for source, target in ((new, 'x'), ('x', new)):
+            assert relabeled.edge[source][target] == {
+                0: {'layers': {'test:a', 'test:b'}, 'label': kept}}